@@ -0,0 +1,270 @@
+"""
+Shared helpers for the Qt and SSH tests.
+
+pytest picks up the fixtures from here. Test modules that also run as
+benchmark scripts import get_app, pump, FakeSession and the in-process SSH
+servers (EchoServer and friends) directly, and call use_scratch_auth_plans.
+"""
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import paramiko
+import pytest
+from PyQt6.QtWidgets import QApplication
+from ssh.auth_plan import auth_plans
+from ssh.backend import SSHSession
+from ssh.transport_pool import jump_pool
+
+_app = None
+
+
+def get_app():
+    # Keep a module-level reference so the QApplication isn't garbage collected
+    global _app
+    _app = QApplication.instance() or QApplication(sys.argv)
+    return _app
+
+
+@pytest.fixture
+def app():
+    return get_app()
+
+
+def use_scratch_auth_plans(directory=None):
+    """Record the logins a run makes in a scratch file, not the real auth_plans.json"""
+    auth_plans.filename = os.path.join(directory or tempfile.mkdtemp(), "auth_plans.json")
+    auth_plans._plans = None
+
+
+@pytest.fixture(autouse=True)
+def scratch_auth_plans(monkeypatch, tmp_path):
+    """Each test records its logins in a scratch auth_plans.json of its own"""
+    monkeypatch.setattr(auth_plans, "filename", str(tmp_path / "auth_plans.json"))
+    monkeypatch.setattr(auth_plans, "_plans", None)
+
+
+def pump(app, seconds):
+    """Run the event loop for a while, as the application would"""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+
+
+class FakeSession:
+    """Session stand-in that never produces output on its own; records what is sent"""
+    def __init__(self, charset="utf-8"):
+        self.charset = charset
+        self.running = False  # Reader thread exits immediately
+        self.sent = []
+
+    def read_output(self):
+        return None
+
+    def send_command(self, command):
+        self.sent.append(command)
+
+    def is_active(self):
+        return False
+
+
+HOST_KEY = paramiko.RSAKey.generate(2048)
+
+
+class ShellServer(paramiko.ServerInterface):
+    """Password login (taking auth_delay seconds, like a remote PAM/MFA check) and an echoing shell"""
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.channels = 0
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        time.sleep(self.owner.auth_delay)
+        if password == self.owner.password:
+            self.owner.logins += 1
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind != "session" or self.channels >= self.owner.max_sessions:
+            return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+        self.channels += 1
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        threading.Thread(target=self.owner.echo, args=(channel,), daemon=True).start()
+        return True
+
+    def check_channel_window_change_request(self, channel, width, height, pixelwidth, pixelheight):
+        return True
+
+    def check_channel_direct_tcpip_request(self, chanid, origin, destination):
+        self.owner.forwards[chanid] = destination  # Connected once the channel is accepted
+        return paramiko.OPEN_SUCCEEDED
+
+
+class EchoServer:
+    """SSH server on a localhost port; counts TCP connections and logins, forwards direct-tcpip"""
+    interface = ShellServer
+
+    def __init__(self, password="secret", auth_delay=0.0, max_sessions=10):
+        self.password = password
+        self.auth_delay = auth_delay
+        self.max_sessions = max_sessions
+        self.connections = 0
+        self.logins = 0
+        self.transports = []
+        self.channels = []
+        self.forwards = {}  # chanid -> (host, port) of direct-tcpip channels
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(16)
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # As sshd does for interactive sessions
+            transport = paramiko.Transport(sock)
+            transport.add_server_key(HOST_KEY)
+            self.transports.append(transport)
+            # Handshake off the accept loop, so one slow or abandoned client doesn't hold up the rest
+            threading.Thread(target=self._channels, args=(transport,), daemon=True).start()
+
+    def _channels(self, transport):
+        try:
+            transport.start_server(server=self.interface(self))
+        except (paramiko.SSHException, EOFError):
+            return
+        while transport.is_active():
+            channel = transport.accept(0.5)  # The shell request handler starts the echo thread
+            if channel is not None:
+                self.channels.append(channel)  # A dropped Channel object closes itself
+                destination = self.forwards.pop(channel.chanid, None)
+                if destination is not None:
+                    self._forward(channel, destination)
+
+    def _forward(self, channel, destination):
+        upstream = socket.create_connection(destination)
+        upstream.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def pump(source, sink):
+            while True:
+                try:
+                    data = source.recv(65536)
+                except (OSError, EOFError):
+                    data = b""
+                if not data:
+                    source.close()
+                    sink.close()
+                    return
+                try:
+                    sink.sendall(data)
+                except OSError:
+                    return
+
+        threading.Thread(target=pump, args=(channel, upstream), daemon=True).start()
+        threading.Thread(target=pump, args=(upstream, channel), daemon=True).start()
+
+    def echo(self, channel):
+        channel.send(b"$ ")
+        while True:
+            try:
+                data = channel.recv(4096)
+            except (OSError, EOFError):
+                return
+            if not data:
+                return
+            channel.send(data)
+
+    def hop(self):
+        return {"host": "127.0.0.1", "port": self.port, "username": "user", "password": self.password}
+
+    def session(self, share_transport=True, jump=None):
+        """A session to this server, through the EchoServers in jump (first hop first)"""
+        proxy_jump = {"enabled": False}
+        if jump:
+            proxy_jump = dict(jump[0].hop(), enabled=True, hops=[server.hop() for server in jump[1:]])
+        return SSHSession("127.0.0.1", self.port, "user", password=self.password,
+                          proxy_jump_settings=proxy_jump, share_transport=share_transport)
+
+    def close(self):
+        self.listener.close()
+        for transport in self.transports:
+            transport.close()
+
+
+def read_until(session, marker, timeout=5.0):
+    received = b""
+    deadline = time.perf_counter() + timeout
+    while marker not in received:
+        assert time.perf_counter() < deadline, f"no {marker!r} from the session: {received!r}"
+        if session.wait_for_output(0.1):
+            received += session.read_output() or b""
+    return received
+
+
+class idle_timeout:
+    """Run with jump_pool.idle_timeout set to seconds"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __enter__(self):
+        self.saved = jump_pool.idle_timeout
+        jump_pool.idle_timeout = self.seconds
+
+    def __exit__(self, *exc):
+        jump_pool.idle_timeout = self.saved
+
+
+def close_all(sessions, servers):
+    for session in sessions:
+        session.close()
+    for server in servers:
+        server.close()
+
+
+def phase_names(session):
+    return [name for name, _, _ in session.timings.phases]
+
+
+class SecondFactorServer(ShellServer):
+    """A password alone is only a partial login (like MFA), so SSHClient.connect leaves the
+    transport unauthenticated; the keyboard-interactive login SSHSession falls back to passes"""
+
+    def get_allowed_auths(self, username):
+        return "password,keyboard-interactive"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_PARTIALLY_SUCCESSFUL
+
+    def check_auth_interactive(self, username, submethods):
+        return paramiko.server.InteractiveQuery("", "", ("Password: ", False))
+
+    def check_auth_interactive_response(self, responses):
+        if list(responses) == [self.owner.password]:
+            self.owner.logins += 1
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+
+class SecondFactorEchoServer(EchoServer):
+    interface = SecondFactorServer
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Capture the VT byte streams in this directory.
+
+Each program runs on a pseudo-terminal sized to the replay suite's screen
+(160x50, TERM=xterm-256color) and everything it writes is saved unmodified.
+Keystrokes are typed once the output has been quiet for a moment.
+
+Nothing in a capture comes from the machine that made it: ls and vim run on
+a scratch tree of generated files opened by relative path, and top is a
+scripted fake (fixed processes, load and memory) that draws its frames with
+the escape sequences procps top uses.
+
+    python recordings/capture.py            # all of them
+    python recordings/capture.py vim top    # some of them
+"""
+import fcntl
+import os
+import pty
+import select
+import shutil
+import struct
+import sys
+import tempfile
+import termios
+import time
+
+COLUMNS = 160
+ROWS = 50
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.join(HERE, os.pardir, "ui", "terminal.py")
+
+# Fixed colours instead of whatever dircolors the capturing machine has
+LS_COLORS = "rs=0:di=01;34:ln=01;36:ex=01;32:*.py=00;33:*.json=00;35:*.gz=01;31:*.png=01;35:*.md=00;36"
+
+
+def make_tree(root):
+    """A project-like tree of generated files with fixed sizes, modes and times"""
+    stamp = time.mktime((2024, 1, 2, 3, 4, 5, 0, 0, -1))
+    for package in range(12):
+        directory = os.path.join(root, f"package{package:02d}", "sub")
+        os.makedirs(directory)
+        for index in range(40):
+            for suffix, size in ((".py", 700), (".json", 120), (".md", 2048), (".png", 9000), (".gz", 400)):
+                path = os.path.join(directory if index % 2 else os.path.dirname(directory),
+                                    f"module_{index:03d}{suffix}")
+                with open(path, "wb") as f:
+                    f.write(b"x" * (size + index * 17))
+                os.utime(path, (stamp, stamp))
+        script = os.path.join(root, f"package{package:02d}", "run.sh")
+        with open(script, "w") as f:
+            f.write("#!/bin/sh\n")
+        os.chmod(script, 0o755)
+        os.symlink("run.sh", os.path.join(root, f"package{package:02d}", "latest"))
+    shutil.copy(SOURCE, os.path.join(root, "terminal.py"))
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (stamp, stamp))
+
+
+def fake_top(frames=15, delay=0.1):
+    """procps top's screen updates for a made-up process list"""
+    names = ["sshd", "bash", "python3", "postgres", "nginx", "redis-server", "node", "cron", "rsyslogd", "java"]
+
+    def write(text):
+        os.write(1, text.encode())
+
+    def header(label, values):
+        fields = "".join(f"\x1b[1m{value} \x1b(B\x1b[m\x1b[39;49m{name}," for value, name in values)
+        return f"{label}\x1b(B\x1b[m\x1b[39;49m{fields.rstrip(',')}\x1b(B\x1b[m\x1b[39;49m\x1b[K\n"
+
+    write("\x1b[?1h\x1b=\x1b[?25l\x1b[H\x1b[2J")
+    for frame in range(frames):
+        load = 0.5 + frame % 7 / 10
+        write("\x1b[H\x1b(B\x1b[m")
+        write(f"top - 12:{frame:02d}:00 up 3 days,  4:05,  2 users,  load average: {load:.2f}, 0.42, 0.38"
+              "\x1b(B\x1b[m\x1b[39;49m\x1b[K\n")
+        write(header("Tasks:", [(" 120", "total"), ("   2", "running"), (" 118", "sleeping"),
+                                ("   0", "stopped"), ("   0", "zombie")]))
+        write(header("%Cpu(s):", [(f"{frame % 9 + 1:5.1f}", "us"), ("  1.2", "sy"), ("  0.0", "ni"),
+                                  (f"{97.8 - frame % 9:5.1f}", "id"), ("  0.0", "wa")]))
+        write(header("MiB Mem :", [("  16000.0", "total"), ("   9000.0", "free"), ("   4000.0", "used"),
+                                   ("   3000.0", "buff/cache")]))
+        write(header("MiB Swap:", [("   2048.0", "total"), ("   2048.0", "free"), ("      0.0", "used"),
+                                   ("  11500.0", "avail Mem")]))
+        write("\x1b[K\n")
+        write("\x1b[7m    PID USER      PR  NI    VIRT    RES    SHR S  %CPU  %MEM     TIME+ COMMAND"
+              + " " * (COLUMNS - 80) + "\x1b(B\x1b[m\x1b[39;49m\n")
+        for row in range(ROWS - 8):
+            pid = 2000 + (row * 37 + frame * 11) % 3000
+            cpu = (frame * 13 + row * 7) % 100 / 10
+            line = (f"{pid:7d} user      20   0 {row * 1100 + 9000:7d} {row * 300 + 4000:6d} {row * 90 + 2000:6d} S "
+                    f"{cpu:5.1f} {row * 0.1:5.1f} {frame:3d}:{row:02d}.{frame * 3 % 100:02d} "
+                    f"{names[row % len(names)]}")
+            bold = "\x1b[1m" if row < 2 else ""
+            write(f"{bold}{line}\x1b(B\x1b[m\x1b[39;49m\x1b[K\n" if row < ROWS - 9 else f"{bold}{line}\x1b[K")
+        write("\x1b[J")
+        time.sleep(delay)
+    write(f"\x1b[?1l\x1b>\x1b[?12l\x1b[?25h\x1b[{ROWS + 1};1H\x1b[K")
+
+
+CAPTURES = {
+    "ls-color": (["sh", "-c", "sleep 0.2; ls -goR --color=always --time-style=long-iso . | head -n 1500"], []),
+    "top": (fake_top, []),
+    "vim": (["vim", "-u", "NONE", "-N", "-n", "-c", "syntax on", "terminal.py"],
+            [b"\x06"] * 25 + [b"gg", b"/def\r"] + [b"n"] * 20 + [b":q!\r"]),
+}
+
+
+def capture(argv, keys=(), cwd=None, settle=0.15, idle=5.0):
+    """Bytes argv (a command, or a function run in the child) writes to a COLUMNS x ROWS terminal"""
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.environ.update(TERM="xterm-256color", LANG="C.UTF-8", COLUMNS=str(COLUMNS), LINES=str(ROWS),
+                          LS_COLORS=LS_COLORS)
+        if cwd:
+            os.chdir(cwd)
+        if callable(argv):
+            argv()
+            os._exit(0)
+        os.execvp(argv[0], argv)
+    fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack("HHHH", ROWS, COLUMNS, 0, 0))
+    out = bytearray()
+    keys = list(keys)
+    last = time.time()
+    while True:
+        ready, _, _ = select.select([fd], [], [], 0.1)
+        if ready:
+            try:
+                data = os.read(fd, 65536)
+            except OSError:  # EIO once the child has exited
+                break
+            if not data:
+                break
+            out += data
+            last = time.time()
+        elif keys and time.time() - last > settle:
+            os.write(fd, keys.pop(0))
+            last = time.time()
+        elif not keys and time.time() - last > idle:
+            os.kill(pid, 9)
+            break
+    os.waitpid(pid, 0)
+    os.close(fd)
+    return bytes(out)
+
+
+if __name__ == "__main__":
+    root = tempfile.mkdtemp()
+    try:
+        make_tree(root)
+        for name in sys.argv[1:] or CAPTURES:
+            argv, keys = CAPTURES[name]
+            data = capture(argv, keys, cwd=root)
+            with open(os.path.join(HERE, name + ".vt"), "wb") as f:
+                f.write(data)
+            print(f"{name}.vt: {len(data)} bytes")
+    finally:
+        shutil.rmtree(root)
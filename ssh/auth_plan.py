@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import paramiko
+from utils import app_dir
+from .timings import TimedTransport
+
+# Keys SSHClient.connect looks for (look_for_keys=True), in its order
+DEFAULT_KEY_FILES = [os.path.join("~", directory, "id_" + name)
+                     for name in ("rsa", "ecdsa", "ed25519") for directory in (".ssh", "ssh")]
+
+
+def plan_key(host, port, username):
+    return f"{username}@{host}:{int(port)}"
+
+
+class RecordingTransport(TimedTransport):
+    """Transport that records the auth methods the server accepted (fully or partially).
+
+    auth_steps is a list of (method, key) in the order they were accepted;
+    key is the PKey (or AgentKey) for publickey, else None. Only the outermost
+    call counts: auth_password's fallback to keyboard-interactive is recorded
+    as "password", which replays the same way.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.auth_steps = []
+        self._auth_depth = 0
+
+    def _record(self, method, key, attempt):
+        self._auth_depth += 1
+        try:
+            result = attempt()
+        finally:
+            self._auth_depth -= 1
+        if self._auth_depth == 0:
+            self.auth_steps.append((method, key))
+        return result
+
+    def auth_publickey(self, username, key, event=None):
+        return self._record("publickey", key, lambda: super(RecordingTransport, self).auth_publickey(username, key, event))
+
+    def auth_password(self, username, password, event=None, fallback=True):
+        return self._record("password", None,
+                            lambda: super(RecordingTransport, self).auth_password(username, password, event, fallback))
+
+    def auth_interactive(self, username, handler, submethods=""):
+        return self._record("keyboard-interactive", None,
+                            lambda: super(RecordingTransport, self).auth_interactive(username, handler, submethods))
+
+    def auth_interactive_dumb(self, username, handler=None, submethods=""):
+        return self._record("keyboard-interactive", None,
+                            lambda: super(RecordingTransport, self).auth_interactive_dumb(username, handler, submethods))
+
+
+class KeyCache:
+    """Decrypted private keys, loaded once per file for the life of the app.
+
+    A key file that changes on disk (different mtime) is loaded again.
+    """
+
+    def __init__(self):
+        self._keys = {}  # absolute path -> (mtime_ns, PKey)
+        self._lock = threading.Lock()  # Sessions connect on worker threads
+        self.loads = 0  # Keys actually read and decrypted
+
+    def load(self, path, passphrase=None):
+        """PKey for the file at path (decrypted with passphrase if it needs one), or None"""
+        path = os.path.abspath(os.path.expanduser(path))
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._keys.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+            try:
+                # Like SSHClient.connect, the password doubles as the passphrase
+                if isinstance(passphrase, str):
+                    passphrase = passphrase.encode("utf-8")
+                key = paramiko.PKey.from_path(path, passphrase or None)
+            except Exception as e:
+                print(f"DEBUG: Could not load key {path}: {e}")
+                return None
+            self.loads += 1
+            self._keys[path] = (mtime, key)
+            return key
+
+    def path_of(self, key):
+        """Path of the loaded key with key's fingerprint, or None; loads nothing"""
+        with self._lock:
+            for path, (_, cached) in self._keys.items():
+                if cached.fingerprint == key.fingerprint:
+                    return path
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+
+def public_key_file(key, paths):
+    """Path of the first of paths whose public half (path + ".pub") is key, or None.
+
+    Only the .pub files are read, so no private key is decrypted to find it.
+    """
+    for path in paths:
+        path = os.path.abspath(os.path.expanduser(path))
+        try:
+            with open(path + ".pub", "r") as f:
+                fields = f.read().split()
+        except OSError:
+            continue
+        if len(fields) >= 2 and fields[1] == key.get_base64():
+            return path
+    return None
+
+
+class AuthPlanStore:
+    """Which auth methods (and which key) last logged in to each user@host:port.
+
+    A plan is a list of steps like {"method": "publickey", "key_file": path},
+    {"method": "publickey", "agent_fingerprint": fp}, {"method": "password"}
+    or {"method": "keyboard-interactive"}. Following it takes one transport
+    and no failed attempts. Only method names, key paths and fingerprints are
+    stored, never passwords or key material. The file lives next to
+    settings.json unless filename says otherwise.
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename or os.path.join(app_dir(), "auth_plans.json")
+        self._plans = None  # Loaded on first use
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._plans is not None:
+            return
+        self._plans = {}
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, "r") as f:
+                    self._plans = json.load(f)
+            except Exception as e:
+                print(f"Error loading auth plans: {e}")
+
+    def _save(self):
+        try:
+            with open(self.filename, "w") as f:
+                json.dump(self._plans, f, indent=4)
+        except Exception as e:
+            print(f"Error saving auth plans: {e}")
+
+    def get(self, key):
+        with self._lock:
+            self._load()
+            plan = self._plans.get(key)
+            return [dict(step) for step in plan] if plan else None
+
+    def record(self, key, steps):
+        with self._lock:
+            self._load()
+            if self._plans.get(key) == steps:
+                return
+            self._plans[key] = steps
+            self._save()
+
+    def forget(self, key):
+        with self._lock:
+            self._load()
+            if self._plans.pop(key, None) is not None:
+                self._save()
+
+
+# Shared by every SSHSession in the process
+auth_plans = AuthPlanStore()
+key_cache = KeyCache()
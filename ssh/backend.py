@@ -1,9 +1,15 @@
 import paramiko
+import select
+import socket
 import threading
 import time
+from contextlib import contextmanager
+from .auth_plan import DEFAULT_KEY_FILES, RecordingTransport, auth_plans, key_cache, plan_key, public_key_file
+from .timings import ConnectTimings, connection_log
+from .transport_pool import PoolReference, TransportPool, hop_key, jump_hops, jump_pool, transport_key, transport_pool
 
 class SSHSession:
-    def __init__(self, host, port, username, password=None, key_filename=None, proxy_settings=None, proxy_jump_settings=None, auth_callback=None, password_callback=None):
+    def __init__(self, host, port, username, password=None, key_filename=None, proxy_settings=None, proxy_jump_settings=None, auth_callback=None, password_callback=None, charset="utf-8", share_transport=True, exchange_lock=None):
         self.host = host
         self.port = port
         self.username = username
@@ -13,17 +19,36 @@ class SSHSession:
         self.proxy_jump_settings = proxy_jump_settings
         self.auth_callback = auth_callback
         self.password_callback = password_callback
+        # Taken at the first prompt of a login and held until the login ends, so
+        # sessions connecting in parallel don't interleave their prompts
+        self.exchange_lock = exchange_lock
+        self._exchange_guard = threading.Lock()  # _in_exchange and _holds_exchange
+        self._in_exchange = False
+        self._holds_exchange = False
+        self.charset = charset  # Remote character set; output is decoded by the Terminal
         self.client = paramiko.SSHClient()
         self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         self.shell = None
         self.running = False
+        self.pty_size = None  # (rows, cols) last sent to the remote side
         self.jump_client = None # Keep reference to jump client
-        self.jump_transport = None
+        self.jump_transport = None  # Transport to the last bastion, from jump_pool
+        self.jump_ref = None  # This session's reference to it
+        self.transport = None  # Set when the manual (MFA) path built the transport itself
+        
+        # Connection sharing: tabs to the same user@host open channels on one transport
+        self.share_transport = share_transport
+        self.pool_key = None  # Set while this session holds a reference in transport_pool
+        self.pooled_transport = None
+        self.reused_transport = False  # True if connect() opened a channel on an existing transport
+        self.connect_seconds = None
+        self.timings = None  # ConnectTimings of the last connect()
         
         # Performance optimizations
         self.buffer_size = 8192  # Start with 8KB
         self.max_buffer_size = 32768  # Can grow to 32KB
         self.reads_since_last_check = 0
+        self.max_drain_bytes = 262144  # Cap a single read_output() drain at 256KB
         self.enable_compression = True  # SSH compression for slow links
 
 
@@ -45,7 +70,7 @@ class SSHSession:
             elif self.auth_callback:
                 # Fallback to UI
                 print(f"DEBUG: Falling back to UI for prompt: {prompt}")
-                ui_responses = self.auth_callback(title, instructions, [(prompt, echo)])
+                ui_responses = self._ask(self.auth_callback, title, instructions, [(prompt, echo)])
                 if ui_responses:
                     responses.append(ui_responses[0])
                 else:
@@ -54,6 +79,33 @@ class SSHSession:
                 responses.append("")
         return responses
 
+    @contextmanager
+    def _auth_exchange(self):
+        """One login on one transport; prompts asked during it come one session at a time"""
+        with self._exchange_guard:
+            self._in_exchange = True
+        try:
+            yield
+        finally:
+            with self._exchange_guard:
+                self._in_exchange = False
+                held, self._holds_exchange = self._holds_exchange, False
+            if held:
+                self.exchange_lock.release()
+
+    def _ask(self, callback, *args):
+        """Call a UI callback, first taking exchange_lock for the rest of the login"""
+        # Keyboard-interactive prompts arrive on paramiko's transport thread
+        if self.exchange_lock is not None and self._in_exchange and not self._holds_exchange:
+            self.exchange_lock.acquire()
+            with self._exchange_guard:
+                if self._in_exchange:
+                    self._holds_exchange = True
+                else:
+                    # The login gave up (auth timeout) while this prompt waited its turn
+                    self.exchange_lock.release()
+        return callback(*args)
+
     def _authenticate(self, transport, username, password):
         """Helper to handle authentication (Smart Interactive -> Password fallback)"""
         try:
@@ -100,7 +152,7 @@ class SSHSession:
                             print(f"Auth Error: Password auth for {username}: {e}")
                     
                     if self.password_callback and not transport.is_authenticated():
-                        new_pass = self.password_callback(f"Authentication failed for {username}@{self.host}. Please enter a new password:")
+                        new_pass = self._ask(self.password_callback, f"Authentication failed for {username}@{self.host}. Please enter a new password:")
                         if new_pass:
                             current_password = new_pass
                             attempts += 1
@@ -114,128 +166,446 @@ class SSHSession:
             print(f"Critical Auth Error for {username}: {e}")
             return False
 
+    def duplicate(self):
+        """A new, unconnected session with the same settings (reuses the transport when shared)"""
+        return SSHSession(self.host, self.port, self.username, password=self.password,
+                          key_filename=self.key_filename, proxy_settings=self.proxy_settings,
+                          proxy_jump_settings=self.proxy_jump_settings, auth_callback=self.auth_callback,
+                          password_callback=self.password_callback, charset=self.charset,
+                          share_transport=self.share_transport, exchange_lock=self.exchange_lock)
+
+    def _transport_key(self):
+        return transport_key(self.host, self.port, self.username, self.proxy_jump_settings)
+
+    def _open_shell(self, transport):
+        """Open an interactive shell channel with a PTY on an authenticated transport"""
+        shell = transport.open_session()
+        try:
+            shell.get_pty()
+            shell.invoke_shell()
+        except Exception:
+            shell.close()
+            raise
+        return shell
+
+    def _connect_shared(self):
+        """Open this session as another channel on a live transport to the same host, if any"""
+        key = self._transport_key()
+        transport = transport_pool.acquire(key)
+        if transport is None:
+            return False
+        try:
+            with self.timings.phase("shell"):
+                self.shell = self._open_shell(transport)
+        except Exception as e:
+            # e.g. the server's MaxSessions is reached; fall back to a new connection
+            print(f"DEBUG: Could not open a channel on the shared transport to {self.host}: {e}")
+            transport_pool.release(key, transport)
+            return False
+        self.pool_key = key
+        self.pooled_transport = transport
+        self.reused_transport = True
+        print(f"DEBUG: Opened a new channel on the existing transport to {self.host}")
+        return True
+
+    def _share_transport(self):
+        """Offer the transport this session just authenticated to later sessions"""
+        transport = self.shell.get_transport()
+        # The pool closes these when the last session using the transport goes away
+        resources = [r for r in (self.client, self.transport, self.jump_ref, self.jump_client) if r]
+        key = self._transport_key()
+        if transport_pool.register(key, transport, resources):
+            self.pool_key = key
+            self.pooled_transport = transport
+
+    def _open_socket(self, host, port, prefix=""):
+        """TCP connection to host, timing the name lookup and the connect separately"""
+        with self.timings.phase(prefix + "dns"):
+            addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        with self.timings.phase(prefix + "tcp"):
+            error = None
+            for family, kind, proto, _, address in addresses:
+                sock = socket.socket(family, kind, proto)
+                try:
+                    sock.settimeout(15)
+                    sock.connect(address)
+                except OSError as e:
+                    sock.close()
+                    error = e
+                    continue
+                # Like OpenSSH for interactive sessions: no Nagle delay on keystrokes
+                # and on the small request/reply exchanges that open a channel
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                return sock
+            raise error or OSError(f"No address for {host}")
+
+    def _open_forward(self, via, host, port, prefix=""):
+        """direct-tcpip channel to host:port through an authenticated bastion transport"""
+        with self.timings.phase(prefix + "channel"):
+            return via.open_channel("direct-tcpip", (host, port), ("127.0.0.1", 0))
+
+    @contextmanager
+    def _waiting(self, lock, name):
+        """Hold lock, recording the wait as a phase if another tab's login held it"""
+        start = time.perf_counter()
+        with lock:
+            waited = time.perf_counter() - start
+            if waited > 0.001:
+                self.timings.add(name, waited)
+            yield
+
+    def _connect_hop(self, hop, via, prefix):
+        """Log in to one bastion, directly or through a direct-tcpip channel on the previous one"""
+        host, port, user = hop.get("host"), int(hop.get("port") or 22), hop.get("username")
+        print(f"Connecting to jump host: {user}@{host}:{port}")
+        if via is None:
+            transport = RecordingTransport(self._open_socket(host, port, prefix))
+        else:
+            transport = RecordingTransport(self._open_forward(via, host, port, prefix))
+        try:
+            with self.timings.phase(prefix + "kex"):
+                transport.start_client()
+            with self.timings.phase(prefix + "auth"), self._auth_exchange():
+                if not self._login(transport, user, hop.get("password"), host, port):
+                    raise Exception(f"Jump host authentication failed for {user}@{host}")
+        except Exception:
+            transport.close()
+            raise
+        transport.set_keepalive(60)  # Pooled bastions can sit idle between tabs
+        return transport
+
+    def _connect_jump_chain(self):
+        """Authenticated transport to the last bastion of the chain, reusing pooled hops.
+
+        Each pooled hop holds a reference to the hop it was reached through, so
+        the session only holds one, to the last hop (self.jump_ref).
+        """
+        # Unshared sessions get their hops to themselves, closed with the session
+        pool = jump_pool if self.share_transport else TransportPool()
+        via = None  # Reference to the previous hop, ours until the next hop takes it over
+        for number, hop in enumerate(jump_hops(self.proxy_jump_settings, self.username), 1):
+            key = hop_key(hop, via.key if via else None)
+            prefix = f"jump{number} "
+            # Tabs opened together behind one bastion wait for a single login
+            with self._waiting(pool.connecting(key), prefix + "wait"):
+                transport = pool.acquire(key)
+                if transport is not None:
+                    print(f"DEBUG: Reusing jump host transport to {key[2]}@{key[0]}:{key[1]}")
+                    self.timings.add(prefix + "pooled", 0.0)
+                    if via:
+                        via.close()  # The pooled hop already holds its own reference
+                else:
+                    try:
+                        transport = self._connect_hop(hop, via.transport if via else None, prefix)
+                    except Exception:
+                        if via:
+                            via.close()
+                        raise
+                    pool.register(key, transport, [transport] + ([via] if via else []))
+            via = PoolReference(pool, key, transport)
+        self.jump_ref = via
+        return via.transport
+
     def connect(self):
+        """Connect and open the shell; how long each phase took is kept in self.timings"""
+        self.timings = ConnectTimings(self.host, self.port, self.username)
+        start = time.perf_counter()
+        if not self.share_transport:
+            ok = self._connect_new()
+        else:
+            # Tabs opened together to one host wait for a single login and share it
+            with self._waiting(transport_pool.connecting(self._transport_key()), "wait"):
+                ok = self._connect_shared() or self._connect_new()
+        if ok:
+            self.running = True
+        self.connect_seconds = time.perf_counter() - start
+        self.timings.finish(ok, self.reused_transport)
+        connection_log.add(self.timings)
+        return ok
+
+    def _connect_new(self):
         try:
-            sock = None
-            
-            # Handle Proxy Jump
-            if self.proxy_jump_settings and self.proxy_jump_settings.get("enabled"):
-                jump_host = self.proxy_jump_settings.get("host")
-                jump_port = self.proxy_jump_settings.get("port", 22)
-                jump_user = self.proxy_jump_settings.get("username")
-                jump_pass = self.proxy_jump_settings.get("password")
-                
-                print(f"Connecting to jump host: {jump_user}@{jump_host}:{jump_port}")
-                
-                self.jump_transport = paramiko.Transport((jump_host, jump_port))
-                self.jump_transport.start_client()
-                
-                if not self._authenticate(self.jump_transport, jump_user, jump_pass):
-                    raise Exception(f"Jump host authentication failed for {jump_user}@{jump_host}")
+            # Handle Proxy Jump (one or more bastions)
+            if jump_hops(self.proxy_jump_settings, self.username):
+                self.jump_transport = self._connect_jump_chain()
+            sock = self._open_target()
 
-                # Create a channel to the target
-                print(f"Opening channel to target: {self.host}:{self.port}")
-                sock = self.jump_transport.open_channel(
-                    "direct-tcpip", 
-                    (self.host, self.port), 
-                    ("127.0.0.1", 0) 
-                )
+            # Straight to the methods that logged in last time, on this one transport
+            plan = auth_plans.get(self._plan_key())
+            prefix = ""  # Phase names of the SSHClient.connect attempt
+            if plan is not None:
+                if self._connect_planned(sock, plan):
+                    if self.share_transport:
+                        self._share_transport()
+                    return True
+                auth_plans.forget(self._plan_key())
+                prefix = "plan retry "
+                sock = self._open_target(prefix)
 
             # Main Connection
             # Try high-level connect first. 
             print(f"Connecting to target host: {self.username}@{self.host}:{self.port}")
             try:
-                self.client.connect(
-                    self.host,
-                    port=self.port,
-                    username=self.username,
-                    password=self.password,
-                    key_filename=self.key_filename,
-                    sock=sock,
-                    allow_agent=True,
-                    look_for_keys=True,
-                    timeout=15,
-                    compress=self.enable_compression  # Enable compression for better throughput
-                )
+                # A key loaded before is already decrypted
+                pkey = key_cache.load(self.key_filename, self.password) if self.key_filename else None
+                handshake_start = time.perf_counter()
+                try:
+                    self.client.connect(
+                        self.host,
+                        port=self.port,
+                        username=self.username,
+                        password=self.password,
+                        pkey=pkey,
+                        key_filename=None if pkey else self.key_filename,
+                        sock=sock,
+                        allow_agent=True,
+                        look_for_keys=True,
+                        timeout=15,
+                        compress=self.enable_compression,  # Enable compression for better throughput
+                        transport_factory=RecordingTransport  # Times the key exchange, records auth steps
+                    )
+                finally:
+                    self._record_handshake(handshake_start, prefix)
                 
                 # Get the transport and enable TCP keepalive for better connection stability
                 transport = self.client.get_transport()
                 if transport:
-                    transport.set_keepalive(60)  # Send keepalive every 60 seconds
-                    # Request larger TCP window for better throughput
-                    transport.window_size = 2097152  # 2MB window
-                    transport.packetizer.REKEY_BYTES = pow(2, 40)  # Avoid frequent rekeying
+                    self._tune_transport(transport)
                 
-                self.shell = self.client.invoke_shell()
+                with self.timings.phase(prefix + "shell"):
+                    self.shell = self.client.invoke_shell()
                 print(f"DEBUG: High-level connect successful for {self.host}")
+                self._record_plan(transport)
             except (paramiko.AuthenticationException, paramiko.SSHException) as e:
                 print(f"DEBUG: High-level connect failed or needs MFA: {e}. Trying robust manual fallback...")
                 
                 # IMPORTANT: If connect failed, the previous socket/channel is often corrupted/closed.
-                # We should close it and open a NEW one if we're using a jump host.
-                if sock:
-                    try: sock.close()
-                    except: pass
-                    print("DEBUG: Opening NEW channel to target via jump host for MFA fallback...")
-                    sock = self.jump_transport.open_channel("direct-tcpip", (self.host, self.port), ("127.0.0.1", 0))
+                # We should close it and open a NEW one.
+                try: sock.close()
+                except: pass
+                sock = self._open_target("retry ")
                 
                 # Create a fresh transport
-                if sock:
-                    transport = paramiko.Transport(sock)
-                else:
-                    transport = paramiko.Transport((self.host, self.port))
+                transport = RecordingTransport(sock)
                 
-                transport.start_client()
-                
-                if not self._authenticate(transport, self.username, self.password):
+                try:
+                    with self.timings.phase("retry kex"):
+                        transport.start_client()
+                    with self.timings.phase("retry auth"), self._auth_exchange():
+                        if not self._login(transport, self.username, self.password, self.host, self.port):
+                            raise Exception(f"Target host authentication failed for {self.username}@{self.host}")
+                except Exception:
                     transport.close()
-                    raise Exception(f"Target host authentication failed for {self.username}@{self.host}")
+                    raise
                 
                 # Success! Manual session setup.
-                self.shell = transport.open_session()
-                self.shell.get_pty()
-                self.shell.invoke_shell()
+                self.transport = transport
+                with self.timings.phase("retry shell"):
+                    self.shell = self._open_shell(transport)
                 print(f"DEBUG: Manual transport auth successful for {self.host}")
 
-            self.running = True
+            if self.share_transport:
+                self._share_transport()
             return True
         except Exception as e:
             print(f"Connection failed: {e}")
-            if self.jump_transport:
-                self.jump_transport.close()
+            if self.jump_ref:
+                # Bastions stay pooled (until idle) for the retry
+                self.jump_ref.close()
+                self.jump_ref = None
                 self.jump_transport = None
             return False
 
+    def _open_target(self, prefix=""):
+        """Socket (or direct-tcpip channel through the jump hosts) to the target host"""
+        if self.jump_transport:
+            print(f"Opening channel to target: {self.host}:{self.port}")
+            return self._open_forward(self.jump_transport, self.host, self.port, prefix)
+        return self._open_socket(self.host, self.port, prefix)
+
+    def _tune_transport(self, transport):
+        transport.set_keepalive(60)  # Send keepalive every 60 seconds
+        # Request larger TCP window for better throughput
+        transport.window_size = 2097152  # 2MB window
+        transport.packetizer.REKEY_BYTES = pow(2, 40)  # Avoid frequent rekeying
+
+    def _plan_key(self):
+        return plan_key(self.host, self.port, self.username)
+
+    def _connect_planned(self, sock, plan):
+        """Key exchange and login following plan on a single transport; False if the plan failed"""
+        print(f"Connecting to target host: {self.username}@{self.host}:{self.port} (saved login: "
+              f"{', '.join(step['method'] for step in plan)})")
+        transport = RecordingTransport(sock)
+        transport.use_compression(self.enable_compression)
+        try:
+            with self.timings.phase("kex"):
+                transport.start_client(timeout=15)
+            with self.timings.phase("auth"), self._auth_exchange():
+                if not self._follow_plan(transport, self.username, self.password, plan):
+                    raise paramiko.AuthenticationException("saved login no longer works")
+        except Exception as e:
+            print(f"DEBUG: Saved login for {self.host} failed: {e}. Trying all methods...")
+            transport.close()
+            return False
+        self._tune_transport(transport)
+        self.transport = transport
+        with self.timings.phase("shell"):
+            self.shell = self._open_shell(transport)
+        return True
+
+    def _follow_plan(self, transport, username, password, plan):
+        """Run the plan's auth steps in order; True once the transport is authenticated"""
+        self._sent_initial_password = False
+        try:
+            for step in plan:
+                method = step.get("method")
+                if method == "publickey":
+                    self._plan_publickey(transport, username, password, step)
+                elif method == "keyboard-interactive":
+                    callback = lambda t, i, p: self._smart_interactive_callback(t, i, p, username, password)
+                    transport.auth_interactive(username, callback)
+                elif method == "password" and password:
+                    transport.auth_password(username, password)
+                else:
+                    return False
+                if transport.is_authenticated():
+                    return True
+        except paramiko.SSHException as e:
+            print(f"Auth Failed: Saved {method} login for {username}: {e}")
+        return transport.is_authenticated()
+
+    def _plan_publickey(self, transport, username, password, step):
+        if "agent_fingerprint" in step:
+            agent = paramiko.Agent()
+            try:
+                key = next((k for k in agent.get_keys() if k.fingerprint == step["agent_fingerprint"]), None)
+                if key is None:
+                    raise paramiko.AuthenticationException("key no longer in the agent")
+                transport.auth_publickey(username, key)
+            finally:
+                agent.close()
+            return
+        key = key_cache.load(step.get("key_file") or "", password)
+        if key is None:
+            raise paramiko.AuthenticationException(f"cannot load {step.get('key_file')}")
+        transport.auth_publickey(username, key)
+
+    def _login(self, transport, username, password, host, port):
+        """Authenticate with the saved plan for username@host:port, else every method; saves what worked"""
+        key = plan_key(host, port, username)
+        plan = auth_plans.get(key)
+        if plan is not None:
+            if self._follow_plan(transport, username, password, plan):
+                return True
+            auth_plans.forget(key)
+            if not transport.is_active():
+                return False
+        if not self._authenticate(transport, username, password):
+            return False
+        self._record_plan(transport, host, port, username)
+        return True
+
+    def _record_plan(self, transport, host=None, port=None, username=None):
+        """Save the auth steps that logged transport in, so the next connect goes straight to them"""
+        steps = []
+        for method, key in getattr(transport, "auth_steps", []):
+            step = {"method": method}
+            if method == "publickey":
+                if isinstance(key, paramiko.AgentKey):
+                    step["agent_fingerprint"] = key.fingerprint
+                else:
+                    # The session's own key was loaded through key_cache; a default key paramiko
+                    # found itself is matched by its .pub file
+                    step["key_file"] = key_cache.path_of(key) or public_key_file(key, DEFAULT_KEY_FILES)
+                    if step["key_file"] is None:
+                        return  # Not a key we can find again
+            steps.append(step)
+        if steps:
+            auth_plans.record(plan_key(host or self.host, port or self.port, username or self.username), steps)
+
+    def _record_handshake(self, start, prefix=""):
+        """Split SSHClient.connect's time into key exchange and authentication"""
+        elapsed = time.perf_counter() - start
+        transport = self.client.get_transport()
+        kex_seconds = getattr(transport, "kex_seconds", None)
+        if kex_seconds is None:
+            self.timings.add(prefix + "kex", elapsed, ok=False)  # Failed before the key exchange finished
+            return
+        self.timings.add(prefix + "kex", kex_seconds, ok=transport.active)
+        self.timings.add(prefix + "auth", elapsed - kex_seconds, ok=transport.is_authenticated())
+
     def send_command(self, command):
         if self.shell:
+            if isinstance(command, str):
+                command = command.encode(self.charset, errors='replace')
             self.shell.send(command)
 
+    def resize(self, rows, cols):
+        """Send a window-change request for the remote PTY, once per new size"""
+        if not self.shell or (rows, cols) == self.pty_size:
+            return
+        try:
+            self.shell.resize_pty(width=cols, height=rows)
+            self.pty_size = (rows, cols)
+        except Exception as e:
+            print(f"Error resizing remote terminal: {e}")
+
+    def fileno(self):
+        """File descriptor that becomes readable when the channel has data or is closed"""
+        if self.shell:
+            return self.shell.fileno()
+        return None
+
+    def wait_for_output(self, timeout=None):
+        """Block until the channel has data or hits EOF (instead of polling recv_ready)"""
+        shell = self.shell
+        if not shell:
+            return False
+        if shell.recv_ready() or shell.closed or shell.eof_received:
+            return True
+        try:
+            # paramiko's Channel.fileno() is a pipe that is set whenever data is
+            # buffered or the channel closes, so select() sleeps until there is work.
+            readable, _, _ = select.select([shell], [], [], timeout)
+        except (OSError, ValueError):
+            return False
+        return bool(readable)
+
     def read_output(self):
-        """Read output with adaptive buffer sizing for optimal performance"""
+        """Drain everything the channel has buffered as raw bytes, with adaptive buffer sizing"""
         if self.shell and self.shell.recv_ready():
-            # Adaptive buffer sizing: grow buffer if we're consistently reading full buffers
-            self.reads_since_last_check += 1
-            
-            # Every 10 reads, check if we should increase buffer size
-            if self.reads_since_last_check >= 10 and self.buffer_size < self.max_buffer_size:
-                # Increase buffer size for high-throughput connections
-                self.buffer_size = min(self.buffer_size * 2, self.max_buffer_size)
-                self.reads_since_last_check = 0
-                print(f"DEBUG: Increased buffer size to {self.buffer_size} bytes")
-            
-            try:
+            chunks = []
+            total = 0
+            while total < self.max_drain_bytes and self.shell.recv_ready():
                 data = self.shell.recv(self.buffer_size)
-                return data.decode('utf-8', errors='replace')  # Replace invalid UTF-8 instead of crashing
-            except UnicodeDecodeError:
-                # Fallback for encoding issues
-                return data.decode('latin-1')
+                if not data:
+                    break
+                chunks.append(data)
+                total += len(data)
+
+                # Adaptive buffer sizing: grow buffer if we're consistently reading full buffers
+                if len(data) == self.buffer_size:
+                    self.reads_since_last_check += 1
+                if self.reads_since_last_check >= 10 and self.buffer_size < self.max_buffer_size:
+                    # Increase buffer size for high-throughput connections
+                    self.buffer_size = min(self.buffer_size * 2, self.max_buffer_size)
+                    self.reads_since_last_check = 0
+                    print(f"DEBUG: Increased buffer size to {self.buffer_size} bytes")
+
+            if not chunks:
+                return None
+            # Hand bytes through undecoded: the Terminal decodes incrementally so a
+            # multibyte character split across two recv() calls stays intact
+            return b''.join(chunks)
         return None
 
 
     def is_active(self):
-        # Check if the shell channel is still open
+        # The shell is done once the channel closes, or once the server's EOF
+        # has been reached (wait_for_output keeps reporting an EOF as ready)
         if self.shell:
-            return not self.shell.closed
+            return not self.shell.closed and not (self.shell.eof_received and not self.shell.recv_ready())
         return False
 
     def close(self):
@@ -244,10 +614,20 @@ class SSHSession:
         try:
             if self.shell:
                 self.shell.close()
+            if self.pool_key is not None:
+                # Shared transport: the pool closes it with the last tab using it
+                transport_pool.release(self.pool_key, self.pooled_transport)
+                self.pool_key = None
+                self.pooled_transport = None
+                return
+            if self.transport:
+                self.transport.close()
+                self.transport = None
             if self.client:
                 self.client.close()
-            if self.jump_transport:
-                self.jump_transport.close()
+            if self.jump_ref:
+                self.jump_ref.close()
+                self.jump_ref = None
                 self.jump_transport = None
             if self.jump_client:
                 self.jump_client.close()
@@ -1,16 +1,21 @@
 import threading
-import queue
+import errno
 import os
 import sys
+from .output_buffer import OutputBuffer
 
 class LocalSession:
     """Local terminal session using Windows ConPTY or fallback"""
-    def __init__(self, shell="powershell.exe"):
+    def __init__(self, shell="powershell.exe", charset="utf-8", read_chunk_size=65536):
         self.shell = shell
+        self.read_chunk_size = read_chunk_size  # Max bytes taken from the shell per read
+        self.charset = charset  # Used to encode input; output is decoded by the Terminal
         self.process = None
         self.running = False
-        self.output_queue = queue.Queue()
+        self.output_buffer = OutputBuffer()  # Filled by reader threads, drained by read_output
         self.use_pty = False
+        self.reader_thread = None
+        self.pty_size = None  # (rows, cols) last applied to the PTY
         
     def connect(self):
         """Start the local shell process"""
@@ -157,7 +162,8 @@ class LocalSession:
         self.master_fd = master
         self.running = True
         
-        threading.Thread(target=self._read_unix_pty_output, daemon=True).start()
+        self.reader_thread = threading.Thread(target=self._read_unix_pty_output, daemon=True)
+        self.reader_thread.start()
         return True
     
     def _connect_fallback(self):
@@ -185,7 +191,11 @@ class LocalSession:
                 # winpty 3.0+ expects blocking parameter (bool) not buffer size
                 data = self.process.read(blocking=False)
                 if data:
-                    self.output_queue.put(data)
+                    # winpty hands back decoded text; re-encode so every
+                    # session type delivers raw bytes to the Terminal
+                    if isinstance(data, str):
+                        data = data.encode('utf-8')
+                    self.output_buffer.write(data)
                 else:
                     # No data available, sleep briefly to avoid busy loop
                     import time
@@ -194,48 +204,74 @@ class LocalSession:
                 if self.running:
                     print(f"Error reading PTY output: {e}")
                 break
+        self.output_buffer.close()  # Wake the reader so it notices the session ended
     
-    def _read_unix_pty_output(self):
-        """Read output from Unix PTY"""
+    def _read_fd_output(self, fd):
+        """Pump a non-blocking fd into the output buffer, draining all that is ready per wakeup"""
         import select
         
+        os.set_blocking(fd, False)
         while self.running:
             try:
-                r, _, _ = select.select([self.master_fd], [], [], 0.1)
-                if r:
-                    data = os.read(self.master_fd, 1024)
-                    if data:
-                        self.output_queue.put(data.decode('utf-8', errors='replace'))
-                    else:
+                r, _, _ = select.select([fd], [], [], 0.1)
+                if not r:
+                    continue
+                # Take everything available, up to read_chunk_size per read
+                while True:
+                    data = os.read(fd, self.read_chunk_size)
+                    if not data:
+                        return  # EOF
+                    self.output_buffer.write(data)
+                    if len(data) < self.read_chunk_size:
                         break
+            except BlockingIOError:
+                continue  # Drained
+            except OSError as e:
+                # Linux reports EIO on the PTY master once the shell has exited
+                if self.running and e.errno != errno.EIO:
+                    print(f"Error reading output: {e}")
+                return
             except Exception as e:
                 if self.running:
-                    print(f"Error reading PTY output: {e}")
-                break
+                    print(f"Error reading output: {e}")
+                return
+    
+    def _read_unix_pty_output(self):
+        """Read output from Unix PTY"""
+        try:
+            self._read_fd_output(self.master_fd)
+        finally:
+            self.output_buffer.close()
     
     def _read_fallback_output(self):
         """Read output from subprocess (fallback)"""
-        while self.running and self.process:
-            try:
-                char = self.process.stdout.read(1)
-                if char:
-                    self.output_queue.put(char.decode('utf-8', errors='replace'))
-                else:
+        try:
+            if os.name != 'nt':
+                self._read_fd_output(self.process.stdout.fileno())
+                return
+            # Windows pipes can't be select()ed; an unbuffered read still returns
+            # whatever is available (up to read_chunk_size) as soon as there is some
+            while self.running and self.process:
+                try:
+                    data = self.process.stdout.read(self.read_chunk_size)
+                    if data:
+                        self.output_buffer.write(data)
+                    else:
+                        break
+                except Exception as e:
+                    if self.running:
+                        print(f"Error reading output: {e}")
                     break
-            except Exception as e:
-                if self.running:
-                    print(f"Error reading output: {e}")
-                break
+        finally:
+            self.output_buffer.close()
+    
+    def wait_for_output(self, timeout=None):
+        """Block until a reader thread has buffered output or the session ended"""
+        return self.output_buffer.wait(timeout)
     
     def read_output(self):
-        """Read available output"""
-        output = ""
-        try:
-            while not self.output_queue.empty():
-                output += self.output_queue.get_nowait()
-        except queue.Empty:
-            pass
-        return output
+        """Read all buffered output as raw bytes in a single slice"""
+        return self.output_buffer.read()
     
     def send_command(self, command):
         """Send command to the shell"""
@@ -245,14 +281,26 @@ class LocalSession:
                 self.process.write(command)
             elif hasattr(self, 'master_fd'):
                 # Unix PTY
-                os.write(self.master_fd, command.encode('utf-8'))
+                self._write_fd(self.master_fd, command.encode(self.charset, errors='replace'))
             elif self.process and self.process.stdin:
                 # Fallback subprocess
-                self.process.stdin.write(command.encode('utf-8'))
+                self.process.stdin.write(command.encode(self.charset, errors='replace'))
                 self.process.stdin.flush()
         except Exception as e:
             print(f"Error sending command: {e}")
     
+    def _write_fd(self, fd, data):
+        """Write all of data to a non-blocking fd, waiting while the tty input queue is full"""
+        import select
+        
+        view = memoryview(data)
+        while view:
+            try:
+                written = os.write(fd, view)
+                view = view[written:]
+            except BlockingIOError:
+                select.select([], [fd], [], 1.0)
+    
     def is_active(self):
         """Check if the session is still active"""
         if self.use_pty and hasattr(self.process, 'isalive'):
@@ -265,8 +313,17 @@ class LocalSession:
     
     def resize(self, rows, cols):
         """Resize the terminal"""
+        if (rows, cols) == self.pty_size:
+            return
+        self.pty_size = (rows, cols)
         try:
-            if self.use_pty and self.process and hasattr(self.process, 'set_size'):
+            if hasattr(self, 'master_fd'):
+                # Unix PTY: the kernel sends SIGWINCH to the shell's foreground process group
+                import fcntl
+                import struct
+                import termios
+                fcntl.ioctl(self.master_fd, termios.TIOCSWINSZ, struct.pack('HHHH', rows, cols, 0, 0))
+            elif self.use_pty and self.process and hasattr(self.process, 'set_size'):
                 # Handle cases where process might have died
                 try:
                     self.process.set_size(cols, rows)
@@ -280,6 +337,7 @@ class LocalSession:
     def close(self):
         """Close the session"""
         self.running = False
+        self.output_buffer.close()
         if self.process:
             try:
                 if self.use_pty:
@@ -293,6 +351,9 @@ class LocalSession:
                 if hasattr(self.process, 'kill'):
                     self.process.kill()
         if hasattr(self, 'master_fd'):
+            # The reader must be out of select/read before the fd number can be reused
+            if self.reader_thread is not None and self.reader_thread is not threading.current_thread():
+                self.reader_thread.join(1.0)
             try:
                 os.close(self.master_fd)
             except:
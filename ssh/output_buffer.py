@@ -0,0 +1,64 @@
+import threading
+
+
+class OutputBuffer:
+    """Preallocated byte buffer between a session's producer thread and its reader.
+
+    Producers append whole reads with write(); the reader takes everything that is
+    buffered with a single read(). One condition variable guards the buffer, so
+    there is one lock round-trip per drain instead of one per chunk. Because every
+    read() empties the buffer, the write position simply rewinds to zero and the
+    data is always one contiguous slice.
+    """
+    def __init__(self, capacity=4 * 1024 * 1024):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._size = 0  # Number of buffered bytes
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def __len__(self):
+        return self._size
+
+    def write(self, data, timeout=None):
+        """Append data, blocking while the buffer is full. Returns bytes written."""
+        data = memoryview(data)
+        written = 0
+        with self._cond:
+            while written < len(data):
+                while self._size == self.capacity and not self.closed:
+                    if not self._cond.wait(timeout):
+                        return written
+                if self.closed:
+                    return written
+
+                count = min(len(data) - written, self.capacity - self._size)
+                self._view[self._size:self._size + count] = data[written:written + count]
+                self._size += count
+                written += count
+                self._cond.notify_all()
+        return written
+
+    def read(self):
+        """Take everything that is buffered (b"" if empty)"""
+        with self._cond:
+            if not self._size:
+                return b""
+            data = bytes(self._view[:self._size])
+            self._size = 0
+            self._cond.notify_all()
+            return data
+
+    def wait(self, timeout=None):
+        """Block until data is buffered or the buffer is closed"""
+        with self._cond:
+            if not self._size and not self.closed:
+                self._cond.wait(timeout)
+            return bool(self._size) or self.closed
+
+    def close(self):
+        """Mark end of output and wake any waiting reader or producer"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
@@ -0,0 +1,129 @@
+import collections
+import json
+import threading
+import time
+from contextlib import contextmanager
+import paramiko
+
+
+class TimedTransport(paramiko.Transport):
+    """Transport that records how long its key exchange (start_client) took.
+
+    Passed to SSHClient.connect as transport_factory, so the key exchange
+    can be told apart from the authentication that follows it.
+    """
+    kex_seconds = None
+
+    def start_client(self, event=None, timeout=None):
+        start = time.perf_counter()
+        try:
+            return super().start_client(event, timeout)
+        finally:
+            self.kex_seconds = time.perf_counter() - start
+
+
+class ConnectTimings:
+    """Wall-clock time of each phase of one SSHSession.connect, in the order they ran.
+
+    Phase names: dns, tcp (or channel, through a jump host), kex, auth, shell;
+    prefixed "jumpN " for the Nth bastion, "plan retry " for the attempt
+    after a saved login (auth plan) failed and "retry " for the manual
+    re-handshake after SSHClient.connect failed. "wait" is time spent
+    waiting for another tab's login to the same host; "jumpN pooled" marks
+    a bastion login that was reused rather than made.
+    """
+
+    def __init__(self, host, port, username):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.started = time.time()
+        self.phases = []  # (name, seconds, ok)
+        self.ok = None
+        self.reused = False  # Opened as a channel on a shared transport
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.phases.append((name, time.perf_counter() - start, False))
+            raise
+        self.phases.append((name, time.perf_counter() - start, True))
+
+    def add(self, name, seconds, ok=True):
+        self.phases.append((name, seconds, ok))
+
+    def finish(self, ok, reused):
+        self.ok = ok
+        self.reused = reused
+
+    def total(self):
+        return sum(seconds for _, seconds, _ in self.phases)
+
+    def slowest(self):
+        return max(self.phases, key=lambda phase: phase[1])[0] if self.phases else None
+
+    def summary(self):
+        """One line: each phase in ms, failed phases marked"""
+        return ", ".join(f"{name} {seconds * 1000:.0f}ms{'' if ok else ' (failed)'}"
+                         for name, seconds, ok in self.phases)
+
+    def tooltip(self):
+        lines = [f"{self.username}@{self.host}:{self.port}",
+                 f"Connected in {self.total() * 1000:.0f}ms" + (" (shared connection)" if self.reused else "")]
+        lines += [f"  {name:14s} {seconds * 1000:7.1f}ms{'' if ok else '  failed'}"
+                  for name, seconds, ok in self.phases]
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {"time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "host": self.host, "port": self.port, "username": self.username,
+                "ok": self.ok, "reused": self.reused,
+                "total_ms": round(self.total() * 1000, 3),
+                "phases": [{"name": name, "ms": round(seconds * 1000, 3), "ok": ok}
+                           for name, seconds, ok in self.phases]}
+
+
+class ConnectionLog:
+    """The most recent connection attempts' timings, newest last"""
+
+    def __init__(self, maxlen=1000):
+        self._entries = collections.deque(maxlen=maxlen)
+        self._lock = threading.Lock()  # Sessions connect on worker threads
+        self._callbacks = []
+
+    def add(self, timings):
+        with self._lock:
+            self._entries.append(timings)
+        for callback in list(self._callbacks):
+            try:
+                callback(timings)
+            except Exception as e:
+                print(f"Error in connection log callback: {e}")
+
+    def entries(self):
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def add_callback(self, callback):
+        """Called (on the connecting thread) with each new ConnectTimings"""
+        if callback not in self._callbacks:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def export_json(self, path):
+        with open(path, "w") as f:
+            json.dump([timings.to_dict() for timings in self.entries()], f, indent=2)
+
+
+# Every SSHSession.connect in the process is recorded here
+connection_log = ConnectionLog()
@@ -0,0 +1,164 @@
+import threading
+
+
+def jump_hops(proxy_jump_settings, username=None):
+    """Bastions to go through, in order: the configured jump host, then any further hops.
+
+    Like ssh -J, a hop given without a user logs in as the jump host's user,
+    or as `username` (the session's) if that isn't set either.
+    """
+    if not proxy_jump_settings or not proxy_jump_settings.get("enabled"):
+        return []
+    first = {name: proxy_jump_settings.get(name) for name in ("host", "port", "username", "password")}
+    first["username"] = first["username"] or username
+    return [first] + [dict(hop, username=hop.get("username") or first["username"])
+                      for hop in proxy_jump_settings.get("hops") or []]
+
+
+def hop_key(hop, via=None):
+    """Identify a bastion transport: user@host:port reached through the hop keyed via"""
+    return (hop.get("host"), int(hop.get("port") or 22), hop.get("username"), via)
+
+
+def jump_chain_key(proxy_jump_settings, username=None):
+    """Key of the last bastion in the chain (it nests the ones before it), or None"""
+    key = None
+    for hop in jump_hops(proxy_jump_settings, username):
+        key = hop_key(hop, key)
+    return key
+
+
+def transport_key(host, port, username, proxy_jump_settings=None):
+    """Identify an authenticated transport: same user on the same host, reached the same way"""
+    return (host, int(port), username, jump_chain_key(proxy_jump_settings, username))
+
+
+class _PooledTransport:
+    def __init__(self, transport, resources):
+        self.transport = transport
+        self.resources = resources  # Closed in order when the last tab goes away
+        self.refs = 1
+        self.expiry = None  # Timer closing the transport once it has been idle long enough
+
+
+class PoolReference:
+    """A reference held in a TransportPool; close() releases it, so it can sit among resources"""
+
+    def __init__(self, pool, key, transport):
+        self.pool = pool
+        self.key = key
+        self.transport = transport
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.release(self.key, self.transport)
+            self.pool = None
+
+
+class TransportPool:
+    """Authenticated paramiko Transports shared by the tabs open to the same host.
+
+    Like an OpenSSH ControlMaster: the first session to a host registers its
+    transport, later sessions open another channel on it instead of a new TCP
+    connection, key exchange and authentication. Each session holds a
+    reference; the transport is closed when the last one is released, or
+    idle_timeout seconds after that if a timeout is set.
+    """
+
+    def __init__(self, idle_timeout=0):
+        self.idle_timeout = idle_timeout
+        self._entries = {}
+        self._connecting = {}  # key -> lock held while a session logs in for that key
+        self._lock = threading.Lock()
+
+    def connecting(self, key):
+        """Lock to hold while checking for and creating the transport for key.
+
+        Sessions opened at the same time to the same host then wait for one
+        login and share it, instead of each logging in.
+        """
+        with self._lock:
+            return self._connecting.setdefault(key, threading.Lock())
+
+    def acquire(self, key):
+        """Take a reference to the live transport for key, or None if there is none"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.transport.is_active():
+                entry.refs += 1
+                if entry.expiry is not None:
+                    entry.expiry.cancel()
+                    entry.expiry = None
+                return entry.transport
+            del self._entries[key]  # The server dropped it; nobody can open channels on it
+            if entry.expiry is not None:
+                entry.expiry.cancel()
+        self._close(entry)
+        return None
+
+    def register(self, key, transport, resources):
+        """Share a freshly authenticated transport, holding one reference for the caller.
+
+        Returns False (and shares nothing) if another live transport already
+        has the key; the caller then keeps sole ownership of its own.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.transport.is_active():
+                return False
+            self._entries[key] = _PooledTransport(transport, resources)
+            if entry is not None and entry.expiry is not None:
+                entry.expiry.cancel()
+        if entry is not None:
+            self._close(entry)
+        return True
+
+    def release(self, key, transport):
+        """Drop a reference; closes the transport when it was the last one (after idle_timeout)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.transport is not transport:
+                return
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            if self.idle_timeout > 0:
+                entry.expiry = threading.Timer(self.idle_timeout, self._expire, (key, entry))
+                entry.expiry.daemon = True
+                entry.expiry.start()
+                return
+            del self._entries[key]
+        self._close(entry)
+
+    def _expire(self, key, entry):
+        with self._lock:
+            if self._entries.get(key) is not entry or entry.refs > 0:
+                return  # Reused (or replaced) while the timer was due
+            del self._entries[key]
+        print(f"DEBUG: Closing idle transport to {key[2]}@{key[0]}:{key[1]}")
+        self._close(entry)
+
+    def has(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.transport.is_active()
+
+    def refs(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.refs if entry is not None else 0
+
+    def _close(self, entry):
+        for resource in entry.resources:
+            try:
+                resource.close()
+            except Exception as e:
+                print(f"DEBUG: Error closing pooled transport: {e}")
+
+
+# Shared by every SSHSession in the process: target hosts, closed with their last
+# tab, and bastions, kept for a while after it so reopening a tab needs no new login
+transport_pool = TransportPool()
+jump_pool = TransportPool(idle_timeout=300)
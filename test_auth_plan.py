@@ -0,0 +1,194 @@
+"""
+Saved login (auth plan) tests and benchmark.
+
+SSHSession records which auth methods, and which key, logged in to each
+user@host:port (ssh.auth_plan.auth_plans). The next connect follows that
+plan on a single transport instead of SSHClient.connect's attempts and the
+manual re-handshake after them. Decrypted keys stay in ssh.auth_plan.key_cache
+for the life of the app.
+"""
+import os
+import tempfile
+import time
+
+import paramiko
+from conftest import (EchoServer, SecondFactorServer, ShellServer, close_all, idle_timeout, phase_names,
+                      use_scratch_auth_plans)
+from ssh.auth_plan import AuthPlanStore, auth_plans, key_cache, plan_key
+from ui.settings_manager import SettingsManager
+
+
+class SlowSecondFactorServer(SecondFactorServer):
+    """Each auth request takes auth_delay, like a remote PAM/MFA check"""
+
+    def check_auth_password(self, username, password):
+        time.sleep(self.owner.auth_delay)
+        return super().check_auth_password(username, password)
+
+    def check_auth_interactive_response(self, responses):
+        time.sleep(self.owner.auth_delay)
+        return super().check_auth_interactive_response(responses)
+
+
+class MfaServer(EchoServer):
+    interface = SlowSecondFactorServer
+
+
+class KeyOnlyServer(ShellServer):
+    def get_allowed_auths(self, username):
+        return "publickey"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_FAILED  # paramiko asks whatever get_allowed_auths says
+
+    def check_auth_publickey(self, username, key):
+        if key.get_base64() == self.owner.client_key.get_base64():
+            self.owner.logins += 1
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+
+class KeyServer(EchoServer):
+    """Accepts only client_key, written (encrypted with the session password) to key_file"""
+    interface = KeyOnlyServer
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.client_key = paramiko.RSAKey.generate(2048)
+        self.key_file = os.path.join(tempfile.mkdtemp(), "id_rsa")
+        self.client_key.write_private_key_file(self.key_file, password=self.password)
+
+    def session(self, share_transport=False, jump=None):
+        session = super().session(share_transport, jump)
+        session.key_filename = self.key_file
+        return session
+
+
+def test_mfa_host_logs_in_on_one_transport_next_time():
+    server = MfaServer()
+    key = plan_key("127.0.0.1", server.port, "user")
+    first, second = server.session(share_transport=False), server.session(share_transport=False)
+    try:
+        assert first.connect()
+        assert server.connections == 2  # SSHClient.connect, then the manual re-handshake
+        assert auth_plans.get(key) == [{"method": "keyboard-interactive"}]
+
+        assert second.connect()
+        assert server.connections == 3 and server.logins == 2
+        assert phase_names(second) == ["dns", "tcp", "kex", "auth", "shell"]
+        assert all(ok for _, _, ok in second.timings.phases)
+    finally:
+        close_all([first, second], [server])
+
+
+def test_key_is_remembered_and_decrypted_once():
+    server = KeyServer()
+    key = plan_key("127.0.0.1", server.port, "user")
+    sessions = [server.session() for _ in range(3)]
+    loads = key_cache.loads
+    try:
+        for session in sessions:
+            assert session.connect()
+        assert auth_plans.get(key) == [{"method": "publickey", "key_file": server.key_file}]
+        assert server.logins == 3 and server.connections == 3
+        assert key_cache.loads == loads + 1
+    finally:
+        close_all(sessions, [server])
+
+
+def test_default_key_is_found_by_its_public_half(monkeypatch, tmp_path):
+    server = KeyServer()
+    server.client_key = paramiko.ECDSAKey.generate()
+    ssh_dir = tmp_path / ".ssh"
+    ssh_dir.mkdir()
+    server.client_key.write_private_key_file(str(ssh_dir / "id_ecdsa"), password=server.password)
+    with open(ssh_dir / "id_ecdsa.pub", "w") as f:
+        f.write(f"{server.client_key.get_name()} {server.client_key.get_base64()} user@host\n")
+    other = paramiko.RSAKey.generate(1024)  # Tried first, and refused
+    other.write_private_key_file(str(ssh_dir / "id_rsa"), password=server.password)
+    monkeypatch.setenv("HOME", str(tmp_path))
+    session = server.session()
+    session.key_filename = None  # SSHClient.connect finds the key in ~/.ssh itself
+    loads = key_cache.loads
+    try:
+        assert session.connect()
+        key = plan_key("127.0.0.1", server.port, "user")
+        assert auth_plans.get(key) == [{"method": "publickey", "key_file": str(ssh_dir / "id_ecdsa")}]
+        assert key_cache.loads == loads  # No key was decrypted just to record the plan
+    finally:
+        close_all([session], [server])
+
+
+def test_plans_live_next_to_the_settings():
+    assert os.path.dirname(AuthPlanStore().filename) == os.path.dirname(SettingsManager().settings_file)
+
+
+def test_stale_plan_is_replaced():
+    server = KeyServer()
+    key = plan_key("127.0.0.1", server.port, "user")
+    auth_plans.record(key, [{"method": "password"}])  # The host has since gone key-only
+    session = server.session()
+    try:
+        assert session.connect()
+        assert auth_plans.get(key) == [{"method": "publickey", "key_file": server.key_file}]
+        assert "plan retry dns" in phase_names(session)  # The failed plan cost one extra handshake
+    finally:
+        close_all([session], [server])
+
+
+def test_bastion_login_is_planned_too():
+    bastion, target = EchoServer(), EchoServer()
+    sessions = [target.session(jump=[bastion], share_transport=False) for _ in range(2)]
+    with idle_timeout(0):
+        try:
+            assert sessions[0].connect()
+            assert auth_plans.get(plan_key("127.0.0.1", bastion.port, "user")) == [{"method": "password"}]
+            sessions[0].close()
+            assert sessions[1].connect() and bastion.logins == 2
+        finally:
+            close_all(sessions, [bastion, target])
+
+
+def test_plans_persist_and_hold_no_secrets():
+    path = os.path.join(tempfile.mkdtemp(), "auth_plans.json")
+    store = AuthPlanStore(path)
+    store.record("u@h:22", [{"method": "publickey", "key_file": "/k"}, {"method": "keyboard-interactive"}])
+    assert AuthPlanStore(path).get("u@h:22")[1] == {"method": "keyboard-interactive"}
+    store.forget("u@h:22")
+    assert AuthPlanStore(path).get("u@h:22") is None
+    with open(path) as f:
+        assert "secret" not in f.read()
+
+
+def benchmark_mfa_reconnect(runs=10, auth_delay=0.1):
+    """Connect time and handshakes to a password+MFA host, without and with the saved plan"""
+    print(f"\n=== Reconnect to a password+MFA host, {runs} times (each auth step takes {auth_delay * 1000:.0f}ms) ===")
+    for planned in (False, True):
+        server = MfaServer(auth_delay=auth_delay)
+        key = plan_key("127.0.0.1", server.port, "user")
+        times = []
+        for _ in range(runs):
+            if not planned:
+                auth_plans.forget(key)
+            session = server.session(share_transport=False)
+            start = time.perf_counter()
+            assert session.connect()
+            times.append(time.perf_counter() - start)
+            session.close()
+        steady = sorted(times[1:])[len(times[1:]) // 2]
+        label = "saved login" if planned else "every method"
+        print(f"{label:12s}: {steady * 1000:7.1f}ms median reconnect, "
+              f"{server.connections / runs:.1f} handshakes per connect")
+        server.close()
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("Saved login benchmark")
+    print("=" * 60)
+    benchmark_mfa_reconnect()
+
+
+if __name__ == "__main__":
+    use_scratch_auth_plans()
+    run_all_benchmarks()
@@ -0,0 +1,294 @@
+"""
+Parallel connection tests and benchmark.
+
+MainWindow connects sessions through a ConnectionExecutor: at most
+max_parallel_connections are in connect() at once, a batch opened from the
+sidebar ("Open All in Folder", "Open Selected") shows per-connection progress,
+and credential prompts from parallel connections are asked one at a time,
+each login's prompts together.
+"""
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import paramiko
+from PyQt6.QtCore import QTimer
+from conftest import EchoServer, ShellServer, get_app, use_scratch_auth_plans
+from ssh.backend import SSHSession
+from ui.connection_executor import CONNECTED, FAILED, ConnectionExecutor, ConnectionProgress
+from ui.mainwindow import MainWindow
+
+
+class SlowSession:
+    """connect() takes `delay` seconds; records how many sessions were connecting at once"""
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def __init__(self, delay, ok=True):
+        self.delay = delay
+        self.ok = ok
+
+    def connect(self):
+        with SlowSession.lock:
+            SlowSession.active += 1
+            SlowSession.peak = max(SlowSession.peak, SlowSession.active)
+        time.sleep(self.delay)
+        with SlowSession.lock:
+            SlowSession.active -= 1
+        return self.ok
+
+    def close(self):
+        pass
+
+
+class CodeAndPinServer(ShellServer):
+    """Keyboard-interactive login asking for a one-time code and a PIN in one request"""
+
+    def get_allowed_auths(self, username):
+        return "keyboard-interactive"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_FAILED
+
+    def check_auth_interactive(self, username, submethods):
+        return paramiko.server.InteractiveQuery("", "", ("Code: ", False), ("PIN: ", False))
+
+    def check_auth_interactive_response(self, responses):
+        if list(responses) == ["123456", "0000"]:
+            self.owner.logins += 1
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+
+class CodeAndPinEchoServer(EchoServer):
+    interface = CodeAndPinServer
+
+
+def wait_until(app, condition, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        app.processEvents()
+        time.sleep(0.005)
+
+
+def make_window():
+    """MainWindow without the local shell tab (no PowerShell here)"""
+    original = MainWindow.add_local_terminal_tab
+    MainWindow.add_local_terminal_tab = lambda self: None
+    try:
+        return MainWindow()
+    finally:
+        MainWindow.add_local_terminal_tab = original
+
+
+def close_window(window):
+    while window.tabs.count():
+        window.close_tab(0)
+    window.connector.shutdown()
+    window.close()
+
+
+def test_executor_caps_parallel_connects_and_reports_progress(app):
+    SlowSession.peak = 0
+    executor = ConnectionExecutor(max_workers=3)
+    progress = ConnectionProgress(executor)
+    sessions = [SlowSession(0.05, ok=i != 4) for i in range(10)]
+    done = []
+    executor.connected.connect(lambda session, title: done.append(title))
+    executor.failed.connect(lambda session, title: done.append(title))
+    for i, session in enumerate(sessions):
+        progress.add(session, f"host{i}")
+        executor.submit(session, f"host{i}")
+    wait_until(app, lambda: len(done) == 10 and progress.finished_all())
+    assert SlowSession.peak == 3
+    assert progress.counts()[CONNECTED] == 9 and progress.counts()[FAILED] == 1
+    assert progress.items[sessions[4]].text(1) == FAILED
+    executor.shutdown()
+
+
+def test_batch_takes_about_as_long_as_the_slowest_connection(app):
+    executor = ConnectionExecutor(max_workers=20)
+    rng = random.Random(2)
+    sessions = [SlowSession(rng.uniform(0.05, 0.3)) for _ in range(20)]
+    done = []
+    executor.connected.connect(lambda session, title: done.append(title))
+    start = time.perf_counter()
+    for session in sessions:
+        executor.submit(session, "host")
+    wait_until(app, lambda: len(done) == 20)
+    elapsed = time.perf_counter() - start
+    assert elapsed < max(s.delay for s in sessions) + 0.5 < sum(s.delay for s in sessions)
+    executor.shutdown()
+
+
+def test_prompts_from_parallel_connections_come_one_at_a_time(app):
+    window = make_window()
+    window.mfa_requested.disconnect()
+    showing = []
+    peak = [0]
+
+    def answer_later(title, instructions, prompt, echo, event_container):
+        showing.append(prompt)
+        peak[0] = max(peak[0], len(showing))
+
+        def answer():
+            showing.remove(prompt)
+            event_container["response"] = "123456"
+            event_container["event"].set()
+        QTimer.singleShot(20, answer)
+
+    window.mfa_requested.connect(answer_later)
+    answers = []
+    threads = [threading.Thread(target=lambda i=i: answers.append(
+        window.get_mfa_response("MFA", "", [(f"Code {i}: ", False), (f"PIN {i}: ", False)])))
+        for i in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        wait_until(app, lambda: len(answers) == 4)
+        assert peak[0] == 1
+        assert answers == [["123456", "123456"]] * 4
+    finally:
+        close_window(window)
+
+
+def test_each_login_asks_its_prompts_together(app):
+    """SSHSession asks for a code and a PIN with separate calls; parallel logins must not interleave them"""
+    server = CodeAndPinEchoServer()
+    executor = ConnectionExecutor(max_workers=4)
+    asked = []
+
+    def answerer(name):
+        def answer(title, instructions, prompts):
+            asked.append(name)
+            time.sleep(0.02)  # The user typing
+            return ["123456" if prompts[0][0] == "Code: " else "0000"]
+        return answer
+
+    sessions = [SSHSession("127.0.0.1", server.port, "user", auth_callback=answerer(i), share_transport=False,
+                           exchange_lock=executor.exchange_lock) for i in range(4)]
+    done = []
+    executor.connected.connect(lambda session, title: done.append(session))
+    executor.failed.connect(lambda session, title: done.append(None))
+    try:
+        for i, session in enumerate(sessions):
+            executor.submit(session, str(i))
+        wait_until(app, lambda: len(done) == 4)
+        assert None not in done and server.logins == 4
+        # Each session's two prompts in a row
+        assert asked[::2] == asked[1::2] and sorted(asked[::2]) == [0, 1, 2, 3]
+    finally:
+        executor.shutdown()
+        for session in sessions:
+            session.close()
+        server.close()
+
+
+def test_closing_the_window_releases_prompts_and_queued_connects(app):
+    window = make_window()
+    window.mfa_requested.disconnect()  # Nobody answers
+    asked = []
+    window.mfa_requested.connect(lambda *args: asked.append(args))
+    window.connector.set_max_workers(1)
+    sessions = [SlowSession(0.2) for _ in range(3)]
+    connected = []
+    window.connector.connected.disconnect()
+    window.connector.connected.connect(lambda session, title: connected.append(session))
+    answers = []
+    prompt = threading.Thread(target=lambda: answers.append(window.get_mfa_response("MFA", "", [("Code: ", False)])))
+    try:
+        for session in sessions:
+            window.connector.submit(session, "host")
+        prompt.start()
+        wait_until(app, lambda: asked)
+        start = time.perf_counter()
+        window.close()
+        prompt.join(5.0)
+        assert answers == [[""]] and time.perf_counter() - start < 1.0
+        time.sleep(0.5)
+        app.processEvents()
+        assert connected == []  # The one in progress is closed, the queued ones never start
+        assert window.get_password_response("Password:") is None
+    finally:
+        close_window(window)
+
+
+def test_exit_does_not_wait_for_a_connect():
+    script = ("import time\n"
+              "from ui.connection_executor import ConnectionExecutor\n"
+              "class Stuck:\n"
+              "    def connect(self):\n"
+              "        time.sleep(30)\n"
+              "ConnectionExecutor().submit(Stuck(), 'host')\n"
+              "time.sleep(0.2)\n")
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=20,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert time.perf_counter() - start < 10
+
+
+def test_open_sessions_connects_a_folder_in_parallel(app):
+    servers = [EchoServer(auth_delay=0.2) for _ in range(6)]
+    window = make_window()
+    window.connector.set_max_workers(6)
+    data = [{"name": f"server{i}", "host": "127.0.0.1", "port": server.port, "username": "user",
+             "password": server.password} for i, server in enumerate(servers)]
+    data.append({"name": "down", "host": "127.0.0.1", "port": 1, "username": "user", "password": "x"})
+    try:
+        start = time.perf_counter()
+        window.open_sessions(data)
+        wait_until(app, lambda: window.tabs.count() == 6 and not window.batch_sessions)
+        # Six 200ms logins at once, not one after another
+        assert time.perf_counter() - start < 1.2
+        assert all(server.logins == 1 for server in servers)
+        # Only the current tab renders; the others opened behind it are suspended
+        terminals = [window.tabs.widget(i) for i in range(window.tabs.count())]
+        assert [t.rendering_suspended for t in terminals] == [t is not window.tabs.currentWidget() for t in terminals]
+    finally:
+        close_window(window)
+        for server in servers:
+            server.close()
+
+
+def benchmark_open_folder(count=50, workers=(1, 8, 50)):
+    """Time to open a folder of sessions whose logins take 0.2-0.6s, by parallel limit"""
+    app = get_app()
+    print(f"\n=== Open {count} sessions (logins 0.2-0.6s) ===")
+    rng = random.Random(1)
+    delays = [rng.uniform(0.2, 0.6) for _ in range(count)]
+    print(f"Slowest login {max(delays):.2f}s, all logins together {sum(delays):.1f}s")
+    for limit in workers:
+        servers = [EchoServer(auth_delay=delay) for delay in delays]
+        executor = ConnectionExecutor(max_workers=limit)
+        done = []
+        executor.connected.connect(lambda session, title: done.append(session))
+        start = time.perf_counter()
+        for server in servers:
+            executor.submit(server.session(), "127.0.0.1")
+        wait_until(app, lambda: len(done) == count, timeout=120)
+        elapsed = time.perf_counter() - start
+        print(f"{limit:3d} at a time: {elapsed:6.2f}s")
+        for session in done:
+            session.close()
+        for server in servers:
+            server.close()
+        executor.shutdown()
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("Parallel connection benchmark")
+    print("=" * 60)
+    benchmark_open_folder()
+
+
+if __name__ == "__main__":
+    use_scratch_auth_plans()
+    run_all_benchmarks()
@@ -0,0 +1,157 @@
+"""
+Connection phase timing tests and benchmark.
+
+SSHSession.connect records how long each phase took (name lookup, TCP
+connect, key exchange, authentication, shell; per bastion for jump hosts;
+the attempt after a saved login fails and the manual re-handshake, each
+under a prefix of its own) in session.timings.
+Every attempt goes to ssh.timings.connection_log, shown in File > Connection
+Log and exportable as JSON.
+"""
+import json
+import os
+import tempfile
+
+from conftest import (EchoServer, SecondFactorEchoServer, close_all, idle_timeout, phase_names,
+                      use_scratch_auth_plans)
+from ssh.auth_plan import auth_plans, plan_key
+from ssh.timings import ConnectionLog, connection_log
+
+def test_direct_connect_records_every_phase():
+    server = EchoServer(auth_delay=0.1)
+    session = server.session(share_transport=False)
+    try:
+        assert session.connect()
+        assert phase_names(session) == ["dns", "tcp", "kex", "auth", "shell"]
+        assert all(ok for _, _, ok in session.timings.phases)
+        assert dict((name, seconds) for name, seconds, _ in session.timings.phases)["auth"] >= 0.1
+        assert session.timings.slowest() == "auth"
+        assert session.timings.ok and session.timings in connection_log.entries()
+        assert "auth" in session.timings.tooltip()
+    finally:
+        close_all([session], [server])
+
+
+def test_failed_connect_is_logged_with_the_failed_phase():
+    session = EchoServer(password="other").session(share_transport=False)
+    session.host, session.port = "127.0.0.1", 1  # Nothing listens there
+    assert not session.connect()
+    assert session.timings.ok is False
+    assert session.timings.phases[-1][0] == "tcp" and not session.timings.phases[-1][2]
+    assert connection_log.entries()[-1] is session.timings
+
+
+def test_jump_hops_and_shared_channels_are_timed():
+    outer, inner, target = EchoServer(), EchoServer(), EchoServer()
+    sessions = [target.session(jump=[outer, inner]) for _ in range(2)]
+    with idle_timeout(0):
+        try:
+            assert sessions[0].connect()
+            assert phase_names(sessions[0]) == [
+                "jump1 dns", "jump1 tcp", "jump1 kex", "jump1 auth",
+                "jump2 channel", "jump2 kex", "jump2 auth",
+                "channel", "kex", "auth", "shell"]
+            # The second tab opens a channel on the first one's transport
+            assert sessions[1].connect() and phase_names(sessions[1]) == ["shell"]
+            assert sessions[1].timings.reused and "shared connection" in sessions[1].timings.tooltip()
+        finally:
+            close_all(sessions, [outer, inner, target])
+
+
+def test_pooled_bastion_is_marked():
+    bastion, target_a, target_b = EchoServer(), EchoServer(), EchoServer()
+    sessions = [target_a.session(jump=[bastion]), target_b.session(jump=[bastion])]
+    with idle_timeout(0):
+        try:
+            assert sessions[0].connect() and sessions[1].connect()
+            assert phase_names(sessions[1]) == ["jump1 pooled", "channel", "kex", "auth", "shell"]
+        finally:
+            close_all(sessions, [bastion, target_a, target_b])
+
+
+def test_fallback_rehandshake_is_timed_separately():
+    server = SecondFactorEchoServer()
+    session = server.session(share_transport=False)
+    try:
+        assert session.connect()
+        names = phase_names(session)
+        assert names == ["dns", "tcp", "kex", "auth", "shell",
+                         "retry dns", "retry tcp", "retry kex", "retry auth", "retry shell"]
+        failed = [name for name, _, ok in session.timings.phases if not ok]
+        assert failed == ["auth", "shell"]  # SSHClient.connect's partial login
+        assert server.connections == 2 and server.logins == 1
+    finally:
+        close_all([session], [server])
+
+
+def test_each_attempt_after_a_failed_plan_is_named_apart():
+    server = SecondFactorEchoServer()
+    auth_plans.record(plan_key("127.0.0.1", server.port, "user"), [{"method": "publickey", "key_file": "/missing"}])
+    session = server.session(share_transport=False)
+    try:
+        assert session.connect()
+        # The saved plan, SSHClient.connect after it, then the keyboard-interactive re-handshake
+        assert phase_names(session) == ["dns", "tcp", "kex", "auth",
+                                        "plan retry dns", "plan retry tcp", "plan retry kex", "plan retry auth",
+                                        "plan retry shell",
+                                        "retry dns", "retry tcp", "retry kex", "retry auth", "retry shell"]
+        assert server.connections == 3 and server.logins == 1
+    finally:
+        close_all([session], [server])
+
+
+def test_log_keeps_the_latest_and_exports_json():
+    server = EchoServer()
+    log = ConnectionLog(maxlen=2)
+    sessions = [server.session(share_transport=False) for _ in range(3)]
+    path = os.path.join(tempfile.mkdtemp(), "connections.json")
+    try:
+        for session in sessions:
+            assert session.connect()
+            log.add(session.timings)
+        assert log.entries() == [sessions[1].timings, sessions[2].timings]
+        log.export_json(path)
+        with open(path) as f:
+            exported = json.load(f)
+        assert [entry["port"] for entry in exported] == [server.port] * 2
+        assert [phase["name"] for phase in exported[0]["phases"]] == ["dns", "tcp", "kex", "auth", "shell"]
+        assert exported[0]["ok"] and exported[0]["total_ms"] > 0
+    finally:
+        os.remove(path)
+        close_all(sessions, [server])
+
+
+def benchmark_connect_phases(runs=20, auth_delay=0.05):
+    """Median time per phase of direct, jump-host and shared connections"""
+    print(f"\n=== Connection phases, median of {runs} connects (login takes {auth_delay * 1000:.0f}ms) ===")
+    with idle_timeout(0):
+        for label, jump, share in (("direct", False, False), ("via bastion", True, False),
+                                   ("shared", False, True)):
+            bastion = EchoServer(auth_delay=auth_delay)
+            target = EchoServer(auth_delay=auth_delay, max_sessions=runs + 1)
+            phases = {}
+            keep = target.session() if share else None  # Holds the transport the others share
+            if keep:
+                assert keep.connect()
+            for _ in range(runs):
+                session = target.session(jump=[bastion] if jump else None, share_transport=share)
+                assert session.connect()
+                for name, seconds, _ in session.timings.phases:
+                    phases.setdefault(name, []).append(seconds * 1000)
+                session.close()
+            medians = {name: sorted(values)[len(values) // 2] for name, values in phases.items()}
+            print(f"{label:12s}: {sum(medians.values()):7.1f}ms  " +
+                  ", ".join(f"{name} {ms:.1f}" for name, ms in medians.items()))
+            close_all([keep] if keep else [], [bastion, target])
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("Connection phase timing benchmark")
+    print("=" * 60)
+    benchmark_connect_phases()
+
+
+if __name__ == "__main__":
+    use_scratch_auth_plans()
+    run_all_benchmarks()
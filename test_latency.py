@@ -0,0 +1,154 @@
+"""
+Keystroke latency tests and benchmark.
+
+Each tab's LatencyTracker times keys from send_command to the first output
+after them (network) and from that output to the frame that shows it
+(render). The tests type into a session that echoes after a fixed delay;
+the benchmark reports the split for a few simulated link delays.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtTest import QTest
+from conftest import get_app, pump
+from ui.latency import BUCKETS_MS, LatencyTracker
+from ui.terminal import Terminal
+
+
+class EchoSession:
+    """Session that echoes what is sent after `delay` seconds, like a remote shell"""
+    charset = "utf-8"
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.running = True
+        self._due = []  # (time, bytes)
+        self._cond = threading.Condition()
+
+    def send_command(self, command):
+        with self._cond:
+            self._due.append((time.perf_counter() + self.delay, command.encode()))
+            self._cond.notify_all()
+
+    def wait_for_output(self, timeout=None):
+        deadline = time.perf_counter() + (timeout or 0)
+        with self._cond:
+            while self.running:
+                now = time.perf_counter()
+                if self._due and self._due[0][0] <= now:
+                    return True
+                if now >= deadline:
+                    return False
+                wake = min(deadline, self._due[0][0]) if self._due else deadline
+                self._cond.wait(wake - now)
+        return True
+
+    def read_output(self):
+        now = time.perf_counter()
+        with self._cond:
+            ready = [data for due, data in self._due if due <= now]
+            self._due = [(due, data) for due, data in self._due if due > now]
+        return b"".join(ready) or None
+
+    def is_active(self):
+        return self.running
+
+    def close(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+
+
+def type_keys(app, terminal, count, pause=0.03):
+    for i in range(count):
+        QTest.keyClick(terminal, Qt.Key(Qt.Key.Key_A + i % 26))
+        pump(app, pause)
+
+
+def test_tracker_waits_for_the_frame_that_shows_the_echo():
+    tracker = LatencyTracker()
+    tracker.frame_drawn(0)
+    tracker.key_sent()
+    tracker.key_sent()
+    tracker.output_received(10)
+    tracker.frame_drawn(5)  # An older snapshot: the echo is not on screen yet
+    assert len(tracker.samples) == 0
+    tracker.frame_drawn(10)
+    assert len(tracker.samples) == 2
+    tracker.output_received(20)  # Output nobody typed for
+    tracker.frame_drawn(20)
+    assert len(tracker.samples) == 2
+
+    summary = tracker.summary()
+    assert summary["total"]["p50"] >= summary["network"]["p50"]
+    histogram = tracker.histogram()
+    assert len(histogram["total"]) == len(BUCKETS_MS) + 1 and sum(histogram["render"]) == 2
+    assert json.loads(json.dumps(tracker.to_dict()))["samples"] == 2
+
+
+def test_typing_records_network_and_render_latency(app):
+    session = EchoSession(delay=0.02)
+    terminal = Terminal(session)
+    terminal.resize(500, 300)
+    terminal.show()
+    pump(app, 0.1)
+    try:
+        type_keys(app, terminal, 20)
+        pump(app, 0.1)
+        assert len(terminal.latency.samples) == 20
+        summary = terminal.latency.summary()
+        assert 20 <= summary["network"]["p50"] < 200
+        assert summary["render"]["p50"] < 100
+        assert "abcdefghijklmnopqrst" in terminal.screen.display[0]
+        assert any(line.startswith("Echo: p50") for line in terminal.stats_lines())
+
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            terminal.latency.export_json(path)
+            with open(path) as f:
+                exported = json.load(f)
+            assert exported["samples"] == 20 and len(exported["raw_ms"]) == 20
+            assert "keys" in terminal.latency.report()
+        finally:
+            os.remove(path)
+    finally:
+        session.close()
+        terminal.close()
+
+
+def benchmark_echo_latency(keys=100, delays=(0.0, 0.02, 0.05)):
+    """Network/render split of keystroke latency for simulated link delays"""
+    app = get_app()
+    print(f"\n=== Keystroke to echo, {keys} keys per link delay ===")
+    for delay in delays:
+        session = EchoSession(delay)
+        terminal = Terminal(session)
+        terminal.resize(800, 500)
+        terminal.show()
+        pump(app, 0.1)
+        type_keys(app, terminal, keys, pause=max(0.02, delay + 0.01))
+        pump(app, 0.2)
+        summary = terminal.latency.summary()
+        parts = "  ".join(f"{name} p50 {summary[name]['p50']:6.2f} p99 {summary[name]['p99']:6.2f}ms"
+                          for name in ("network", "render", "total"))
+        print(f"Link {delay * 1000:3.0f}ms: {len(terminal.latency.samples):3d} samples  {parts}")
+        session.close()
+        terminal.close()
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("Keystroke latency benchmark")
+    print("=" * 60)
+    benchmark_echo_latency()
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
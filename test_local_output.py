@@ -0,0 +1,194 @@
+"""
+LocalSession output buffering test and microbenchmark.
+
+Pushes data through the real _read_*_output producer methods into the
+OutputBuffer and drains it the way SSHReaderThread does
+(wait_for_output + read_output), reporting MB/s. The old queue.Queue +
+concatenation drain is timed on the same chunks for comparison, and
+`yes | head -c 500M` is run in a real local PTY session.
+"""
+import os
+import queue
+import threading
+import time
+
+from ssh.local_session import LocalSession
+from ssh.output_buffer import OutputBuffer
+
+
+class PipeProcess:
+    """Stand-in for subprocess.Popen whose stdout is the read end of a pipe"""
+    def __init__(self, read_fd):
+        self.stdout = os.fdopen(read_fd, 'rb', buffering=0)
+
+    def poll(self):
+        return None
+
+
+def test_output_buffer_drains_in_one_read():
+    buffer = OutputBuffer(capacity=16)
+    buffer.write(b"abc")
+    buffer.write(b"def")
+    assert buffer.read() == b"abcdef"
+    assert buffer.read() == b""
+    buffer.close()
+    assert buffer.wait(0) and buffer.write(b"late") == 0
+
+
+def test_output_buffer_blocks_producer_until_drained():
+    buffer = OutputBuffer(capacity=4)
+    payload = b"0123456789"
+    received = []
+
+    def consume():
+        while len(b"".join(received)) < len(payload):
+            if buffer.wait(1.0):
+                received.append(buffer.read())
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    assert buffer.write(payload, timeout=2.0) == len(payload)
+    consumer.join(2.0)
+    assert b"".join(received) == payload
+
+
+def test_fallback_reader_takes_whole_chunks():
+    read_fd, write_fd = os.pipe()
+    session = LocalSession("test", read_chunk_size=4096)
+    session.process = PipeProcess(read_fd)
+    session.running = True
+    writes = []
+    original_write = session.output_buffer.write
+    session.output_buffer.write = lambda data: writes.append(len(data)) or original_write(data)
+
+    payload = b"y\n" * 10000
+    os.write(write_fd, payload)
+    os.close(write_fd)
+    session._read_fallback_output()  # Returns at EOF
+
+    assert session.output_buffer.closed
+    assert session.read_output() == payload
+    assert max(writes) == 4096 and len(writes) < 10
+
+
+def _writer(fd, total, chunk):
+    block = b"x" * chunk
+    remaining = total
+    while remaining > 0:
+        n = os.write(fd, block[:min(chunk, remaining)])
+        remaining -= n
+    os.close(fd)
+
+
+def _drain(session, total):
+    received = 0
+    while received < total:
+        if session.wait_for_output(1.0):
+            data = session.read_output()
+            if not data and session.output_buffer.closed:
+                break
+            received += len(data)
+    return received
+
+
+def benchmark_unix_pty_producer(megabytes=100):
+    """Drive _read_unix_pty_output from a pipe instead of a real PTY"""
+    total = megabytes * 1024 * 1024
+    read_fd, write_fd = os.pipe()
+    session = LocalSession("bench")
+    session.master_fd = read_fd
+    session.running = True
+
+    start = time.perf_counter()
+    threading.Thread(target=_writer, args=(write_fd, total, 65536), daemon=True).start()
+    threading.Thread(target=session._read_unix_pty_output, daemon=True).start()
+    received = _drain(session, total)
+    elapsed = time.perf_counter() - start
+    session.running = False
+    os.close(read_fd)
+    print(f"_read_unix_pty_output: {received / 1024 / 1024 / elapsed:8.1f} MB/s ({megabytes}MB)")
+
+
+def benchmark_fallback_producer(megabytes=100):
+    """Drive _read_fallback_output from a pipe-backed fake process"""
+    total = megabytes * 1024 * 1024
+    read_fd, write_fd = os.pipe()
+    session = LocalSession("bench")
+    session.process = PipeProcess(read_fd)
+    session.running = True
+
+    start = time.perf_counter()
+    threading.Thread(target=_writer, args=(write_fd, total, 65536), daemon=True).start()
+    threading.Thread(target=session._read_fallback_output, daemon=True).start()
+    received = _drain(session, total)
+    elapsed = time.perf_counter() - start
+    session.running = False
+    print(f"_read_fallback_output: {received / 1024 / 1024 / elapsed:8.1f} MB/s ({megabytes}MB)")
+
+
+def benchmark_pty_command(megabytes=500, read_chunk_size=65536):
+    """Run `yes | head -c <N>M` in a real local PTY session and time the drain"""
+    session = LocalSession("/bin/sh", read_chunk_size=read_chunk_size)
+    if not session.connect():
+        print("Could not start a local PTY session")
+        return
+    start = time.perf_counter()
+    session.send_command(f"exec sh -c 'yes | head -c {megabytes}M'\n")
+    received = 0
+    while True:
+        if session.wait_for_output(1.0):
+            data = session.read_output()
+            if not data and session.output_buffer.closed:
+                break
+            received += len(data)
+        elif not session.is_active():
+            break
+    elapsed = time.perf_counter() - start
+    session.close()
+    print(f"yes | head -c {megabytes}M (reads of {read_chunk_size // 1024}KB): "
+          f"{received / 1024 / 1024 / elapsed:8.1f} MB/s")
+
+
+def benchmark_drain(megabytes=100, chunk=1024):
+    """Old queue + concatenation drain vs OutputBuffer, same chunks, no producer I/O"""
+    total = megabytes * 1024 * 1024
+    block = b"x" * chunk
+    count = total // chunk
+    drain_every = 256  # Chunks that pile up between two reader wakeups
+
+    start = time.perf_counter()
+    output_queue = queue.Queue()
+    for i in range(count):
+        output_queue.put(block)
+        if (i + 1) % drain_every == 0:
+            output = b""
+            while not output_queue.empty():
+                output += output_queue.get_nowait()
+    queue_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    buffer = OutputBuffer()
+    for i in range(count):
+        buffer.write(block)
+        if (i + 1) % drain_every == 0:
+            buffer.read()
+    buffer_time = time.perf_counter() - start
+
+    print(f"queue.Queue + concat:  {megabytes / queue_time:8.1f} MB/s")
+    print(f"OutputBuffer:          {megabytes / buffer_time:8.1f} MB/s")
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("LocalSession output buffering benchmark")
+    print("=" * 60)
+    benchmark_drain()
+    benchmark_unix_pty_producer()
+    benchmark_fallback_producer()
+    if os.name != 'nt':
+        benchmark_pty_command(read_chunk_size=1024)
+        benchmark_pty_command(read_chunk_size=65536)
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
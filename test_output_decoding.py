@@ -0,0 +1,123 @@
+"""
+Output decoding test and throughput benchmark.
+
+Sessions hand raw bytes to the Terminal, which decodes them with an
+incremental decoder in the session's charset. This checks that multibyte
+characters split across reads survive, and compares throughput/correctness
+against the old per-chunk decode on multi-megabyte CJK and emoji streams.
+"""
+import os
+import random
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from conftest import FakeSession, get_app
+from ui.terminal import Terminal
+
+
+def make_stream(megabytes, charset="utf-8"):
+    """Mixed CJK / emoji / ASCII lines, encoded in the given charset"""
+    if charset == "gbk":
+        sample = "终端模拟器测试 中文字符输出 "
+    else:
+        sample = "终端模拟器 🚀🔥✨ émojis café 中文 "
+    line = (sample * 4) + "\r\n"
+    encoded_line = line.encode(charset)
+    return encoded_line * max(1, (megabytes * 1024 * 1024) // len(encoded_line))
+
+
+def split_randomly(data, max_chunk=1024, seed=1):
+    rng = random.Random(seed)
+    chunks = []
+    offset = 0
+    while offset < len(data):
+        size = rng.randint(1, max_chunk)
+        chunks.append(data[offset:offset + size])
+        offset += size
+    return chunks
+
+
+def test_split_multibyte_characters_survive(app):
+    terminal = Terminal(FakeSession())
+    terminal.reader.wait(1000)
+    text = "中文 🚀 ok"
+    data = text.encode("utf-8")
+    try:
+        for i in range(len(data)):
+            terminal.on_data_received(data[i:i + 1])
+        assert terminal.worker.wait_idle(5.0)
+        assert terminal.screen.display[0].startswith(text)
+    finally:
+        terminal.close()
+
+
+def test_session_charset_is_used(app):
+    terminal = Terminal(FakeSession("gbk"))
+    terminal.reader.wait(1000)
+    try:
+        terminal.on_data_received("终端".encode("gbk"))
+        assert terminal.worker.wait_idle(5.0)
+        assert terminal.screen.display[0].startswith("终")
+    finally:
+        terminal.close()
+
+    latin = Terminal(FakeSession("latin-1"))
+    latin.reader.wait(1000)
+    try:
+        latin.on_data_received("café".encode("latin-1"))
+        assert latin.worker.wait_idle(5.0)
+        assert latin.screen.display[0].startswith("café")
+    finally:
+        latin.close()
+
+
+def benchmark_decoding(megabytes=8, charset="utf-8"):
+    """Old per-chunk decode vs incremental decode (decode only, no emulator)"""
+    import codecs
+    print(f"\n=== Decoding {megabytes}MB of {charset} in random 1-1024 byte reads ===")
+    data = make_stream(megabytes, charset)
+    chunks = split_randomly(data)
+
+    start = time.perf_counter()
+    old_text = ''.join(chunk.decode(charset, errors='replace') for chunk in chunks)
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+    new_text = ''.join(decoder.decode(chunk) for chunk in chunks)
+    new_time = time.perf_counter() - start
+
+    mb = len(data) / 1024 / 1024
+    print(f"Per-chunk decode:   {mb / old_time:8.1f} MB/s, {old_text.count(chr(0xfffd)):6d} replacement chars")
+    print(f"Incremental decode: {mb / new_time:8.1f} MB/s, {new_text.count(chr(0xfffd)):6d} replacement chars")
+
+
+def benchmark_terminal_pipeline(megabytes=2, charset="utf-8"):
+    """End-to-end throughput of Terminal.on_data_received into the screen worker (decode + pyte)"""
+    get_app()
+    print(f"\n=== Terminal pipeline, {megabytes}MB of {charset} ===")
+    terminal = Terminal(FakeSession(charset))
+    terminal.reader.wait(1000)
+    data = make_stream(megabytes, charset)
+    chunks = split_randomly(data, max_chunk=32768)
+    start = time.perf_counter()
+    for chunk in chunks:
+        terminal.on_data_received(chunk)
+    terminal.worker.wait_idle()
+    elapsed = time.perf_counter() - start
+    print(f"Throughput: {len(data) / 1024 / 1024 / elapsed:.2f} MB/s ({len(chunks)} reads)")
+    terminal.close()
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("Byte-level output pipeline benchmark")
+    print("=" * 60)
+    benchmark_decoding(8, "utf-8")
+    benchmark_decoding(8, "gbk")
+    benchmark_terminal_pipeline(2, "utf-8")
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
@@ -0,0 +1,179 @@
+"""
+Paste pipeline tests and benchmark.
+
+Pastes longer than one chunk are written to the session by a PasteWriter
+thread in bounded chunks, wrapped in ESC[200~ ... ESC[201~ when the
+application has enabled bracketed paste (mode 2004). The 10 MB test pastes
+into `cat > file` in a real local PTY and compares the file with the paste;
+the benchmark measures how long the GUI thread is blocked.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from conftest import FakeSession, get_app, pump
+from ssh.local_session import LocalSession
+from ui.paste import PASTE_END, PASTE_START, prepare_paste
+from ui.terminal import Terminal
+
+
+class RecordingSession(FakeSession):
+    """Session stand-in that records what is sent, taking `delay` seconds per write"""
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay  # Per write, like a full tty input queue
+
+    def send_command(self, command):
+        super().send_command(command)
+        time.sleep(self.delay)
+
+
+def wait_for_paste(app, terminal, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        if terminal.last_paste is not None:
+            return
+        time.sleep(0.005)
+    raise AssertionError("paste did not finish")
+
+
+def paste_text(size):
+    """Printable lines with some non-ASCII, about `size` characters"""
+    rng = random.Random(1)
+    words = ["alpha", "beta", "gamma", "délta", "中文", "x" * 40, "$HOME", "`echo`"]
+    lines = []
+    total = 0
+    while total < size:
+        line = " ".join(rng.choice(words) for _ in range(rng.randrange(1, 20)))
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def test_bracketed_paste_wraps_and_strips_end_marker(app):
+    assert prepare_paste("ls\n", False) == "ls\n"
+    assert prepare_paste("a" + PASTE_END + "rm -rf ~\n", True) == PASTE_START + "arm -rf ~\n" + PASTE_END
+
+    session = RecordingSession()
+    terminal = Terminal(session)
+    try:
+        terminal.paste_text("short")
+        terminal.on_data_received(b"\x1b[?2004h")  # The shell turns bracketed paste on
+        terminal.worker.wait_idle(5.0)
+        terminal.refresh_display()  # The mode reaches the view with the next frame
+        terminal.paste_text("echo hi\n")
+        assert session.sent == ["short", PASTE_START + "echo hi\n" + PASTE_END]
+
+        session.sent.clear()
+        text = paste_text(50000)
+        terminal.paste_text(text)
+        wait_for_paste(app, terminal)
+        assert session.sent[0] == PASTE_START and session.sent[-1] == PASTE_END
+        assert "".join(session.sent[1:-1]) == text
+        assert max(len(chunk) for chunk in session.sent) <= terminal.paste_chunk_chars
+    finally:
+        terminal.close()
+
+
+def test_cancel_stops_between_chunks_and_ends_the_paste(app):
+    session = RecordingSession(delay=0.002)
+    terminal = Terminal(session)
+    try:
+        terminal.on_data_received(b"\x1b[?2004h")
+        terminal.worker.wait_idle(5.0)
+        terminal.refresh_display()
+        terminal.paste_text(paste_text(1000000))
+        pump(app, 0.05)
+        assert terminal.paste_progress.isVisibleTo(terminal)
+        # A second paste meanwhile is refused, and the tab says so
+        terminal.paste_text("another paste")
+        assert terminal.paste_progress.notice_label.isVisibleTo(terminal)
+        assert "not sent" in terminal.paste_progress.notice_label.text()
+        assert "another paste" not in session.sent
+        terminal.cancel_paste()
+        wait_for_paste(app, terminal)
+        sent, _, cancelled = terminal.last_paste
+        assert cancelled and 0 < sent < 1000000
+        assert session.sent[-1] == PASTE_END
+        assert not terminal.paste_progress.isVisibleTo(terminal)
+    finally:
+        terminal.close()
+
+
+def test_ten_megabytes_reach_cat_in_a_local_pty(app):
+    if sys.platform == "win32":
+        return
+    session = LocalSession("/bin/sh")
+    assert session.connect()
+    terminal = Terminal(session)
+    fd, path = tempfile.mkstemp(prefix="myxterm-paste-")
+    os.close(fd)
+    try:
+        # Raw mode: no line-length limit, no newline translation, no echo
+        session.send_command(f"stty raw -echo; printf 'RE''ADY\\n'; exec cat > {path}\n")
+        deadline = time.perf_counter() + 10
+        while not any(line.startswith("READY") for line in terminal.screen.display):
+            assert time.perf_counter() < deadline, "shell did not start cat"
+            pump(app, 0.01)
+
+        text = paste_text(10 * 1024 * 1024)
+        terminal.paste_text(text)
+        wait_for_paste(app, terminal, timeout=60)
+        expected = text.encode("utf-8")
+        deadline = time.perf_counter() + 30
+        while os.path.getsize(path) < len(expected) and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        with open(path, "rb") as f:
+            assert f.read() == expected
+    finally:
+        session.close()
+        terminal.close()
+        os.remove(path)
+
+
+def benchmark_gui_blocking(megabytes=10):
+    """Longest GUI-thread stall while pasting into a session that accepts 64 KB per ms"""
+    app = get_app()
+    print(f"\n=== Paste {megabytes}M characters, session paced at ~64 KB/ms ===")
+    text = paste_text(megabytes * 1024 * 1024)
+
+    class PacedSession(RecordingSession):
+        def send_command(self, command):
+            time.sleep(len(command) / (64 * 1024) / 1000)
+
+    session = PacedSession()
+    terminal = Terminal(session)
+    start = time.perf_counter()
+    session.send_command(text)  # What Ctrl+V used to do
+    print(f"One send_command on the GUI thread: blocked {(time.perf_counter() - start) * 1000:7.1f}ms")
+
+    start = time.perf_counter()
+    terminal.paste_text(text)
+    returned = time.perf_counter() - start
+    stall = 0.0
+    last = time.perf_counter()
+    while terminal.last_paste is None:
+        app.processEvents()
+        now = time.perf_counter()
+        stall = max(stall, now - last)
+        last = now
+    sent, seconds, _ = terminal.last_paste
+    print(f"PasteWriter: paste_text returned in {returned * 1000:.2f}ms, longest event-loop gap "
+          f"{stall * 1000:.2f}ms, {sent / seconds / 1e6:.1f}M characters/s")
+    terminal.close()
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("Paste benchmark")
+    print("=" * 60)
+    benchmark_gui_blocking()
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
@@ -10,7 +10,7 @@ from ui.terminal import Terminal
 
 def test_performance():
     """Test terminal with rapid output"""
-    app = QApplication(sys.argv)
+    app = QApplication.instance() or QApplication(sys.argv)
     
     # Create a local session
     session = LocalSession()
@@ -0,0 +1,722 @@
+"""
+Frame-time benchmarks for the terminal views.
+
+Compares dirty-row updates against full re-renders in the text widget, the
+text widget (Terminal) against the painted grid (GridTerminal) on
+full-screen redraws like htop and vim scrolling, and cached attribute runs
+against per-cell formats on colourised output, and how frame time and
+scrolling, resizing and clearing the text widget scale with scrollback size. Run directly for the
+numbers; the test_* functions are quick correctness checks for the
+rendering paths that the benchmarks exercise.
+"""
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtGui import QColor, QTextCharFormat, QTextCursor
+from PyQt6.QtWidgets import QPlainTextEdit
+from conftest import FakeSession, get_app, pump
+from ui.grid_terminal import GridTerminal, column_text, text_runs
+from ui.char_formats import attribute_colors
+from ui.screen_worker import column_index, render_line
+from ui.scrollback import ScrollbackLine
+from ui.terminal import Terminal
+
+
+def make_terminal(columns=200, rows=60, view=Terminal, show=False, settings=None):
+    """A terminal view whose screen is columns x rows, with the first frame applied"""
+    app = get_app()
+    terminal = view(FakeSession(), settings)
+    if show:
+        # Size the widget to fit the screen so repaints cover every row
+        metrics = terminal.fontMetrics()
+        terminal.resize(columns * metrics.horizontalAdvance('M') + 40, rows * metrics.height() + 20)
+        terminal.show()
+        app.processEvents()
+        terminal.flush_resize()
+    terminal.worker.resize(rows, columns)
+    terminal.worker.wait_idle(5.0)
+    terminal.refresh_display()
+    return terminal
+
+
+def feed(terminal, data):
+    """Parse data and apply the resulting snapshot, as one frame would"""
+    terminal.on_data_received(data)
+    terminal.worker.wait_idle(5.0)
+    terminal.refresh_display()
+
+
+def document_lines(terminal):
+    return terminal.toPlainText().split('\n')[:-1]
+
+
+def expected_lines(terminal):
+    screen = terminal.screen
+    return ([render_line(line, screen.columns) for line in screen.history.top] +
+            [render_line(screen.buffer[y], screen.columns) for y in range(screen.lines)])
+
+
+def window_lines(terminal):
+    """The lines the text widget's document should hold"""
+    first, stop = terminal.document_range()
+    return expected_lines(terminal)[first:stop]
+
+
+def grid_lines(terminal):
+    return [terminal.line(i) for i in range(terminal.line_count())]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def test_single_char_echo_touches_one_row():
+    terminal = make_terminal(columns=40, rows=10)
+    try:
+        feed(terminal, b"".join(b"row %d\r\n" % i for i in range(9)) + b"$ ")
+        feed(terminal, b"l")
+        terminal.on_data_received(b"s")
+        terminal.worker.wait_idle(5.0)
+        snapshot = terminal.worker.take_snapshot()
+        snapshot_rows = [row for row, _ in snapshot.lines]
+        assert snapshot_rows == [9]
+        assert not terminal.screen.dirty
+    finally:
+        terminal.close()
+
+
+def test_incremental_frames_match_screen():
+    terminal = make_terminal(columns=40, rows=10)
+    try:
+        for i in range(30):
+            feed(terminal, b"line %d\r\n" % i)
+            feed(terminal, b"\x1b[3;5Hx%d\x1b[10;1H" % i)
+        assert document_lines(terminal) == window_lines(terminal)
+    finally:
+        terminal.close()
+
+
+def test_text_widget_materializes_only_the_viewport():
+    settings = {"terminal": {"scrollback_lines": 5000, "scrollback_hot_lines": 100}}
+    terminal = make_terminal(columns=40, rows=10, show=True, settings=settings)
+    terminal.screen.history.top.spill_batch = 50
+    try:
+        feed(terminal, b"".join(b"\x1b[3%dmline %d\x1b[0m\r\n" % (i % 8, i) for i in range(3000)))
+        limit = terminal.visible_rows() + 2 * terminal.window_margin
+        assert terminal.line_count() == 3001
+        assert terminal.document().blockCount() - 1 == terminal._window_count <= limit
+        assert document_lines(terminal) == window_lines(terminal)
+        assert terminal.scrollbar.maximum() == terminal.line_count() - terminal.visible_rows()
+
+        # Scroll to the oldest (spilled) lines, then back down
+        terminal.scrollbar.setValue(0)
+        assert terminal.document_range()[0] == 0
+        assert document_lines(terminal)[0].startswith("line 0")
+        assert document_lines(terminal) == window_lines(terminal)
+        terminal.scrollbar.setValue(1500)
+        assert document_lines(terminal) == window_lines(terminal)
+
+        # New output follows the cursor back to the screen; a clear shows it at the top
+        feed(terminal, b"\x1b[2J\x1b[Hafter clear")
+        assert document_lines(terminal) == window_lines(terminal)
+        assert terminal.scrollbar.value() == min(terminal._history_total, terminal.scrollbar.maximum())
+        assert terminal._window_count <= limit
+    finally:
+        terminal.close()
+
+
+def test_cursor_cell_is_addressed_by_column():
+    assert column_index("abc", 2) == 2
+    assert column_index("中文ab", 4) == 2
+    assert column_index("e\u0301x", 1) == 2  # Combining mark belongs to the first cell
+    terminal = make_terminal(columns=40, rows=10)
+    try:
+        feed(terminal, "line\r\n中文ab\x1b[2;5H".encode("utf-8"))
+        selection = terminal.extraSelections()[-1]
+        assert selection.cursor.selectedText() == "a"
+        assert selection.cursor.block().text().startswith("中文ab")
+    finally:
+        terminal.close()
+
+
+def test_frame_scheduler_echoes_at_once_and_idles(app):
+    terminal = make_terminal(columns=40, rows=10, settings={"terminal": {"max_fps": 20}})
+    try:
+        pump(app, 0.05)
+        assert not terminal.refresh_timer.isActive()  # Nothing pending: no ticking
+
+        # A small burst right after a keystroke is drawn without waiting for a slot
+        terminal._last_input = time.monotonic()
+        terminal._last_frame = time.monotonic()
+        drawn = terminal.frames_rendered
+        terminal.on_data_received(b"x")
+        terminal.worker.wait_idle(5.0)
+        app.processEvents()
+        assert terminal.frames_rendered == drawn + 1 and terminal.frames_immediate == 1
+
+        # A flood is paced at the cap
+        drawn = terminal.frames_rendered
+        start = time.perf_counter()
+        while time.perf_counter() - start < 0.5:
+            terminal.on_data_received(b"flood line\r\n" * 50)
+            app.processEvents()
+            time.sleep(0.002)
+        terminal.worker.wait_idle(5.0)
+        pump(app, 0.15)  # The last frame, then nothing
+        assert terminal.frames_rendered - drawn <= (time.perf_counter() - start) * 20 + 2
+        assert terminal.frames_immediate == 1
+        assert not terminal.refresh_timer.isActive()
+        assert document_lines(terminal) == window_lines(terminal)
+    finally:
+        terminal.close()
+
+
+def test_hidden_tab_skips_rendering_and_catches_up_once(app):
+    for view, lines in ((Terminal, document_lines), (GridTerminal, grid_lines)):
+        terminal = make_terminal(columns=40, rows=10, view=view)
+        try:
+            pump(app, 0.05)
+            drawn = terminal.frames_rendered
+            before = lines(terminal)
+            terminal.suspend_rendering()
+            for i in range(20):
+                terminal.on_data_received(b"".join(b"tail line %d\r\n" % (i * 50 + n) for n in range(50)))
+                pump(app, 0.01)
+            terminal.worker.wait_idle(5.0)
+            pump(app, 0.1)
+            assert terminal.frames_rendered == drawn and lines(terminal) == before
+            assert terminal.worker.skipped_frames > 0
+
+            terminal.resume_rendering()
+            terminal.worker.wait_idle(5.0)
+            pump(app, 0.1)
+            assert terminal.frames_rendered == drawn + 1
+            expected = window_lines(terminal) if view is Terminal else expected_lines(terminal)
+            assert lines(terminal) == expected and "tail line 999" in lines(terminal)[-2]
+        finally:
+            terminal.close()
+
+
+def test_text_runs_follow_screen_columns():
+    assert list(text_runs("ls  -la ")) == [(0, 2, "ls"), (4, 3, "-la")]
+    # render_line() leaves an empty stub after a wide character
+    assert list(text_runs("a中b c")) == [(0, 1, "a"), (1, 2, "中"), (3, 1, "b"), (5, 1, "c")]
+    assert column_text("a中b c", 1, 4) == "中b"
+
+
+def test_grid_terminal_matches_screen():
+    terminal = make_terminal(columns=40, rows=10, view=GridTerminal)
+    try:
+        for i in range(30):
+            feed(terminal, b"line %d\r\n" % i)
+            feed(terminal, b"\x1b[3;5Hx%d\x1b[10;1H" % i)
+        feed(terminal, "中文 ok".encode("utf-8"))
+        assert grid_lines(terminal) == expected_lines(terminal)
+    finally:
+        terminal.close()
+
+
+def test_grid_terminal_scrolls_into_spilled_history():
+    settings = {"terminal": {"scrollback_lines": 1000, "scrollback_hot_lines": 20}}
+    terminal = make_terminal(columns=40, rows=10, view=GridTerminal, settings=settings)
+    terminal.screen.history.top.spill_batch = 10
+    try:
+        feed(terminal, b"".join(b"\x1b[3%dmline %d\x1b[0m\r\n" % (i % 8, i) for i in range(300)))
+        assert terminal.screen.history.top.spilled > 0
+        assert len(terminal._history) == 20 and terminal.line_count() == 291 + 10
+        assert grid_lines(terminal) == expected_lines(terminal)
+        assert terminal.line_runs(5)[0][1][0] == "magenta"
+    finally:
+        terminal.close()
+
+
+def test_grid_terminal_selection_copies_text():
+    terminal = make_terminal(columns=40, rows=10, view=GridTerminal)
+    try:
+        feed(terminal, b"first line\r\nsecond line\r\n")
+        terminal._selection_anchor = (0, 6)
+        terminal._selection_end = (1, 6)
+        assert terminal.has_selection()
+        assert terminal.selected_text() == "line\nsecond"
+        terminal.selectAll()
+        assert terminal.selected_text().startswith("first line\nsecond line")
+    finally:
+        terminal.close()
+
+
+def wait_for_copy(terminal, timeout=5.0):
+    """The clipboard text once the terminal's CopyThread has finished"""
+    app = get_app()
+    deadline = time.time() + timeout
+    while terminal.copy_thread.isRunning() or not terminal.copy_thread.isFinished():
+        assert time.time() < deadline, "copy did not finish"
+        time.sleep(0.01)
+    app.processEvents()  # Deliver text_ready
+    return app.clipboard().text()
+
+
+def test_long_selections_are_copied_off_the_gui_thread():
+    settings = {"terminal": {"scrollback_lines": 1000, "scrollback_hot_lines": 20}}
+    for view in (Terminal, GridTerminal):
+        terminal = make_terminal(columns=40, rows=10, view=view, settings=settings)
+        terminal.screen.history.top.spill_batch = 10
+        try:
+            feed(terminal, b"".join(b"line %d\r\n" % i for i in range(300)))
+            assert terminal.screen.history.top.spilled > 0
+            expected = [line.rstrip() for line in expected_lines(terminal)]
+
+            terminal.copy_sync_lines = 50
+            terminal.selectAll()
+            terminal.copy()
+            assert terminal.copy_thread.isRunning() or terminal.copy_thread.isFinished()
+            assert wait_for_copy(terminal) == "\n".join(expected), view.__name__
+
+            if view is GridTerminal:
+                # Column-cut first and last lines, spilled scrollback and screen rows
+                terminal._selection_anchor, terminal._selection_end = (3, 5), (295, 2)
+                terminal.copy()
+                assert wait_for_copy(terminal) == terminal.selected_text()
+                terminal.copy_sync_lines = 10000
+                terminal.copy()  # Short enough: straight away
+                assert get_app().clipboard().text() == terminal.selected_text()
+        finally:
+            terminal.close()
+
+
+def test_colour_runs_reach_the_document():
+    terminal = make_terminal(columns=40, rows=10)
+    try:
+        feed(terminal, b"\x1b[01;34mdir\x1b[0m  \x1b[7mrev\x1b[0m\r\n")
+        block = terminal.document().findBlockByNumber(0)
+        cursor = QTextCursor(block)
+        cursor.setPosition(block.position() + 1)
+        assert cursor.charFormat().foreground().color() == QColor("#0000EE")
+        assert cursor.charFormat().fontWeight() > 400
+        cursor.setPosition(block.position() + 6)
+        assert cursor.charFormat().background().color() == QColor("#FFFFFF")  # Reversed default fg
+        cursor.setPosition(block.position() + 10)
+        assert not cursor.charFormat().hasProperty(QTextCharFormat.Property.ForegroundBrush)
+        assert document_lines(terminal) == window_lines(terminal)
+        assert len(terminal.formats) == 2
+    finally:
+        terminal.close()
+
+
+def test_grid_terminal_resolves_attributes():
+    terminal = make_terminal(columns=40, rows=10, view=GridTerminal)
+    try:
+        feed(terminal, b"\x1b[38;5;208;1mx\x1b[0m \x1b[44my\x1b[0m")
+        runs = terminal.line_runs(0)
+        fg, bg, style = terminal._style(runs[0][1])
+        assert fg == QColor("#FF8700") and bg is None and style == (True, False, False, False)
+        assert terminal._style(runs[2][1])[1] == QColor("#0000EE")
+        assert grid_lines(terminal) == expected_lines(terminal)
+    finally:
+        terminal.close()
+
+
+def legacy_frame(terminal):
+    """The pre-dirty-tracking refresh: re-render and replace every screen row"""
+    screen = terminal.screen
+    cursor = QTextCursor(terminal.document())
+    cursor.beginEditBlock()
+    cursor.movePosition(QTextCursor.MoveOperation.Start)
+    cursor.movePosition(QTextCursor.MoveOperation.Down, n=terminal._window_count - screen.lines)
+    cursor.movePosition(QTextCursor.MoveOperation.Down, QTextCursor.MoveMode.KeepAnchor, n=screen.lines)
+    cursor.movePosition(QTextCursor.MoveOperation.EndOfLine, QTextCursor.MoveMode.KeepAnchor)
+    lines = [render_line(screen.buffer[y], screen.columns) for y in range(screen.lines)]
+    cursor.insertText('\n'.join(lines) + '\n')
+    cursor.endEditBlock()
+    terminal.draw_cursor()
+
+
+def benchmark_single_char_echo(frames=300, columns=200, rows=60):
+    """Frame time for a one-character echo on a full 200x60 screen"""
+    print(f"\n=== Single-character echo, {columns}x{rows} screen ===")
+    terminal = make_terminal(columns, rows)
+    line = b"x" * (columns - 1)
+    feed(terminal, b"\r\n".join([line] * (rows - 1)) + b"\r\n$ ")
+
+    letters = b"abcdefghijklmnopqrstuvwxyz"
+    legacy, dirty = [], []
+    for i in range(frames):
+        first = b"\x08" + letters[i % 26:i % 26 + 1]
+        second = b"\x08" + letters[(i + 13) % 26:(i + 13) % 26 + 1]
+
+        terminal.on_data_received(first)
+        terminal.worker.wait_idle(5.0)
+        terminal.worker.take_snapshot()
+        start = time.perf_counter()
+        legacy_frame(terminal)
+        legacy.append((time.perf_counter() - start) * 1000)
+
+        terminal.on_data_received(second)
+        terminal.worker.wait_idle(5.0)
+        start = time.perf_counter()
+        terminal.refresh_display()
+        dirty.append((time.perf_counter() - start) * 1000)
+
+    for name, samples in (("All rows (legacy)", legacy), ("Dirty rows only", dirty)):
+        print(f"{name:18s} p50 {statistics.median(samples):7.3f}ms  p95 {percentile(samples, 0.95):7.3f}ms")
+    terminal.close()
+
+
+def htop_frames(frames, columns, rows):
+    """Every row rewritten in place each frame, like htop's refresh"""
+    for frame in range(frames):
+        rows_text = []
+        for row in range(rows):
+            cpu = (frame * 7 + row * 13) % 1000 / 10
+            text = f"{1000 + row:7d} user      20   0 {cpu:5.1f} {row * 0.3:4.1f}  0:{frame % 60:02d}.{row:02d} process-{row}"
+            rows_text.append(text.ljust(columns)[:columns].encode())
+        yield b"\x1b[H" + b"\r\n".join(rows_text)
+
+
+def vim_scroll_frames(frames, columns, rows):
+    """Scroll a file up one line per frame with delete-line, redrawing the status line"""
+    for frame in range(frames):
+        line = f"{frame + rows:6d}     def function_{frame}(self, value):  # scrolled into view"
+        status = f'"file.py" line {frame + 1} of 100000 --{frame % 100}%--'
+        yield (b"\x1b[H\x1b[M" + b"\x1b[%d;1H" % (rows - 1) + line[:columns].encode() +
+               b"\x1b[%d;1H\x1b[K" % rows + status[:columns].encode())
+
+
+def benchmark_full_screen_redraw(frames=200, columns=200, rows=60):
+    """Text widget vs painted grid: refresh_display plus a synchronous repaint per frame"""
+    for name, generator in (("htop refresh", htop_frames), ("vim scrolling", vim_scroll_frames)):
+        print(f"\n=== {name}, {columns}x{rows} screen ===")
+        for label, view in (("Text widget", Terminal), ("Painted grid", GridTerminal)):
+            terminal = make_terminal(columns, rows, view=view, show=True)
+            samples = []
+            for data in generator(frames, columns, rows):
+                terminal.on_data_received(data)
+                terminal.worker.wait_idle(5.0)
+                start = time.perf_counter()
+                terminal.refresh_display()
+                terminal.viewport().repaint()
+                samples.append((time.perf_counter() - start) * 1000)
+            print(f"{label:18s} p50 {statistics.median(samples):7.3f}ms  p95 {percentile(samples, 0.95):7.3f}ms")
+            terminal.close()
+
+
+def ls_color_stream(columns, lines=4000):
+    """`ls --color -R`-style output: coloured names that scroll into history"""
+    kinds = (b"\x1b[01;34m", b"\x1b[01;32m", b"\x1b[01;36m", b"\x1b[00m", b"\x1b[01;31m")
+    out = []
+    for i in range(lines):
+        if i % 40 == 0:
+            out.append(b"\r\n/usr/share/dir%d:\r\n" % i)
+        names = []
+        for j in range(columns // 20):
+            kind = kinds[(i + j) % len(kinds)]
+            names.append(kind + (b"name_%d_%d" % (i, j)).ljust(16) + b"\x1b[0m")
+        out.append(b"  ".join(names) + b"\r\n")
+    return b"".join(out)
+
+
+def color_table_frames(frames, columns, rows):
+    """A 256-colour test pattern redrawn in place with a shifting palette"""
+    for frame in range(frames):
+        out = [b"\x1b[H"]
+        for row in range(rows):
+            cells = []
+            for column in range(0, columns - 4, 4):
+                colour = (frame + row * 7 + column) % 256
+                cells.append(b"\x1b[48;5;%dm%3d\x1b[0m " % (colour, colour))
+            out.append(b"".join(cells) + (b"\r\n" if row < rows - 1 else b""))
+        yield b"".join(out)
+
+
+def per_cell_frame(terminal):
+    """Naive attribute rendering: a fresh QTextCharFormat for every screen cell"""
+    screen = terminal.screen
+    cursor = QTextCursor(terminal.document())
+    cursor.beginEditBlock()
+    cursor.movePosition(QTextCursor.MoveOperation.Start)
+    cursor.movePosition(QTextCursor.MoveOperation.Down, n=terminal._window_count - screen.lines)
+    for y in range(screen.lines):
+        line = screen.buffer[y]
+        cursor.movePosition(QTextCursor.MoveOperation.StartOfBlock)
+        cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        for x in range(screen.columns):
+            char = line[x]
+            cell_format = QTextCharFormat()
+            fg, bg = attribute_colors(tuple(char[1:]), terminal.formats.foreground, terminal.formats.background)
+            if fg is not None:
+                cell_format.setForeground(fg)
+            if bg is not None:
+                cell_format.setBackground(bg)
+            cursor.insertText(char.data, cell_format)
+        cursor.movePosition(QTextCursor.MoveOperation.NextBlock)
+    cursor.endEditBlock()
+
+
+def benchmark_colour_output(frames=100, columns=200, rows=60):
+    """Frame time on colourised output: cached attribute runs vs per-cell formats"""
+    print(f"\n=== ls --color -R style output, {columns}x{rows} screen, 4KB per frame ===")
+    stream = ls_color_stream(columns)
+    chunks = [stream[i:i + 4096] for i in range(0, len(stream), 4096)][:frames]
+    for label, view in (("Text widget", Terminal), ("Painted grid", GridTerminal)):
+        terminal = make_terminal(columns, rows, view=view, show=True)
+        samples = []
+        for chunk in chunks:
+            terminal.on_data_received(chunk)
+            terminal.worker.wait_idle(5.0)
+            start = time.perf_counter()
+            terminal.refresh_display()
+            terminal.viewport().repaint()
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{label:18s} p50 {statistics.median(samples):7.3f}ms  p95 {percentile(samples, 0.95):7.3f}ms")
+        terminal.close()
+
+    print(f"\n=== 256-colour table redrawn in place, {columns}x{rows} screen ===")
+    for label, view in (("Per-cell formats", None), ("Text widget", Terminal), ("Painted grid", GridTerminal)):
+        terminal = make_terminal(columns, rows, view=view or Terminal, show=True)
+        samples = []
+        for data in color_table_frames(frames // 4 if view is None else frames, columns, rows):
+            terminal.on_data_received(data)
+            terminal.worker.wait_idle(5.0)
+            start = time.perf_counter()
+            if view is None:
+                terminal.worker.take_snapshot()
+                per_cell_frame(terminal)
+            else:
+                terminal.refresh_display()
+            terminal.viewport().repaint()
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{label:18s} p50 {statistics.median(samples):7.3f}ms  p95 {percentile(samples, 0.95):7.3f}ms")
+        terminal.close()
+
+
+def benchmark_history_scaling(sizes=(0, 1000, 10000, 100000), frames=200, columns=120, rows=50):
+    """Per-frame cost of echo and scrolling output as scrollback grows from 0 to 100k lines"""
+    print(f"\n=== Frame time against scrollback size, {columns}x{rows} screen ===")
+    print(f"{'History':>8s}  {'echo p50':>9s}  {'scroll p50':>10s}  {'Down-walk to screen':>20s}")
+    get_app()
+    for size in sizes:
+        terminal = make_terminal(columns, rows, show=True,
+                                 settings={"terminal": {"scrollback_lines": max(size, 1000)}})
+        if size:
+            fill_history(terminal, size, columns)
+        feed(terminal, b"\r\n" * rows + b"$ ")
+
+        samples = {"echo": [], "scroll": []}
+        for i in range(frames):
+            for kind, data in (("echo", b"\x08" + bytes([97 + i % 26])),
+                               ("scroll", b"\r\noutput line %d\r\n$ " % i)):
+                terminal.on_data_received(data)
+                terminal.worker.wait_idle(5.0)
+                start = time.perf_counter()
+                terminal.refresh_display()
+                terminal.viewport().repaint()
+                samples[kind].append((time.perf_counter() - start) * 1000)
+        terminal.close()
+
+        # What addressing the screen with movePosition(Down, n=history_len) cost
+        # when the document mirrored the scrollback
+        mirror = QPlainTextEdit()
+        mirror.setPlainText("history line\n" * size + "screen row\n" * rows)
+        cursor = QTextCursor(mirror.document())
+        start = time.perf_counter()
+        for _ in range(10):
+            cursor.movePosition(QTextCursor.MoveOperation.Start)
+            cursor.movePosition(QTextCursor.MoveOperation.Down, n=size)
+        walk = (time.perf_counter() - start) * 100
+        mirror.deleteLater()
+
+        print(f"{size:8d}  {statistics.median(samples['echo']):7.3f}ms  "
+              f"{statistics.median(samples['scroll']):8.3f}ms  {walk:18.3f}ms")
+
+
+def benchmark_frame_scheduler(keystrokes=100, flood_seconds=2.0, columns=120, rows=50):
+    """Echo latency, frame pacing under a flood, and timer wakeups while idle"""
+    app = get_app()
+    print(f"\n=== Frame scheduler, {columns}x{rows} screen ===")
+    terminal = make_terminal(columns, rows, show=True)
+
+    def legacy_snapshot_ready():
+        # The old scheduler: a 16ms timer that always runs, drawing whatever is pending
+        terminal.pending_updates = True
+
+    for label in ("Fixed 16ms timer", "Immediate echo"):
+        if label.startswith("Fixed"):
+            terminal.worker.snapshot_ready.disconnect()
+            terminal.worker.snapshot_ready.connect(legacy_snapshot_ready)
+            terminal.refresh_timer.setSingleShot(False)
+            terminal.refresh_timer.start(16)
+        else:
+            terminal.refresh_timer.stop()
+            terminal.refresh_timer.setSingleShot(True)
+            terminal.worker.snapshot_ready.disconnect()
+            terminal.worker.snapshot_ready.connect(terminal._on_snapshot_ready)
+        samples = []
+        for i in range(keystrokes):
+            pump(app, 0.02)  # Typing speed: the previous frame is long done
+            drawn = terminal.frames_rendered
+            start = time.perf_counter()
+            terminal._last_input = time.monotonic()
+            terminal.on_data_received(bytes([97 + i % 26]))
+            while terminal.frames_rendered == drawn:
+                app.processEvents()
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{label:18s} keystroke to frame p50 {statistics.median(samples):6.2f}ms  "
+              f"p95 {percentile(samples, 0.95):6.2f}ms")
+
+    # Small parse batches, so the worker publishes well above the frame cap
+    terminal.worker.max_feed_bytes = 2048
+    line = b"flood " * (columns // 6 - 1) + b"\r\n"
+    for cap in (60, 20):
+        terminal.max_fps = cap
+        terminal.frame_interval = 1.0 / cap
+        drawn, dropped = terminal.frames_rendered, terminal.frames_dropped
+        start = time.perf_counter()
+        while time.perf_counter() - start < flood_seconds:
+            # Keep the worker busy without running ahead of it, like the reader's high-water mark
+            if terminal.worker._input_bytes < 64 * 1024:
+                terminal.on_data_received(line * 20)
+            app.processEvents()
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        print(f"Flood, cap {cap:3d}:     {(terminal.frames_rendered - drawn) / elapsed:6.1f} FPS achieved, "
+              f"{terminal.frames_dropped - dropped} frames dropped")
+        terminal.worker.wait_idle(30.0)
+        pump(app, 0.1)
+
+    wakeups = []
+    terminal.refresh_timer.timeout.connect(lambda: wakeups.append(1))
+    pump(app, 1.0)
+    print(f"Idle:              {len(wakeups)} timer wakeups in 1s (a fixed 16ms timer: ~60)")
+    terminal.close()
+
+
+def benchmark_background_tab(seconds=2.0, columns=120, rows=50):
+    """GUI time spent on a tab receiving `tail -f` output, in front and hidden"""
+    app = get_app()
+    print(f"\n=== Background tab under tail -f, {columns}x{rows} screen, {seconds:.0f}s ===")
+    line = b"2026-10-16 12:00:00 INFO request served in 12ms " + b"x" * (columns - 60) + b"\r\n"
+    for label, hidden in (("Current tab", False), ("Hidden tab", True)):
+        terminal = make_terminal(columns, rows, show=True)
+        if hidden:
+            terminal.suspend_rendering()
+        drawn, spent = terminal.frames_rendered, terminal.render_seconds
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            if terminal.worker._input_bytes < 64 * 1024:
+                terminal.on_data_received(line * 10)
+            app.processEvents()
+            time.sleep(0.002)
+        terminal.worker.wait_idle(30.0)
+        pump(app, 0.1)
+        print(f"{label:12s} {terminal.frames_rendered - drawn:4d} frames, "
+              f"{(terminal.render_seconds - spent) * 1000:7.1f}ms rendering")
+        if hidden:
+            start = time.perf_counter()
+            terminal.resume_rendering()
+            while terminal.frames_rendered == drawn:
+                app.processEvents()
+            print(f"Switching back: one catch-up frame in {(time.perf_counter() - start) * 1000:.1f}ms; "
+                  f"{terminal.worker.skipped_frames} frames skipped while hidden")
+            print(next(text for text in terminal.stats_lines() if text.startswith("In background")))
+        terminal.close()
+
+
+def fill_history(terminal, count, columns):
+    """Append count lines straight to the scrollback store, then publish them as one frame"""
+    store = terminal.screen.history.top
+    lines = [ScrollbackLine.from_rendered(f"{i:07d} build/obj/module_{i % 97}.o: compiled".ljust(columns),
+                                          None, columns) for i in range(1000)]
+    for i in range(count):
+        store.append(lines[i % 1000])
+    terminal.screen.history_added += count  # The worker is idle, so this is safe here
+    feed(terminal, b"$ ")
+
+
+def benchmark_virtual_viewport(sizes=(10000, 100000, 1000000), columns=120, rows=50):
+    """Scroll, resize and clear cost in the text widget against scrollback size"""
+    get_app()
+    rng = random.Random(1)
+    for size in sizes:
+        print(f"\n=== Text widget with {size} lines of scrollback, {columns}x{rows} screen ===")
+        terminal = make_terminal(columns, rows, show=True,
+                                 settings={"terminal": {"scrollback_lines": size}})
+        fill_history(terminal, size, columns)
+        bar = terminal.scrollbar
+
+        def jump():
+            bar.setValue(rng.randrange(bar.maximum()))
+
+        def wheel():
+            bar.setValue(max(0, bar.value() - 3))
+
+        def measure(action, count=100):
+            samples = []
+            for _ in range(count):
+                start = time.perf_counter()
+                action()
+                terminal.viewport().repaint()
+                samples.append((time.perf_counter() - start) * 1000)
+            return samples
+
+        results = [("Jump anywhere", measure(jump)), ("Wheel (3 lines)", measure(wheel))]
+
+        samples = []
+        for i in range(20):
+            height = (rows - 10 + i % 2 * 10) * terminal.fontMetrics().height() + 20
+            terminal.resize(terminal.width(), height)
+            get_app().processEvents()
+            terminal.flush_resize()
+            terminal.worker.wait_idle(5.0)
+            start = time.perf_counter()
+            terminal.refresh_display()
+            terminal.viewport().repaint()
+            samples.append((time.perf_counter() - start) * 1000)
+        results.append(("Resize", samples))
+
+        samples = []
+        for i in range(20):
+            terminal.on_data_received(b"\x1b[2J\x1b[Hcleared %d" % i)
+            terminal.worker.wait_idle(5.0)
+            start = time.perf_counter()
+            terminal.refresh_display()
+            terminal.viewport().repaint()
+            samples.append((time.perf_counter() - start) * 1000)
+        results.append(("Clear", samples))
+
+        for name, samples in results:
+            print(f"{name:18s} p50 {statistics.median(samples):7.3f}ms  p95 {percentile(samples, 0.95):7.3f}ms")
+        print(f"Document holds {terminal.document().blockCount() - 1} of {terminal.line_count()} lines")
+        terminal.close()
+
+    # What a resize or clear cost when the document mirrored the in-memory scrollback
+    for size in sizes[:2]:
+        terminal = make_terminal(columns, rows, show=True)
+        text = '\n'.join(f"{i:07d} build/obj/module_{i % 97}.o: compiled".ljust(columns)
+                         for i in range(size)) + '\n'
+        start = time.perf_counter()
+        terminal.setPlainText(text)
+        terminal.viewport().repaint()
+        print(f"Mirrored document, {size} lines: one rebuild {(time.perf_counter() - start) * 1000:9.1f}ms")
+        terminal.close()
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("Terminal render benchmarks")
+    print("=" * 60)
+    benchmark_single_char_echo()
+    benchmark_full_screen_redraw()
+    benchmark_colour_output()
+    benchmark_history_scaling()
+    benchmark_frame_scheduler()
+    benchmark_background_tab()
+    benchmark_virtual_viewport()
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
@@ -0,0 +1,136 @@
+"""
+Window resize tests and benchmark.
+
+A window drag resizes the terminal widget many times a second. The screen
+reflow and the PTY window-change (Channel.resize_pty for SSH, TIOCSWINSZ
+for a local Unix PTY) are deferred until the size settles, so a drag costs
+one reflow and one remote resize message instead of one per step.
+"""
+import fcntl
+import os
+import struct
+import sys
+import termios
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from conftest import FakeSession, get_app, pump
+from ssh.backend import SSHSession
+from ssh.local_session import LocalSession
+from ui.grid_terminal import GridTerminal
+from ui.terminal import Terminal
+
+
+class RecordingSession(FakeSession):
+    """Session stand-in that records the window sizes it is sent"""
+    def __init__(self):
+        super().__init__()
+        self.sizes = []
+
+    def resize(self, rows, cols):
+        self.sizes.append((rows, cols))
+
+
+class RecordingChannel:
+    """paramiko Channel stand-in that records window-change requests"""
+    def __init__(self):
+        self.requests = []
+
+    def resize_pty(self, width=80, height=24, width_pixels=0, height_pixels=0):
+        self.requests.append((height, width))
+
+
+def drag(app, terminal, steps, step_seconds=0.005):
+    """Grow the widget a few pixels at a time, like a mouse drag"""
+    width, height = terminal.width(), terminal.height()
+    for i in range(steps):
+        terminal.resize(width + 3 * i, height + 2 * i)
+        app.processEvents()
+        time.sleep(step_seconds)
+
+
+def test_drag_reflows_and_resizes_the_pty_once(app):
+    for view in (Terminal, GridTerminal):
+        session = RecordingSession()
+        terminal = view(session)
+        terminal.resize(500, 300)
+        terminal.show()
+        pump(app, 0.2)
+        try:
+            sizes, reflows = len(session.sizes), terminal.resizes_applied
+            drag(app, terminal, 40)
+            assert terminal.resizes_requested > 20
+            assert terminal.resizes_applied == reflows and len(session.sizes) == sizes
+
+            pump(app, terminal.resize_delay_ms / 1000 + 0.1)
+            assert terminal.resizes_applied == reflows + 1
+            assert session.sizes[sizes:] == [(terminal.rows, terminal.cols)]
+            terminal.worker.wait_idle(5.0)
+            assert (terminal.screen.lines, terminal.screen.columns) == (terminal.rows, terminal.cols)
+        finally:
+            terminal.close()
+
+
+def test_ssh_session_sends_each_size_once():
+    session = SSHSession("example.invalid", 22, "user")
+    session.shell = RecordingChannel()
+    for rows, cols in ((30, 100), (30, 100), (40, 120)):
+        session.resize(rows, cols)
+    assert session.shell.requests == [(30, 100), (40, 120)]
+
+
+def test_unix_pty_gets_window_size():
+    if sys.platform == "win32":
+        return
+    session = LocalSession("/bin/sh")
+    assert session.connect()
+    try:
+        session.resize(33, 101)
+        rows, cols, _, _ = struct.unpack('HHHH', fcntl.ioctl(session.master_fd, termios.TIOCGWINSZ, b'\0' * 8))
+        assert (rows, cols) == (33, 101)
+    finally:
+        session.close()
+
+
+def benchmark_window_drag(steps=60, columns=120, rows=50):
+    """GUI time and PTY messages for one window drag, immediate vs debounced"""
+    app = get_app()
+    print(f"\n=== Window drag, {steps} steps, {columns}x{rows} screen with output ===")
+    for label, delay in (("Every step", 0), ("Debounced", 100)):
+        session = RecordingSession()
+        terminal = Terminal(session)
+        metrics = terminal.fontMetrics()
+        terminal.resize(columns * metrics.horizontalAdvance('M'), rows * metrics.height())
+        terminal.show()
+        pump(app, 0.1)
+        terminal.on_data_received(b"".join(b"%05d some output on the screen\r\n" % i for i in range(2000)))
+        terminal.worker.wait_idle(5.0)
+        pump(app, 0.1)
+
+        sizes, frames = len(session.sizes), terminal.frames_rendered
+        start = time.perf_counter()
+        for i in range(steps):
+            terminal.resize(terminal.width() + 4, terminal.height() + 3)
+            if delay == 0:
+                terminal.flush_resize()  # What resizeEvent used to do
+                terminal.worker.wait_idle(5.0)
+            app.processEvents()
+        busy = time.perf_counter() - start
+        pump(app, 0.2)
+        terminal.worker.wait_idle(5.0)
+        pump(app, 0.05)
+        print(f"{label:11s} {len(session.sizes) - sizes:3d} PTY resizes, "
+              f"{terminal.frames_rendered - frames:3d} frames, {busy * 1000:7.1f}ms for the drag")
+        terminal.close()
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("Resize benchmark")
+    print("=" * 60)
+    benchmark_window_drag()
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
@@ -0,0 +1,168 @@
+"""
+Tests for the ScreenWorker snapshot hand-off and the Terminal view built from it.
+"""
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from conftest import FakeSession, get_app
+from ui.screen_worker import ScreenWorker, render_line, render_runs
+from ui.terminal import Terminal
+
+
+def make_worker(columns=20, lines=4, history=50):
+    get_app()
+    worker = ScreenWorker(columns, lines, history=history)
+    worker.start()
+    worker.take_snapshot()  # Discard the initial full snapshot
+    return worker
+
+
+def feed(worker, data):
+    worker.feed(data)
+    assert worker.wait_idle(5.0)
+
+
+def test_snapshots_merge_until_taken():
+    worker = make_worker()
+    try:
+        feed(worker, b"one\r\n")
+        feed(worker, b"two\r\nthree\r\nfour\r\nfive")
+        snapshot = worker.take_snapshot()
+        assert not snapshot.full
+        # Five lines on a four-row screen: only the first scrolled into history
+        assert [line.rstrip() for line in snapshot.history] == ["one"]
+        assert snapshot.history_len == 1
+        assert [text.rstrip() for _, text in snapshot.lines] == ["two", "three", "four", "five"]
+        assert snapshot.cursor[:2] == (4, 3)
+        assert worker.take_snapshot() is None
+        try:
+            snapshot.full = True
+            assert False, "snapshot should be immutable"
+        except AttributeError:
+            pass
+    finally:
+        worker.stop()
+        worker.wait(1000)
+
+
+def test_only_changed_rows_are_published():
+    worker = make_worker()
+    try:
+        feed(worker, b"a\r\nb\r\nc")
+        worker.take_snapshot()
+        feed(worker, b"d")
+        snapshot = worker.take_snapshot()
+        assert [row for row, _ in snapshot.lines] == [2]
+        assert snapshot.history == ()
+    finally:
+        worker.stop()
+        worker.wait(1000)
+
+
+def test_resize_and_history_overflow_force_full_snapshot():
+    worker = make_worker(history=10)
+    try:
+        worker.resize(6, 30)
+        assert worker.wait_idle(5.0)
+        snapshot = worker.take_snapshot()
+        assert snapshot.full and snapshot.rows == 6 and snapshot.columns == 30
+
+        feed(worker, b"".join(b"%d\r\n" % i for i in range(100)))
+        snapshot = worker.take_snapshot()
+        assert snapshot.full
+        assert snapshot.history_len == 10
+        assert [line.rstrip() for line in snapshot.history] == [str(i) for i in range(85, 95)]
+    finally:
+        worker.stop()
+        worker.wait(1000)
+
+
+def test_attribute_runs_are_published_with_lines():
+    worker = make_worker()
+    try:
+        feed(worker, b"\x1b[1;31mred\x1b[0m plain")
+        snapshot = worker.take_snapshot()
+        assert snapshot.lines == ((0, "red plain".ljust(20)),)
+        (red_length, red), (plain_length, plain) = snapshot.line_runs[0]
+        assert red_length == 3 and red[0] == "red" and red[2] is True
+        assert plain_length == 17 and plain is None
+
+        # Same text, new colour: still a change
+        feed(worker, b"\r\x1b[32mred\x1b[0m")
+        snapshot = worker.take_snapshot()
+        assert snapshot.line_runs[0][0][1][0] == "green"
+
+        feed(worker, b"\r\n\r\n\r\n\r\n")
+        snapshot = worker.take_snapshot()
+        assert snapshot.history[0].startswith("red plain")
+        assert snapshot.history_runs[0][0][1][0] == "green"
+    finally:
+        worker.stop()
+        worker.wait(2000)
+
+
+def test_private_sgr_does_not_drop_output():
+    worker = make_worker()
+    try:
+        # vim queries xterm's modifyOtherKeys setting with CSI ? 4 m
+        feed(worker, b"\x1b[?4m\x1b[1mvim\x1b[m screen")
+        snapshot = worker.take_snapshot()
+        assert snapshot.lines == ((0, "vim screen".ljust(20)),)
+        assert snapshot.line_runs[0][0][1][2] is True
+    finally:
+        worker.stop()
+        worker.wait(2000)
+
+
+def test_bracketed_paste_mode_is_published():
+    worker = make_worker()
+    try:
+        feed(worker, b"\x1b[?2004h")  # Changes nothing on screen
+        snapshot = worker.take_snapshot()
+        assert snapshot is not None and snapshot.bracketed_paste
+        feed(worker, b"x")
+        assert worker.take_snapshot().bracketed_paste
+        feed(worker, b"\x1b[?2004l")
+        assert not worker.take_snapshot().bracketed_paste
+    finally:
+        worker.stop()
+        worker.wait(2000)
+
+
+def test_plain_lines_have_no_runs():
+    worker = make_worker()
+    try:
+        feed(worker, b"plain text")
+        assert render_runs(worker.screen.buffer[0], 20) == ("plain text".ljust(20), None)
+    finally:
+        worker.stop()
+        worker.wait(2000)
+
+
+def test_document_holds_the_viewport_window(app):
+    terminal = Terminal(FakeSession())
+    terminal.resize(600, 300)
+    terminal.show()
+    app.processEvents()
+    terminal.flush_resize()  # Apply the resize before any output arrives
+    try:
+        terminal.on_data_received(b"".join(b"line %d\r\n" % i for i in range(500)))
+        terminal.on_data_received(b"\x1b[2J\x1b[Hafter clear")
+        deadline = time.time() + 5.0
+        while time.time() < deadline:
+            app.processEvents()  # Resize events and snapshot frames
+            assert terminal.worker.wait_idle(5.0)
+            screen = terminal.screen
+            expected = ([render_line(line, screen.columns) for line in screen.history.top] +
+                        [render_line(screen.buffer[y], screen.columns) for y in range(screen.lines)])
+            first, stop = terminal.document_range()
+            if terminal.toPlainText().split('\n')[:-1] == expected[first:stop]:
+                break
+            time.sleep(0.01)
+        assert terminal.toPlainText().split('\n')[:-1] == expected[first:stop]
+        assert stop == len(expected) and stop - first < len(expected)
+        assert expected[len(screen.history.top)].startswith("after clear")
+    finally:
+        terminal.close()
@@ -0,0 +1,221 @@
+"""
+Scrollback store tests and memory benchmark.
+
+TerminalScreen keeps history in a ScrollbackStore (packed text + attribute
+runs per line) instead of pyte's deque of Line dicts. This checks that lines
+come back exactly as render_runs() would render them and measures bytes per
+history line for both layouts.
+"""
+import collections
+import os
+import random
+import sys
+import time
+
+import pyte
+from ui.screen_worker import ScreenWorker, TerminalScreen, render_runs
+from ui.scrollback import ScrollbackLine, ScrollbackStore
+
+
+def make_screen(columns=40, lines=5, history=100):
+    screen = TerminalScreen(columns, lines, history=history)
+    return screen, pyte.Stream(screen)
+
+
+def log_lines(count, columns=120):
+    """Build-log style output: mostly plain text, every fifth line coloured"""
+    out = []
+    for i in range(count):
+        if i % 5 == 0:
+            out.append(f"\x1b[1;32m[{i:06d}] OK\x1b[0m compiled src/module_{i % 97}/file_{i}.c")
+        else:
+            out.append(f"[{i:06d}] gcc -O2 -Wall -c src/module_{i % 97}/file_{i}.c -o build/file_{i}.o")
+    return "\r\n".join(line[:columns] for line in out) + "\r\n"
+
+
+def test_history_lines_render_like_the_screen():
+    screen, stream = make_screen()
+    expected = []
+    for text in ("\x1b[31mred\x1b[0m plain", "中文 wide", "e\u0301 combining", "\x1b[44m   \x1b[0m"):
+        stream.feed("\x1b[H\x1b[2K" + text)
+        expected.append(render_runs(screen.buffer[0], screen.columns))
+        stream.feed("\x1b[5;1H\n")  # Scroll the top row into history
+    history = screen.history.top
+    assert isinstance(history, ScrollbackStore)
+    assert all(isinstance(line, ScrollbackLine) for line in history)
+    assert history.render_range(0, len(history), screen.columns) == expected
+    assert history.render_range(2, 4, screen.columns) == expected[2:]
+
+
+def test_resize_pads_and_truncates_history():
+    screen, stream = make_screen(columns=20)
+    stream.feed("\x1b[31mabcdefghij\x1b[0m" + "\r\n" * 5)
+    line = screen.history.top[0]
+    text, runs = line.render(10)
+    assert text == "abcdefghij" and runs == ((10, runs[0][1]),)
+    text, runs = line.render(30)
+    assert text == "abcdefghij".ljust(30) and runs[-1] == (20, None)
+    assert line.render(4)[0] == "abcd"
+    assert ScrollbackLine.from_rendered("中文  ", None, 6).render(3)[0] == "中 "
+
+
+def test_prev_page_restores_pyte_lines():
+    screen, stream = make_screen(columns=20, lines=3)
+    stream.feed("\r\n".join(f"line {i}" for i in range(10)))
+    before = [render_runs(screen.buffer[y], 20) for y in range(3)]
+    screen.prev_page()
+    assert screen.display[-1].startswith("line 7")
+    screen.next_page()
+    assert [render_runs(screen.buffer[y], 20) for y in range(3)] == before
+
+
+def test_old_lines_spill_to_disk_and_read_back():
+    store = ScrollbackStore(100, 20, render_runs, hot_lines=10, spill_batch=5)
+    expected = []
+    for i in range(60):
+        text, runs = render_runs(f"line {i} é中".ljust(20), 20)
+        if i % 3 == 0:
+            runs = ((5, ("red",) + runs_default()[1:]), (len(text) - 5, None))
+        expected.append((text, runs))
+        store.append(ScrollbackLine.from_rendered(text, runs, 20))
+    try:
+        assert len(store) == 60 and store.spilled >= 45 and os.path.exists(store.path)
+        assert store.render_range(0, 60, 20) == expected
+        assert store[-1].render(20) == expected[-1]
+
+        # Past maxlen the oldest lines are dropped; sequence numbers stay stable
+        for i in range(60, 150):
+            store.append(ScrollbackLine.from_rendered(f"line {i}".ljust(20), None, 20))
+        assert len(store) == 100 and store.dropped == 50
+        assert store.render_seq(50, 52, 20)[0][0].startswith("line 50")
+        assert store.render_seq(48, 51, 20)[:2] == [(" " * 20, None)] * 2
+    finally:
+        path = store.path
+        store.close()
+    assert not os.path.exists(path)
+
+
+def test_spill_file_stays_bounded_past_maxlen():
+    store = ScrollbackStore(200, 20, render_runs, hot_lines=20, spill_batch=10)
+    store.compact_bytes = 0
+    record = len(ScrollbackLine.from_rendered("line 0".ljust(20), None, 20).to_bytes())
+    sizes, paths = [], set()
+    try:
+        for i in range(5000):
+            store.append(ScrollbackLine.from_rendered(f"line {i}".ljust(20), None, 20))
+            if store.path:
+                paths.add(store.path)
+                sizes.append(os.path.getsize(store.path))
+        # A fresh file holds only the retained lines; dropped ones take up at most as much again
+        assert max(sizes) <= 2 * 200 * (record + 2) and len(paths) > 1
+        assert len(store) == 200 and store.dropped == 4800
+        assert store.render_range(0, 1, 20)[0][0].startswith("line 4800")
+        assert store.render_seq(4999, 5000, 20)[0][0].startswith("line 4999")
+    finally:
+        store.close()
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def runs_default():
+    from ui.screen_worker import DEFAULT_ATTRS
+    return DEFAULT_ATTRS
+
+
+def test_worker_mirrors_hot_window_and_removes_spill_file():
+    worker = ScreenWorker(20, 5, history=1000, hot_history=20)
+    worker.screen.history.top.spill_batch = 10
+    worker.start()
+    worker.take_snapshot()
+    try:
+        worker.feed("".join(f"line {i}\r\n" for i in range(200)).encode())
+        assert worker.wait_idle(5.0)
+        snapshot = worker.take_snapshot()
+        assert snapshot.history_len == 20 and snapshot.history_total == 196
+        assert snapshot.history[-1].startswith("line 195")
+        assert worker.history_lines(snapshot.history_first, snapshot.history_first + 2, 20)[1][0].startswith("line 1")
+        path = worker.screen.history.top.path
+        assert os.path.exists(path)
+    finally:
+        worker.stop()
+        worker.wait(2000)
+    assert not os.path.exists(path)
+
+
+def deep_size(obj, seen):
+    """sys.getsizeof of obj and everything it references, counting shared objects once"""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (tuple, list, collections.deque)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif isinstance(obj, ScrollbackLine):
+        size += sum(deep_size(getattr(obj, name), seen) for name in ScrollbackLine.__slots__)
+    elif isinstance(obj, ScrollbackStore):
+        size += deep_size(obj._hot, seen) + sys.getsizeof(obj._offsets)
+    return size
+
+
+def measure_history(screen_class, lines, columns=120):
+    """Bytes held per history line after feeding `lines` lines of log output"""
+    screen = screen_class(columns, 50, history=lines)
+    stream = pyte.Stream(screen)
+    data = log_lines(lines + 50, columns)
+    start = time.perf_counter()
+    for offset in range(0, len(data), 65536):
+        stream.feed(data[offset:offset + 65536])
+    elapsed = time.perf_counter() - start
+    count = len(screen.history.top)
+    return deep_size(screen.history.top, set()) / count, count, elapsed
+
+
+def benchmark_memory(lines=100000, pyte_lines=10000):
+    """Bytes per history line: pyte Line dicts vs ScrollbackStore"""
+    print(f"\n=== Scrollback memory, 120-column build log ===")
+    per_line, count, elapsed = measure_history(pyte.HistoryScreen, pyte_lines)
+    print(f"pyte Line dicts:   {per_line:8.0f} bytes/line ({count} lines, "
+          f"~{per_line * lines / 1024 / 1024:.0f} MB for {lines})")
+    per_line, count, elapsed = measure_history(TerminalScreen, lines)
+    print(f"ScrollbackStore:   {per_line:8.0f} bytes/line ({count} lines, "
+          f"{per_line * count / 1024 / 1024:.0f} MB; pyte took {elapsed:.1f}s to parse them)")
+
+
+def benchmark_spill(lines=1000000, hot_lines=10000, columns=120):
+    """Append a million lines with a 10k in-memory window, then read random screens back"""
+    print(f"\n=== Spilled scrollback, {lines} lines, {hot_lines} in memory ===")
+    store = ScrollbackStore(lines, columns, render_runs, hot_lines=hot_lines)
+    packed = [ScrollbackLine.from_rendered(*render_runs(text.ljust(columns), columns), columns)
+              for text in log_lines(1000, columns).split("\r\n")[:1000]]
+    start = time.perf_counter()
+    for i in range(lines):
+        line = packed[i % 1000]
+        store.append(ScrollbackLine(line.text, line.width, line.columns, line.runs))
+    elapsed = time.perf_counter() - start
+    print(f"Append:            {lines / elapsed:10.0f} lines/s")
+    print(f"In memory:         {deep_size(store, set()) / 1024 / 1024:10.1f} MB "
+          f"(spill file {os.path.getsize(store.path) / 1024 / 1024:.0f} MB)")
+
+    rng = random.Random(1)
+    samples = []
+    for _ in range(200):
+        first = rng.randrange(0, lines - hot_lines - 60)
+        start = time.perf_counter()
+        store.render_range(first, first + 60, columns)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    print(f"Read a 60-line screen from disk: p50 {samples[100]:.3f}ms  p95 {samples[190]:.3f}ms")
+    store.close()
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("Scrollback store benchmark")
+    print("=" * 60)
+    benchmark_spill()
+    benchmark_memory()
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
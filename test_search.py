@@ -0,0 +1,227 @@
+"""
+Scrollback search tests and benchmark.
+
+Lines entering history are copied into a SearchIndex (chunked plain text in
+an mmap'd file); SearchThread scans the screen rows and then the index,
+newest lines first, and streams matches back. The benchmark measures
+time-to-first-hit and full-scan time on a million lines of scrollback.
+"""
+import os
+import re
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import Qt
+from conftest import FakeSession, get_app
+from ui.grid_terminal import GridTerminal
+from ui.scrollback import ScrollbackLine, ScrollbackStore
+from ui.screen_worker import render_runs
+from ui.search_index import SearchIndex, SearchThread, compile_query, line_matches
+from ui.terminal import Terminal
+
+
+def run_search(index, query, regex=False, screen_lines=(), history_first=0, screen_start=None):
+    """All matches of a query, in the order SearchThread streams them"""
+    thread = SearchThread(index, compile_query(query, regex), screen_lines, history_first,
+                          len(index) if screen_start is None else screen_start,
+                          literal=None if regex else query)
+    batches = []
+    thread.matches_found.connect(batches.append, type=Qt.ConnectionType.DirectConnection)
+    thread.run()  # Synchronously, on this thread
+    return [match for batch in batches for match in batch], thread
+
+
+def test_query_modes():
+    assert line_matches(compile_query("error"), "Error: error") == [(0, 5), (7, 12)]
+    assert line_matches(compile_query("Error"), "Error: error") == [(0, 5)]  # Smart case
+    assert line_matches(compile_query("a.c"), "abc a.c") == [(4, 7)]
+    assert line_matches(compile_query(r"\d+ms", regex=True), "took 15ms, 7ms") == [(5, 9), (11, 14)]
+    # Escapes like \S are not capitals, so this still ignores case
+    assert line_matches(compile_query(r"\S+ms", regex=True), "took 15MS") == [(5, 9)]
+    assert line_matches(compile_query(r"\S+MS", regex=True), "took 15ms") == []
+    try:
+        compile_query("(", regex=True)
+        assert False, "invalid regex accepted"
+    except re.error:
+        pass
+
+
+def test_index_maps_matches_to_sequence_numbers():
+    index = SearchIndex(chunk_lines=10)
+    for i in range(95):
+        index.add(f"line {i} {'needle' if i % 20 == 3 else 'hay'} é中")
+    try:
+        assert len(index) == 95 and os.path.exists(index.path)
+        matches, thread = run_search(index, "needle")
+        assert [seq for seq, _, _ in matches] == [83, 63, 43, 23, 3]
+        seq, start, end = matches[0]
+        assert f"line {seq} needle"[start:end] == "needle"
+
+        # Dropped lines and lines the view has not seen yet are skipped;
+        # screen rows come first, bottom row first
+        matches, _ = run_search(index, "needle", screen_lines=["needle", "x needle"],
+                                history_first=10, screen_start=80)
+        assert matches == [(81, 2, 8), (80, 0, 6), (63, 8, 14), (43, 8, 14), (23, 8, 14)]
+
+        matches, _ = run_search(index, r"中$", regex=True)
+        assert len(matches) == 95 and matches[0][0] == 94
+        assert thread.lines_searched == 95 and thread.first_hit_ms is not None
+    finally:
+        path = index.path
+        index.close()
+    assert not os.path.exists(path)
+
+
+def test_literal_queries_skip_chunks_that_cannot_match():
+    index = SearchIndex(chunk_lines=100)
+    for i in range(1000):
+        index.add(f"[{i:04d}] compiled module_{i % 7}.c{' Needle-Unique' if i == 5 else ''}")
+    try:
+        matches, thread = run_search(index, "needle-unique")
+        assert [seq for seq, _, _ in matches] == [5]
+        # Only the oldest chunk was read; the rest were ruled out by their summaries
+        assert thread.chunks_skipped == 9 and thread.lines_searched == 1000
+
+        matches, thread = run_search(index, "Needle-Unique")  # Case-sensitive
+        assert [seq for seq, _, _ in matches] == [5] and thread.chunks_skipped == 9
+        matches, thread = run_search(index, "segfault")
+        assert matches == [] and thread.chunks_skipped == 10
+
+        # Short and regex queries read every chunk
+        matches, thread = run_search(index, "e_", history_first=900)
+        assert len(matches) == 100 and thread.chunks_skipped == 0
+        matches, thread = run_search(index, r"needle-\w+", regex=True)
+        assert [seq for seq, _, _ in matches] == [5] and thread.chunks_skipped == 0
+    finally:
+        index.close()
+
+
+def test_index_drops_chunks_that_left_the_scrollback():
+    index = SearchIndex(chunk_lines=10)
+    index.compact_bytes = 0
+    store = ScrollbackStore(100, 20, render_runs, hot_lines=20, spill_batch=10, index=index)
+    sizes, paths = [], set()
+    try:
+        for i in range(3000):
+            store.append(ScrollbackLine.from_rendered(f"line {i}{' needle' if i % 50 == 7 else ''}".ljust(20),
+                                                      None, 20))
+            if index.path:
+                paths.add(index.path)
+                sizes.append(os.path.getsize(index.path))
+        assert len(index) == 3000 and len(paths) > 1
+        # Only the chunks still in scrollback (plus the ones dropped since the last rewrite)
+        assert max(sizes) <= 2 * (100 + 10) * 21
+        matches, _ = run_search(index, "needle", history_first=store.dropped)
+        assert [seq for seq, _, _ in matches] == [2957, 2907]
+    finally:
+        store.close()
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def wait_for_search(terminal, timeout=5.0):
+    app = get_app()
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        app.processEvents()
+        thread = terminal.search_thread
+        if thread is not None and thread.isFinished() and thread.elapsed_ms is not None:
+            app.processEvents()  # Deliver the last batch
+            return
+        time.sleep(0.005)
+    raise AssertionError("search did not finish")
+
+
+def check_terminal_search(view):
+    app = get_app()
+    settings = {"terminal": {"scrollback_lines": 10000, "scrollback_hot_lines": 50}}
+    terminal = view(FakeSession(), settings)
+    terminal.resize(500, 300)
+    terminal.show()
+    app.processEvents()
+    terminal.flush_resize()
+    terminal.screen.history.top.spill_batch = 20
+    try:
+        terminal.on_data_received(b"".join(b"line %d%s\r\n" % (i, b" MARK" if i in (7, 1500) else b"")
+                                           for i in range(3000)))
+        terminal.worker.wait_idle(5.0)
+        terminal.refresh_display()
+
+        terminal.show_search()
+        assert terminal.search_bar.isVisible()
+        terminal._start_search("mark", False)
+        wait_for_search(terminal)
+        assert [seq for seq, _, _ in terminal.search_matches] == [1500, 7]
+        assert terminal.search_bar.status_label.text() == "1 of 2"
+
+        # The newest match is shown; Enter moves to the older one, in spilled history
+        terminal._step_match(1)
+        assert terminal.current_match() == (7, 7, 11)
+        return terminal
+    except Exception:
+        terminal.close()
+        raise
+
+
+def test_text_widget_search_scrolls_and_highlights():
+    terminal = check_terminal_search(Terminal)
+    try:
+        first, stop = terminal.document_range()
+        assert first <= 7 < stop
+        assert "line 7 MARK" in terminal.toPlainText()
+        highlighted = [s.cursor.selectedText() for s in terminal.extraSelections() if s.cursor.hasSelection()]
+        assert "MARK" in highlighted
+
+        # New output does not pull the view away from the match until search closes
+        terminal.on_data_received(b"more\r\n")
+        terminal.worker.wait_idle(5.0)
+        terminal.refresh_display()
+        assert terminal.document_range()[0] <= 7
+        terminal.search_bar.close_bar()
+        assert terminal.search_pattern is None and not terminal._search_pinned
+    finally:
+        terminal.close()
+
+
+def test_grid_terminal_search_scrolls_to_match():
+    terminal = check_terminal_search(GridTerminal)
+    try:
+        top = terminal.verticalScrollBar().value()
+        assert top <= 7 < top + terminal.visible_rows()
+        terminal.viewport().repaint()  # Paints the highlights
+    finally:
+        terminal.close()
+
+
+def benchmark_search(lines=1000000, columns=120):
+    """Time to first hit and full-scan time over a million lines of build-log scrollback"""
+    print(f"\n=== Search over {lines} lines of scrollback ===")
+    index = SearchIndex()
+    start = time.perf_counter()
+    for i in range(lines):
+        marker = " UNIQUE-OLDEST" if i == 5 else (" warning: unused" if i % 5000 == 4999 else "")
+        index.add(f"[{i:07d}] gcc -O2 -Wall -c src/module_{i % 97}/file_{i}.c -o build/file_{i}.o{marker}")
+    elapsed = time.perf_counter() - start
+    print(f"Indexing:          {lines / elapsed:10.0f} lines/s, "
+          f"file {os.path.getsize(index.path) / 1024 / 1024:.0f} MB")
+
+    for label, query, regex in (("Recent hits", "warning", False),
+                                ("Only the oldest line", "unique-oldest", False),
+                                ("No match", "segfault", False),
+                                ("Regex", r"file_\d+999\.c", True)):
+        matches, thread = run_search(index, query, regex)
+        first_hit = f"{thread.first_hit_ms:8.1f}ms" if thread.first_hit_ms is not None else "     n/a  "
+        print(f"{label:22s} first hit {first_hit}  all {thread.elapsed_ms:8.1f}ms  ({len(matches)} matches, "
+              f"{thread.chunks_skipped} chunks skipped)")
+    index.close()
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("Scrollback search benchmark")
+    print("=" * 60)
+    benchmark_search()
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
@@ -0,0 +1,156 @@
+"""
+Bastion (ProxyJump) pooling tests and benchmark.
+
+Sessions behind the same bastion open direct-tcpip channels on one pooled,
+authenticated jump transport instead of each logging in to the bastion.
+Chains of several bastions pool hop by hop, and a bastion no tab uses is
+closed after jump_pool.idle_timeout. In-process paramiko servers stand in
+for the bastions and targets.
+"""
+import threading
+import time
+
+from conftest import EchoServer, close_all, idle_timeout, read_until, use_scratch_auth_plans
+from ssh.transport_pool import hop_key, jump_hops, jump_pool
+from ui.session_manager import format_jump_hops, parse_jump_hops
+
+
+def test_hops_parse_like_ssh_j():
+    hops = parse_jump_hops("ops@bastion2:2222, gw")
+    assert hops == [{"host": "bastion2", "port": 2222, "username": "ops"},
+                    {"host": "gw", "port": 22, "username": None}]
+    assert format_jump_hops(hops) == "ops@bastion2:2222, gw"
+    settings = {"enabled": True, "host": "b1", "port": 22, "username": "u", "hops": hops}
+    assert [hop["host"] for hop in jump_hops(settings)] == ["b1", "bastion2", "gw"]
+    assert jump_hops({"enabled": False, "host": "b1"}) == []
+
+
+def test_hops_without_a_user_log_in_as_the_jump_user():
+    settings = {"enabled": True, "host": "b1", "port": 22, "username": "u", "hops": parse_jump_hops("gw")}
+    assert [hop["username"] for hop in jump_hops(settings, "me")] == ["u", "u"]
+    # No jump user either: the session's user, as for ssh -J
+    settings["username"] = ""
+    assert [hop["username"] for hop in jump_hops(settings, "me")] == ["me", "me"]
+    assert settings["hops"][0]["username"] is None  # The saved settings keep what was typed
+
+
+def test_tabs_behind_one_bastion_share_its_login():
+    bastion, target_a, target_b = EchoServer(), EchoServer(), EchoServer()
+    sessions = [target_a.session(jump=[bastion]), target_b.session(jump=[bastion]),
+                target_b.session(jump=[bastion], share_transport=False)]
+    with idle_timeout(0):
+        try:
+            assert sessions[0].connect() and sessions[1].connect()
+            assert bastion.connections == 1 and bastion.logins == 1
+            assert sessions[0].jump_transport is sessions[1].jump_transport
+            sessions[1].send_command("through the bastion\n")
+            read_until(sessions[1], b"through the bastion")
+
+            # Not sharing: a bastion login of its own
+            assert sessions[2].connect() and bastion.logins == 2
+
+            key = sessions[0].jump_ref.key
+            assert jump_pool.refs(key) == 2
+            sessions[0].close()
+            assert sessions[1].jump_transport.is_active()
+            sessions[1].close()
+            assert not jump_pool.has(key)
+        finally:
+            close_all(sessions, [bastion, target_a, target_b])
+
+
+def test_multi_hop_chain_pools_every_hop():
+    outer, inner, target_a, target_b = EchoServer(), EchoServer(), EchoServer(), EchoServer()
+    sessions = [target_a.session(jump=[outer, inner]), target_b.session(jump=[outer, inner])]
+    with idle_timeout(0):
+        try:
+            for session in sessions:
+                assert session.connect()
+                session.send_command("two hops\n")
+                read_until(session, b"two hops")
+            assert outer.logins == 1 and inner.logins == 1
+            assert outer.connections == 1 and inner.connections == 1
+
+            outer_key = hop_key(outer.hop())
+            inner_key = sessions[0].jump_ref.key
+            assert inner_key == hop_key(inner.hop(), outer_key)
+            assert jump_pool.refs(outer_key) == 1  # Held by the inner hop, not by the tabs
+            assert jump_pool.refs(inner_key) == 2
+            for session in sessions:
+                session.close()
+            assert not jump_pool.has(inner_key) and not jump_pool.has(outer_key)
+        finally:
+            close_all(sessions, [outer, inner, target_a, target_b])
+
+
+def test_idle_bastion_is_reused_then_expires():
+    bastion, target = EchoServer(), EchoServer()
+    sessions = [target.session(jump=[bastion]) for _ in range(2)]
+    with idle_timeout(0.3):
+        try:
+            assert sessions[0].connect()
+            transport = sessions[0].jump_transport
+            key = sessions[0].jump_ref.key
+            sessions[0].close()
+            assert transport.is_active() and jump_pool.has(key)  # Idle, not closed yet
+
+            # The target transport closed with the first tab; the bastion login is reused
+            assert sessions[1].connect() and bastion.logins == 1 and target.logins == 2
+            sessions[1].close()
+            deadline = time.perf_counter() + 5
+            while transport.is_active():
+                assert time.perf_counter() < deadline, "idle bastion was not closed"
+                time.sleep(0.05)
+            assert not jump_pool.has(key)
+        finally:
+            close_all(sessions, [bastion, target])
+
+
+def test_tabs_opened_together_wait_for_one_bastion_login():
+    bastion = EchoServer(auth_delay=0.2)
+    targets = [EchoServer() for _ in range(5)]
+    sessions = [target.session(jump=[bastion]) for target in targets]
+    results = []
+    with idle_timeout(0):
+        try:
+            threads = [threading.Thread(target=lambda s=session: results.append(s.connect())) for session in sessions]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(30)
+            assert results == [True] * 5
+            assert bastion.logins == 1 and bastion.connections == 1
+        finally:
+            close_all(sessions, [bastion] + targets)
+
+
+def benchmark_tabs_behind_a_bastion(tabs=30, auth_delay=0.3):
+    """Bastion logins and time to open tabs to different hosts behind one bastion"""
+    print(f"\n=== Open {tabs} tabs behind one bastion (bastion login takes {auth_delay * 1000:.0f}ms) ===")
+    with idle_timeout(0):
+        for share in (False, True):
+            bastion = EchoServer(auth_delay=auth_delay)
+            targets = [EchoServer() for _ in range(tabs)]
+            sessions = []
+            start = time.perf_counter()
+            for target in targets:
+                session = target.session(jump=[bastion], share_transport=share)
+                assert session.connect()
+                sessions.append(session)
+            elapsed = time.perf_counter() - start
+            label = "pooled bastion" if share else "login per tab"
+            print(f"{label:15s}: {elapsed:6.2f}s total, {elapsed / tabs * 1000:7.1f}ms per tab, "
+                  f"{bastion.logins} bastion logins, {bastion.connections} TCP connections to it")
+            close_all(sessions, [bastion] + targets)
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("Bastion pooling benchmark")
+    print("=" * 60)
+    benchmark_tabs_behind_a_bastion()
+
+
+if __name__ == "__main__":
+    use_scratch_auth_plans()
+    run_all_benchmarks()
@@ -0,0 +1,137 @@
+"""
+SSH connection sharing tests and benchmark.
+
+A second tab to the same user@host opens another channel on the first tab's
+authenticated paramiko Transport (like OpenSSH ControlMaster) instead of a
+new TCP connection, key exchange and login. An in-process paramiko server
+with a slow password check stands in for a real sshd.
+"""
+import time
+
+from conftest import EchoServer, read_until, use_scratch_auth_plans
+from ssh.transport_pool import TransportPool, transport_key, transport_pool
+
+
+def test_pool_refcounts_and_drops_dead_transports():
+    class FakeTransport:
+        def __init__(self):
+            self.active = True
+
+        def is_active(self):
+            return self.active
+
+        def close(self):
+            self.active = False
+
+    pool = TransportPool()
+    key = transport_key("h", 22, "u")
+    assert key != transport_key("h", 22, "u", {"enabled": True, "host": "jump"})
+    first = FakeTransport()
+    assert pool.acquire(key) is None
+    assert pool.register(key, first, [first])
+    assert not pool.register(key, FakeTransport(), [])  # The live one stays shared
+    assert pool.acquire(key) is first and pool.refs(key) == 2
+    pool.release(key, first)
+    assert first.active and pool.has(key)
+    pool.release(key, first)
+    assert not first.active and not pool.has(key)
+
+    dead = FakeTransport()
+    pool.register(key, dead, [dead])
+    dead.active = False
+    assert pool.acquire(key) is None and not pool.has(key)
+
+
+def test_second_tab_is_a_channel_on_the_first_tabs_transport():
+    server = EchoServer()
+    first, second = server.session(), server.session()
+    try:
+        assert first.connect() and not first.reused_transport
+        assert second.connect() and second.reused_transport
+        assert server.connections == 1 and server.logins == 1
+        assert second.shell.get_transport() is first.shell.get_transport()
+
+        read_until(second, b"$ ")
+        second.send_command("hello second\n")
+        assert b"hello second" in read_until(second, b"hello second")
+
+        # Closing the tab that logged in keeps the connection for the other
+        first.close()
+        transport = second.shell.get_transport()
+        assert transport.is_active() and transport_pool.refs(second.pool_key) == 1
+        second.send_command("still here\n")
+        read_until(second, b"still here")
+
+        key = second.pool_key
+        second.close()
+        assert not transport.is_active() and not transport_pool.has(key)
+    finally:
+        first.close()
+        second.close()
+        server.close()
+
+
+def test_unshared_sessions_and_full_transports_log_in_again():
+    server = EchoServer(max_sessions=1)
+    sessions = [server.session(share_transport=False), server.session(), server.session()]
+    try:
+        assert sessions[0].connect() and sessions[0].pool_key is None
+        assert sessions[1].connect() and not sessions[1].reused_transport
+        # The server refuses a second channel; the session falls back to its own login
+        assert sessions[2].connect() and not sessions[2].reused_transport
+        assert server.connections == 3 and server.logins == 3
+        assert transport_pool.refs(sessions[1].pool_key) == 1
+        sessions[2].send_command("own connection\n")
+        read_until(sessions[2], b"own connection")
+    finally:
+        for session in sessions:
+            session.close()
+        server.close()
+
+
+def test_duplicate_reuses_the_login():
+    server = EchoServer()
+    original = server.session()
+    copy = None
+    try:
+        assert original.connect()
+        copy = original.duplicate()
+        assert copy.connect() and copy.reused_transport and server.logins == 1
+    finally:
+        original.close()
+        if copy:
+            copy.close()
+        server.close()
+
+
+def benchmark_tab_open_time(tabs=5, auth_delay=0.3):
+    """Time to open each extra tab to a host, with and without a shared transport"""
+    print(f"\n=== Open {tabs} tabs to one host (login takes {auth_delay * 1000:.0f}ms) ===")
+    for share in (False, True):
+        server = EchoServer(auth_delay=auth_delay)
+        sessions = []
+        times = []
+        for _ in range(tabs):
+            session = server.session(share_transport=share)
+            start = time.perf_counter()
+            assert session.connect()
+            times.append((time.perf_counter() - start) * 1000)
+            sessions.append(session)
+        label = "shared transport" if share else "new connection each"
+        print(f"{label:20s}: first {times[0]:7.1f}ms, later tabs {sum(times[1:]) / (tabs - 1):7.1f}ms avg, "
+              f"{server.connections} TCP connections, {server.logins} logins")
+        for session in sessions:
+            session.close()
+        server.close()
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("SSH connection sharing benchmark")
+    print("=" * 60)
+    benchmark_tab_open_time()
+
+
+if __name__ == "__main__":
+    use_scratch_auth_plans()
+    run_all_benchmarks()
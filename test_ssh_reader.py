@@ -0,0 +1,208 @@
+"""
+Reader latency / idle CPU benchmark for the SSH output path.
+
+Compares the old polling loop (read_output + 5ms sleep) with the event-driven
+loop used by SSHReaderThread (wait_for_output blocks on the channel fileno).
+A socketpair stands in for the paramiko Channel so no SSH server is needed.
+"""
+import select
+import socket
+import statistics
+import threading
+import time
+
+from PyQt6.QtCore import Qt
+from ssh.backend import SSHSession
+from ui.terminal import SSHReaderThread
+
+
+class SocketChannel:
+    """Minimal stand-in for paramiko.Channel backed by a socketpair"""
+    def __init__(self):
+        self.local, self.remote = socket.socketpair()
+        self.closed = False
+        self.eof_received = False
+
+    def fileno(self):
+        return self.local.fileno()
+
+    def recv_ready(self):
+        if self.closed:
+            return False
+        readable, _, _ = select.select([self.local], [], [], 0)
+        return bool(readable)
+
+    def recv(self, nbytes):
+        return self.local.recv(nbytes)
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.local.sendall(data)
+
+    def close(self):
+        self.closed = True
+        self.local.close()
+        self.remote.close()
+
+
+def make_session():
+    session = SSHSession("bench.invalid", 22, "bench")
+    session.shell = SocketChannel()
+    session.running = True
+    return session
+
+
+def polling_reader(session, stop, on_data, wakeups):
+    """The pre-change SSHReaderThread loop"""
+    while not stop.is_set():
+        wakeups[0] += 1
+        data = session.read_output()
+        if data:
+            on_data(data)
+        else:
+            time.sleep(0.005)
+
+
+def event_reader(session, stop, on_data, wakeups):
+    """The event-driven SSHReaderThread loop"""
+    while not stop.is_set():
+        wakeups[0] += 1
+        if session.wait_for_output(0.25):
+            data = session.read_output()
+            if data:
+                on_data(data)
+
+
+def test_wait_for_output_wakes_on_data():
+    session = make_session()
+    try:
+        start = time.perf_counter()
+        assert not session.wait_for_output(0.05)
+        assert time.perf_counter() - start >= 0.04
+
+        session.shell.remote.sendall("héllo".encode('utf-8'))
+        assert session.wait_for_output(1.0)
+        assert session.read_output() == "héllo".encode('utf-8')
+        assert session.read_output() is None
+    finally:
+        session.shell.close()
+
+
+def test_read_output_drains_everything_ready():
+    session = make_session()
+    session.buffer_size = 1024
+    try:
+        payload = b"x" * 100000
+        session.shell.remote.sendall(payload)
+        time.sleep(0.05)
+        assert len(session.read_output()) == len(payload)
+    finally:
+        session.shell.close()
+
+
+def test_reader_pauses_at_high_water_mark():
+    session = make_session()
+    session.buffer_size = 1024
+    reader = SSHReaderThread(session, high_water_bytes=64 * 1024)
+    received = []
+    # Direct connection: the slot runs on the reader thread and never calls consumed()
+    reader.data_received.connect(received.append, Qt.ConnectionType.DirectConnection)
+    payload = b"z" * (512 * 1024)
+    sender = threading.Thread(target=session.shell.remote.sendall, args=(payload,), daemon=True)
+    sender.start()
+    reader.start()
+    try:
+        deadline = time.time() + 2.0
+        while reader.throttle_count == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert reader.throttle_count == 1
+        held = sum(len(chunk) for chunk in received)
+        assert reader.high_water_bytes <= held < len(payload)
+        time.sleep(0.1)
+        assert sum(len(chunk) for chunk in received) == held  # No recv() while paused
+
+        # The GUI catching up lets the reader continue
+        while sum(len(chunk) for chunk in received) < len(payload) and time.time() < deadline + 2.0:
+            reader.consumed(reader.pending_bytes)
+            time.sleep(0.01)
+        assert b"".join(received) == payload
+        assert reader.peak_pending_bytes >= reader.high_water_bytes
+    finally:
+        reader.stop()
+        reader.wait(2000)
+        session.shell.close()
+
+
+def test_reader_ends_at_eof_once_drained():
+    session = make_session()
+    reader = SSHReaderThread(session)
+    received = []
+    closed = []
+    reader.data_received.connect(received.append, Qt.ConnectionType.DirectConnection)
+    reader.session_closed.connect(lambda: closed.append(True), Qt.ConnectionType.DirectConnection)
+    session.shell.remote.sendall(b"logout\r\n")
+    time.sleep(0.05)
+    session.shell.eof_received = True  # The server sent EOF but hasn't closed the channel yet
+    reader.start()
+    try:
+        assert reader.wait(2000), "reader kept polling after EOF"
+        assert b"".join(received) == b"logout\r\n"
+        assert closed == [True]
+    finally:
+        reader.stop()
+        reader.wait(2000)
+        session.shell.close()
+
+
+def benchmark_idle_cpu(reader, seconds=2.0):
+    session = make_session()
+    stop = threading.Event()
+    wakeups = [0]
+    thread = threading.Thread(target=reader, args=(session, stop, lambda d: None, wakeups))
+    cpu_start = time.process_time()
+    thread.start()
+    time.sleep(seconds)
+    stop.set()
+    thread.join()
+    cpu = time.process_time() - cpu_start
+    session.shell.close()
+    return cpu / seconds * 100, wakeups[0] / seconds
+
+
+def benchmark_echo_latency(reader, samples=200):
+    session = make_session()
+    stop = threading.Event()
+    received = threading.Event()
+    wakeups = [0]
+    thread = threading.Thread(target=reader, args=(session, stop, lambda d: received.set(), wakeups))
+    thread.start()
+    latencies = []
+    for _ in range(samples):
+        received.clear()
+        start = time.perf_counter()
+        session.shell.remote.sendall(b"a")  # The remote "echoes" a keystroke
+        received.wait(1.0)
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.002)
+    stop.set()
+    thread.join()
+    session.shell.close()
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+def run_all_benchmarks():
+    print("=" * 60)
+    print("SSH reader: polling vs event-driven")
+    print("=" * 60)
+    for name, reader in (("polling (5ms sleep)", polling_reader), ("event-driven", event_reader)):
+        cpu, wakeups = benchmark_idle_cpu(reader)
+        p50, p95 = benchmark_echo_latency(reader)
+        print(f"{name:20s} idle CPU {cpu:5.2f}%  wakeups/s {wakeups:7.1f}  "
+              f"echo p50 {p50:.3f}ms  p95 {p95:.3f}ms")
+    print("Multiply idle wakeups/s by the number of open tabs for the total.")
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
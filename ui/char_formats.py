@@ -0,0 +1,96 @@
+from PyQt6.QtGui import QColor, QFont, QTextCharFormat
+import collections
+
+# xterm's default palette for pyte's named colours; 256-colour and truecolour
+# values arrive from pyte as 6-digit hex strings
+ANSI_COLORS = {
+    "black": "#000000",
+    "red": "#CD0000",
+    "green": "#00CD00",
+    "brown": "#CDCD00",
+    "blue": "#0000EE",
+    "magenta": "#CD00CD",
+    "cyan": "#00CDCD",
+    "white": "#E5E5E5",
+    "brightblack": "#7F7F7F",
+    "brightred": "#FF0000",
+    "brightgreen": "#00FF00",
+    "brightbrown": "#FFFF00",
+    "brightblue": "#5C5CFF",
+    "brightmagenta": "#FF00FF",
+    "brightcyan": "#00FFFF",
+    "brightwhite": "#FFFFFF",
+}
+
+# Attribute tuple layout, matching pyte's Char fields after `data`
+FG, BG, BOLD, ITALICS, UNDERSCORE, STRIKETHROUGH, REVERSE, BLINK = range(8)
+
+
+def color_value(name):
+    """QColor for a pyte colour name or hex string, or None for "default"/unknown"""
+    value = ANSI_COLORS.get(name)
+    if value is None:
+        if len(name) != 6:
+            return None
+        value = "#" + name
+    color = QColor(value)
+    return color if color.isValid() else None
+
+
+def attribute_colors(attrs, foreground, background):
+    """(fg, bg) QColors for an attribute tuple; None means the view's default.
+
+    Reverse video swaps the two, so defaults are resolved against the
+    terminal's own foreground/background colours first.
+    """
+    fg = color_value(attrs[FG])
+    bg = color_value(attrs[BG])
+    if attrs[REVERSE]:
+        return bg or background, fg or foreground
+    return fg, bg
+
+
+class CharFormatCache:
+    """Bounded LRU of QTextCharFormats keyed by pyte attribute tuples"""
+
+    def __init__(self, foreground, background, capacity=256):
+        self.foreground = QColor(foreground)
+        self.background = QColor(background)
+        self.capacity = capacity
+        self.default = QTextCharFormat()  # Plain text: colours come from the palette
+        self.hits = 0
+        self.misses = 0
+        self._formats = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._formats)
+
+    def get(self, attrs):
+        if attrs is None:
+            return self.default
+        text_format = self._formats.get(attrs)
+        if text_format is not None:
+            self.hits += 1
+            self._formats.move_to_end(attrs)
+            return text_format
+
+        self.misses += 1
+        text_format = QTextCharFormat()
+        fg, bg = attribute_colors(attrs, self.foreground, self.background)
+        if fg is not None:
+            text_format.setForeground(fg)
+        if bg is not None:
+            text_format.setBackground(bg)
+        if attrs[BOLD]:
+            text_format.setFontWeight(QFont.Weight.Bold)
+        if attrs[ITALICS]:
+            text_format.setFontItalic(True)
+        if attrs[UNDERSCORE]:
+            text_format.setFontUnderline(True)
+        if attrs[STRIKETHROUGH]:
+            text_format.setFontStrikeOut(True)
+
+        self._formats[attrs] = text_format
+        if len(self._formats) > self.capacity:
+            self._formats.popitem(last=False)
+        return text_format
@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from PyQt6.QtCore import QObject, pyqtSignal, Qt
+from PyQt6.QtWidgets import QDialog, QDialogButtonBox, QLabel, QTreeWidget, QTreeWidgetItem, QVBoxLayout
+
+QUEUED, CONNECTING, CONNECTED, FAILED = "Queued", "Connecting", "Connected", "Failed"
+
+
+class ConnectionExecutor(QObject):
+    """Connects sessions on a bounded pool of worker threads.
+
+    At most max_workers sessions are in connect() at once; the rest wait in
+    order. Signals are emitted from the worker threads (Qt queues them to
+    the GUI thread). Credential prompts from the workers should hold
+    prompt_lock so they are asked one after another, and wait for the
+    answer with wait_for_answer(); sessions given exchange_lock also keep
+    each login's prompts together.
+
+    Workers are daemon threads, as the single connect thread used to be, so
+    quitting never waits for a connect or a prompt to finish.
+    """
+    state_changed = pyqtSignal(object, str, float)  # session, state, seconds since submitted
+    connected = pyqtSignal(object, str)  # session, title
+    failed = pyqtSignal(object, str)  # session, title
+
+    def __init__(self, max_workers=32):
+        super().__init__()
+        self.max_workers = max_workers
+        self.prompt_lock = threading.Lock()  # One dialog at a time
+        self.exchange_lock = threading.Lock()  # One session's login prompts at a time (SSHSession)
+        self.closed = False
+        self._cond = threading.Condition()
+        self._queue = deque()  # (future, session, title, submitted)
+        self._workers = 0
+        self._idle = 0
+        self._prompts = set()  # Events workers are waiting on for an answer from the GUI
+
+    def set_max_workers(self, max_workers):
+        """Applies as connections start; surplus workers exit when they are next idle"""
+        with self._cond:
+            self.max_workers = max_workers
+            self._spawn()
+            self._cond.notify_all()
+
+    def submit(self, session, title):
+        submitted = time.perf_counter()
+        future = Future()
+        self.state_changed.emit(session, QUEUED, 0.0)
+        with self._cond:
+            if self.closed:
+                future.cancel()
+                return future
+            self._queue.append((future, session, title, submitted))
+            self._spawn()
+            self._cond.notify()
+        return future
+
+    def _spawn(self):
+        # Called with _cond held: a worker for each queued connection no idle worker will take
+        while len(self._queue) > self._idle and self._workers < self.max_workers:
+            self._workers += 1
+            self._idle += 1  # Counted idle until it takes a connection
+            threading.Thread(target=self._work, name="connect", daemon=True).start()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self.closed and self._workers <= self.max_workers:
+                    self._cond.wait()
+                if self.closed or not self._queue or self._workers > self.max_workers:
+                    self._workers -= 1
+                    self._idle -= 1
+                    return
+                future, session, title, submitted = self._queue.popleft()
+                self._idle -= 1
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(self._connect(session, title, submitted))
+                except Exception as e:
+                    future.set_exception(e)
+            with self._cond:
+                self._idle += 1
+
+    def _connect(self, session, title, submitted):
+        self.state_changed.emit(session, CONNECTING, time.perf_counter() - submitted)
+        try:
+            ok = session.connect()
+        except Exception as e:
+            print(f"Connection to {title} failed: {e}")
+            ok = False
+        if self.closed:
+            # The window is gone: nobody will take the session
+            session.close()
+            return False
+        self.state_changed.emit(session, CONNECTED if ok else FAILED, time.perf_counter() - submitted)
+        if ok:
+            self.connected.emit(session, title)
+        else:
+            self.failed.emit(session, title)
+        return ok
+
+    def wait_for_answer(self, event, timeout):
+        """Wait for the GUI to set event; False on timeout, or at once when shut down"""
+        with self._cond:
+            if self.closed:
+                return False
+            self._prompts.add(event)
+        try:
+            return event.wait(timeout) and not self.closed
+        finally:
+            with self._cond:
+                self._prompts.discard(event)
+
+    def shutdown(self, cancel_futures=True):
+        """Stop starting connections and release workers waiting on prompts"""
+        with self._cond:
+            self.closed = True
+            if cancel_futures:
+                while self._queue:
+                    self._queue.popleft()[0].cancel()
+            for event in self._prompts:
+                event.set()
+            self._cond.notify_all()
+
+
+class ConnectionProgress(QDialog):
+    """Per-connection state of a batch of sessions being opened"""
+
+    def __init__(self, executor, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Opening Sessions")
+        self.resize(480, 360)
+        self.items = {}  # session -> QTreeWidgetItem
+        self.states = {}
+
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Session", "Status", "Time"])
+        self.tree.setRootIsDecorated(False)
+        self.tree.setColumnWidth(0, 240)
+        layout.addWidget(self.tree)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        buttons.rejected.connect(self.close)
+        layout.addWidget(buttons)
+
+        executor.state_changed.connect(self.on_state_changed)
+
+    def add(self, session, title):
+        item = QTreeWidgetItem(self.tree, [title, QUEUED, ""])
+        item.setTextAlignment(2, Qt.AlignmentFlag.AlignRight)
+        self.items[session] = item
+        self.states[session] = QUEUED
+        self.update_summary()
+
+    def on_state_changed(self, session, state, seconds):
+        item = self.items.get(session)
+        if item is None:
+            return  # Not part of this batch
+        self.states[session] = state
+        item.setText(1, state)
+        item.setText(2, f"{seconds:.1f}s" if state != QUEUED else "")
+        self.update_summary()
+
+    def counts(self):
+        states = list(self.states.values())
+        return {state: states.count(state) for state in (QUEUED, CONNECTING, CONNECTED, FAILED)}
+
+    def finished_all(self):
+        counts = self.counts()
+        return counts[QUEUED] == 0 and counts[CONNECTING] == 0
+
+    def update_summary(self):
+        counts = self.counts()
+        self.summary_label.setText(f"{counts[CONNECTED]} of {len(self.states)} connected, "
+                                   f"{counts[CONNECTING]} connecting, {counts[QUEUED]} queued, "
+                                   f"{counts[FAILED]} failed")
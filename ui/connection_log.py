@@ -0,0 +1,50 @@
+import time
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QDialog, QDialogButtonBox, QFileDialog, QTreeWidget, QTreeWidgetItem, QVBoxLayout
+from ssh.timings import connection_log
+
+
+class ConnectionLogDialog(QDialog):
+    """Recent connection attempts with the time each phase took, with Export to JSON"""
+
+    def __init__(self, log=connection_log, parent=None):
+        super().__init__(parent)
+        self.log = log
+        self.setWindowTitle("Connection Log")
+        self.resize(900, 420)
+
+        layout = QVBoxLayout(self)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Time", "Session", "Result", "Total", "Slowest", "Phases"])
+        self.tree.setRootIsDecorated(False)
+        for column, width in enumerate((70, 200, 80, 70, 90)):
+            self.tree.setColumnWidth(column, width)
+        layout.addWidget(self.tree)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        export_button = buttons.addButton("Export JSON...", QDialogButtonBox.ButtonRole.ActionRole)
+        export_button.clicked.connect(self.export)
+        refresh_button = buttons.addButton("Refresh", QDialogButtonBox.ButtonRole.ActionRole)
+        refresh_button.clicked.connect(self.refresh)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.refresh()
+
+    def refresh(self):
+        self.tree.clear()
+        for timings in reversed(self.log.entries()):  # Newest first
+            result = "Failed" if not timings.ok else "Shared" if timings.reused else "Connected"
+            item = QTreeWidgetItem(self.tree, [
+                time.strftime("%H:%M:%S", time.localtime(timings.started)),
+                f"{timings.username}@{timings.host}:{timings.port}", result,
+                f"{timings.total() * 1000:.0f}ms", timings.slowest() or "", timings.summary()])
+            item.setTextAlignment(3, Qt.AlignmentFlag.AlignRight)
+            item.setToolTip(5, timings.tooltip())
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Connection Log", "connections.json", "JSON (*.json)")
+        if path:
+            try:
+                self.log.export_json(path)
+            except OSError as e:
+                print(f"Could not export connection log: {e}")
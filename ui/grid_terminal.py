@@ -0,0 +1,485 @@
+from PyQt6.QtWidgets import QAbstractScrollArea
+from PyQt6.QtCore import pyqtSignal, Qt, QRect
+from PyQt6.QtGui import QColor, QFont, QFontMetrics, QPainter, QPixmap
+import collections
+import re
+from wcwidth import wcwidth
+from .terminal import TerminalSessionMixin
+from .char_formats import BOLD, ITALICS, UNDERSCORE, STRIKETHROUGH, attribute_colors
+from .search_index import line_matches
+
+_RUN_RE = re.compile(r'[^ ]+')
+
+
+def text_runs(text):
+    """Split a rendered line into (column, cells, text) runs of non-blank characters.
+
+    render_line() leaves an empty stub for the second cell of a wide character, so
+    on lines with CJK/emoji the string index and the screen column differ; those
+    characters become their own two-cell runs.
+    """
+    if text.isascii():
+        for match in _RUN_RE.finditer(text):
+            run = match.group()
+            yield match.start(), len(run), run
+        return
+
+    column = 0
+    run_start = 0
+    run = []
+    for char in text:
+        width = wcwidth(char)
+        if width == 2 or char == ' ':
+            if run:
+                yield run_start, column - run_start, ''.join(run)
+                run = []
+            if width == 2:
+                yield column, 2, char
+            column += width
+        else:
+            if not run:
+                run_start = column
+            run.append(char)
+            column += width if width >= 0 else 1
+    if run:
+        yield run_start, column - run_start, ''.join(run)
+
+
+def text_width(text):
+    """Screen columns taken by a rendered string"""
+    if text.isascii():
+        return len(text)
+    width = 0
+    for char in text:
+        char_width = wcwidth(char)
+        width += char_width if char_width >= 0 else 1
+    return width
+
+
+def styled_segments(text, runs):
+    """(column, text, attrs) for each attribute run of a rendered line"""
+    ascii_only = text.isascii()
+    start = 0
+    column = 0
+    for length, attrs in runs:
+        segment = text[start:start + length]
+        yield column, segment, attrs
+        start += length
+        column += length if ascii_only else text_width(segment)
+
+
+def column_text(text, start, end):
+    """The characters of a rendered line that occupy screen columns [start, end)"""
+    if text.isascii():
+        return text[start:end]
+    chars = []
+    column = 0
+    for char in text:
+        width = wcwidth(char)
+        width = 1 if width < 0 else width
+        if start <= column < end:
+            chars.append(char)
+        column += width
+        if column >= end:
+            break
+    return ''.join(chars)
+
+
+class GlyphCache:
+    """LRU cache of pre-rendered text runs, keyed by font, attributes and text"""
+
+    def __init__(self, font, cell_width, cell_height, ascent, capacity=8192):
+        self.font = font
+        self.font_key = font.key()
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.ascent = ascent
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._pixmaps = collections.OrderedDict()
+        self._fonts = {None: font}  # style -> font variant
+
+    def _font(self, style):
+        font = self._fonts.get(style)
+        if font is None:
+            bold, italics, underscore, strikethrough = style
+            font = QFont(self.font)
+            font.setBold(bold)
+            font.setItalic(italics)
+            font.setUnderline(underscore)
+            font.setStrikeOut(strikethrough)
+            self._fonts[style] = font
+        return font
+
+    def __len__(self):
+        return len(self._pixmaps)
+
+    def get(self, text, cells, color, ratio=1.0, style=None):
+        """Pixmap of text drawn in color over a transparent cells-wide strip.
+
+        style is None or a (bold, italics, underscore, strikethrough) tuple.
+        """
+        key = (self.font_key, color.rgba(), style, ratio, text)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self.hits += 1
+            self._pixmaps.move_to_end(key)
+            return pixmap
+
+        self.misses += 1
+        pixmap = QPixmap(max(1, int(cells * self.cell_width * ratio)), max(1, int(self.cell_height * ratio)))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setFont(self._font(style))
+        painter.setPen(color)
+        painter.drawText(0, self.ascent, text)
+        painter.end()
+
+        self._pixmaps[key] = pixmap
+        if len(self._pixmaps) > self.capacity:
+            self._pixmaps.popitem(last=False)
+        return pixmap
+
+
+class GridTerminal(TerminalSessionMixin, QAbstractScrollArea):
+    """Terminal view that paints the character grid directly.
+
+    Uses fixed cell metrics and a GlyphCache instead of QTextDocument layout,
+    so a frame costs one pixmap blit per run of text on the rows that changed.
+    """
+    session_closed = pyqtSignal()
+
+    def __init__(self, session, settings=None):
+        super().__init__()
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+        self.viewport().setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        self.viewport().setCursor(Qt.CursorShape.IBeamCursor)
+
+        terminal_settings = self.terminal_settings(settings)
+        self.foreground = QColor(terminal_settings.get("foreground_color", "#FFFFFF"))
+        self.background = QColor(terminal_settings.get("background_color", "#000000"))
+        self.selection_color = QColor("#264F78")
+        self.match_color = QColor("#6B5B00")
+        self.current_match_color = QColor("#B36200")
+        self.cursor_color = QColor("white")
+        self.cursor_text_color = QColor("black")
+
+        font = QFont(terminal_settings.get("font_family", "Consolas"))
+        font.setPointSize(terminal_settings.get("font_size", 10))
+        font.setStyleHint(QFont.StyleHint.Monospace)
+        font.setFixedPitch(True)
+        self.setFont(font)
+        metrics = QFontMetrics(font)
+        self.cell_width = max(1, metrics.horizontalAdvance('M'))
+        self.cell_height = max(1, metrics.height())
+        self.glyphs = GlyphCache(font, self.cell_width, self.cell_height, metrics.ascent())
+
+        # What is on screen: spilled history (read from the store on demand), the
+        # in-memory history window (set up once its size is known), the screen rows
+        self._history_total = 0  # All history lines, including spilled ones
+        self._history_first = 0  # Sequence number of history line 0 in the store
+        self._cold_lines = {}    # Sequence number -> (text, runs) for spilled lines
+        self._columns = 80       # Screen width of the last applied snapshot
+        self._lines = []
+        self._line_runs = []
+        self._styles = {}  # attrs -> (fg, bg, font style) resolved for painting
+        self._cursor = (0, 0, False)  # (x, y, hidden) from the last applied snapshot
+
+        # Selection as (line, column) positions over history + screen
+        self._selection_anchor = None
+        self._selection_end = None
+
+        self._init_session(session, terminal_settings)
+        self._history = collections.deque(maxlen=self.scrollback_hot_lines)
+        self._history_runs = collections.deque(maxlen=self.scrollback_hot_lines)
+
+        # Initialize display with empty lines
+        self.refresh_display()
+
+    def line_count(self):
+        return self._history_total + len(self._lines)
+
+    def line(self, index):
+        """Text of line `index`, counting history first and then the screen rows"""
+        return self._line_at(index)[0]
+
+    def line_runs(self, index):
+        """Attribute runs of line `index` (see render_runs), or None"""
+        return self._line_at(index)[1]
+
+    def _line_at(self, index):
+        spilled = self._history_total - len(self._history)
+        if index < spilled:
+            return self._spilled_line(index)
+        index -= spilled
+        history_len = len(self._history)
+        if index < history_len:
+            return self._history[index], self._history_runs[index]
+        return self._lines[index - history_len], self._line_runs[index - history_len]
+
+    def _spilled_line(self, index):
+        """A history line older than the in-memory window, read back from the scrollback file"""
+        seq = self._history_first + index
+        line = self._cold_lines.get(seq)
+        if line is None:
+            # Read the surrounding page in one go; scrolling asks for its neighbours next
+            if len(self._cold_lines) > 4096:
+                self._cold_lines.clear()
+            first = max(self._history_first, seq - 64)
+            stop = min(self._history_first + self._history_total - len(self._history), seq + 64)
+            for number, rendered in enumerate(self.worker.history_lines(first, stop, self._columns), first):
+                self._cold_lines[number] = rendered
+            line = self._cold_lines[seq]
+        return line
+
+    def visible_rows(self):
+        return max(1, self.viewport().height() // self.cell_height)
+
+    def refresh_display(self):
+        """Apply the worker's latest screen snapshot and repaint what changed"""
+        snapshot = self.worker.take_snapshot()
+        if snapshot is None:
+            return
+
+        old_top = self.verticalScrollBar().value()
+        old_cursor_row = self._cursor[1]
+        history_len = snapshot.history_len
+        # Lines that fell off the top of the scrollback shift the selection up
+        dropped = snapshot.history_first - self._history_first
+        self._history_total = snapshot.history_total
+        self._history_first = snapshot.history_first
+        self._columns = snapshot.columns
+
+        if snapshot.full:
+            self._history = collections.deque(snapshot.history, maxlen=self.scrollback_hot_lines)
+            self._history_runs = collections.deque(snapshot.history_runs, maxlen=self.scrollback_hot_lines)
+            self._cold_lines.clear()
+            self._lines = [''] * snapshot.rows
+            self._line_runs = [None] * snapshot.rows
+            for (row, text), runs in zip(snapshot.lines, snapshot.line_runs):
+                self._lines[row] = text
+                self._line_runs[row] = runs
+            self._clear_selection()
+            repaint_all = True
+        else:
+            self._history.extend(snapshot.history)
+            self._history_runs.extend(snapshot.history_runs)
+            while len(self._history) > history_len:
+                self._history.popleft()
+                self._history_runs.popleft()
+            if dropped > 0 and self._selection_anchor is not None:
+                self._selection_anchor = (self._selection_anchor[0] - dropped, self._selection_anchor[1])
+                self._selection_end = (self._selection_end[0] - dropped, self._selection_end[1])
+            for (row, text), runs in zip(snapshot.lines, snapshot.line_runs):
+                self._lines[row] = text
+                self._line_runs[row] = runs
+            repaint_all = bool(snapshot.history)
+
+        self._cursor = snapshot.cursor
+        self.bracketed_paste = snapshot.bracketed_paste
+
+        # Scroll range covers the history; follow the cursor like ensureCursorVisible
+        vbar = self.verticalScrollBar()
+        visible = self.visible_rows()
+        vbar.setRange(0, max(0, self.line_count() - visible))
+        vbar.setPageStep(visible)
+        cursor_line = self._history_total + self._cursor[1]
+        if self._search_pinned:
+            pass  # Stay on the search match
+        elif snapshot.scroll_to_top:
+            # Screen was cleared (e.g. Ctrl+L): show it at the top, history above
+            vbar.setValue(self._history_total)
+        elif cursor_line < vbar.value():
+            vbar.setValue(cursor_line)
+        elif cursor_line >= vbar.value() + visible:
+            vbar.setValue(cursor_line - visible + 1)
+
+        if repaint_all or vbar.value() != old_top:
+            self.viewport().update()
+            return
+
+        # Only the changed rows and the rows the cursor left/entered
+        top_row = self._history_total - vbar.value()
+        width = self.viewport().width()
+        rows = {row for row, _ in snapshot.lines}
+        rows.add(old_cursor_row)
+        rows.add(self._cursor[1])
+        for row in rows:
+            self.viewport().update(QRect(0, (top_row + row) * self.cell_height, width, self.cell_height))
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        rect = event.rect()
+        painter.fillRect(rect, self.background)
+
+        cell_width = self.cell_width
+        cell_height = self.cell_height
+        ratio = self.viewport().devicePixelRatioF()
+        top = self.verticalScrollBar().value()
+        line_count = self.line_count()
+        cursor_x, cursor_y, cursor_hidden = self._cursor
+        cursor_line = self._history_total + cursor_y
+        selection = self._selection_range()
+        current_match = self.current_match()
+
+        first_row = max(0, rect.top() // cell_height)
+        last_row = rect.bottom() // cell_height
+        for row in range(first_row, last_row + 1):
+            index = top + row
+            if index >= line_count:
+                break
+            y = row * cell_height
+            text = self.line(index)
+            runs = self.line_runs(index)
+
+            segments = None
+            if runs is not None:
+                segments = [(column, segment, self._style(attrs))
+                            for column, segment, attrs in styled_segments(text, runs)]
+                for column, segment, (fg, bg, style) in segments:
+                    if bg is not None:
+                        painter.fillRect(column * cell_width, y, text_width(segment) * cell_width,
+                                         cell_height, bg)
+
+            if selection is not None:
+                start, end = self._selected_columns(index, selection)
+                if end > start:
+                    painter.fillRect(start * cell_width, y, (end - start) * cell_width, cell_height,
+                                     self.selection_color)
+
+            if self.search_pattern is not None:
+                seq = self._history_first + index
+                for start, end in line_matches(self.search_pattern, text.rstrip(' ')):
+                    is_current = current_match is not None and current_match[:2] == (seq, start)
+                    painter.fillRect(text_width(text[:start]) * cell_width, y,
+                                     text_width(text[start:end]) * cell_width, cell_height,
+                                     self.current_match_color if is_current else self.match_color)
+
+            if segments is None:
+                for column, cells, run in text_runs(text):
+                    painter.drawPixmap(column * cell_width, y, self.glyphs.get(run, cells, self.foreground, ratio))
+            else:
+                for start_column, segment, (fg, bg, style) in segments:
+                    for column, cells, run in text_runs(segment):
+                        painter.drawPixmap((start_column + column) * cell_width, y,
+                                           self.glyphs.get(run, cells, fg, ratio, style))
+
+            if index == cursor_line and not cursor_hidden:
+                # Block cursor: inverted cell with the character redrawn on top
+                painter.fillRect(cursor_x * cell_width, y, cell_width, cell_height, self.cursor_color)
+                char = column_text(text, cursor_x, cursor_x + 1).strip()
+                if char:
+                    painter.drawPixmap(cursor_x * cell_width, y,
+                                       self.glyphs.get(char, 1, self.cursor_text_color, ratio))
+        painter.end()
+
+    def _style(self, attrs):
+        """(fg, bg, font style) to paint a run with; bg is None for the default"""
+        style = self._styles.get(attrs)
+        if style is None:
+            if attrs is None:
+                style = (self.foreground, None, None)
+            else:
+                fg, bg = attribute_colors(attrs, self.foreground, self.background)
+                font_style = (attrs[BOLD], attrs[ITALICS], attrs[UNDERSCORE], attrs[STRIKETHROUGH])
+                style = (fg or self.foreground, bg, font_style if any(font_style) else None)
+            if len(self._styles) > 1024:
+                self._styles.clear()  # Truecolour output can produce many; keep it bounded
+            self._styles[attrs] = style
+        return style
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        """Update terminal size on resize from the fixed cell metrics"""
+        super().resizeEvent(event)
+        self._resize_screen(self.viewport().height() // self.cell_height,
+                            self.viewport().width() // self.cell_width)
+        self._place_search_bar()
+        self._place_paste_progress()
+
+    def _scroll_to_line(self, seq):
+        """Show line `seq` (a sequence number) in the middle of the viewport"""
+        self.verticalScrollBar().setValue(seq - self._history_first - self.visible_rows() // 2)
+
+    def _search_changed(self):
+        self.viewport().update()
+
+    # Selection and clipboard
+
+    def _position_at(self, point):
+        line = self.verticalScrollBar().value() + int(point.y()) // self.cell_height
+        column = int(point.x() + self.cell_width / 2) // self.cell_width
+        line = min(max(0, line), max(0, self.line_count() - 1))
+        return line, min(max(0, column), self.cols)
+
+    def _selection_range(self):
+        if not self.has_selection():
+            return None
+        return tuple(sorted((self._selection_anchor, self._selection_end)))
+
+    def _selected_columns(self, index, selection):
+        """Columns [start, end) of line `index` covered by the selection"""
+        (first_line, first_column), (last_line, last_column) = selection
+        if index < first_line or index > last_line:
+            return 0, 0
+        start = first_column if index == first_line else 0
+        end = last_column if index == last_line else self.cols
+        return start, end
+
+    def _clear_selection(self):
+        if self._selection_anchor is not None:
+            self._selection_anchor = self._selection_end = None
+            self.viewport().update()
+
+    def has_selection(self):
+        return self._selection_anchor is not None and self._selection_anchor != self._selection_end
+
+    def selected_text(self):
+        selection = self._selection_range()
+        if selection is None:
+            return ""
+        lines = []
+        for index in range(selection[0][0], min(selection[1][0], self.line_count() - 1) + 1):
+            start, end = self._selected_columns(index, selection)
+            lines.append(column_text(self.line(index), start, end).rstrip())
+        return '\n'.join(lines)
+
+    def copy(self):
+        selection = self._selection_range()
+        if selection is None:
+            return
+        first, last = selection[0][0], min(selection[1][0], self.line_count() - 1)
+        history_stop = min(last + 1, self._history_total)
+        self._copy_lines(self._history_first + first, self._history_first + max(first, history_stop),
+                         self._lines[max(0, first - self._history_total):max(0, last + 1 - self._history_total)],
+                         lambda n, text: column_text(text, *self._selected_columns(first + n, selection)).rstrip())
+
+    def selectAll(self):
+        self._selection_anchor = (0, 0)
+        self._selection_end = (max(0, self.line_count() - 1), self.cols)
+        self.viewport().update()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self._selection_anchor = self._selection_end = self._position_at(event.position())
+            self.viewport().update()
+        self.setFocus()
+        event.accept()
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() & Qt.MouseButton.LeftButton and self._selection_anchor is not None:
+            self._selection_end = self._position_at(event.position())
+            self.viewport().update()
+        event.accept()
+
+    def stats_lines(self):
+        glyphs = self.glyphs
+        lookups = glyphs.hits + glyphs.misses
+        hit_rate = glyphs.hits * 100 // lookups if lookups else 0
+        return super().stats_lines() + [f"Glyph cache: {len(glyphs)} runs, {hit_rate}% hits"]
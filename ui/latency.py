@@ -0,0 +1,136 @@
+import collections
+import json
+import threading
+import time
+from PyQt6.QtWidgets import QDialog, QDialogButtonBox, QFileDialog, QPlainTextEdit, QVBoxLayout
+from PyQt6.QtGui import QFont
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class LatencyTracker:
+    """Rolling keystroke-to-echo latency for one tab, split into network and render.
+
+    key_sent() is called when a key goes to the session, output_received() when
+    the reader hands output to the worker (marked with the worker's fed byte
+    count), and frame_drawn() after each frame with the byte count the drawn
+    snapshot had parsed. A key's network time runs to the first output after
+    it; its render time from that output to the first frame that includes it.
+    """
+
+    def __init__(self, window=1000, max_wait=2.0):
+        self.max_wait = max_wait  # Keys or echoes older than this are dropped (no echo came)
+        self.samples = collections.deque(maxlen=window)  # (network ms, render ms)
+        self._keys = collections.deque()    # Send times of keys waiting for output
+        self._echoes = collections.deque()  # (key time, output time, byte mark) waiting for a frame
+        self._lock = threading.Lock()  # output_received runs on the reader thread
+
+    def key_sent(self):
+        with self._lock:
+            self._keys.append(time.perf_counter())
+
+    def output_received(self, mark):
+        now = time.perf_counter()
+        with self._lock:
+            while self._keys:
+                key_time = self._keys.popleft()
+                if now - key_time <= self.max_wait:
+                    self._echoes.append((key_time, now, mark))
+
+    def frame_drawn(self, parsed_bytes):
+        now = time.perf_counter()
+        with self._lock:
+            while self._echoes and (self._echoes[0][2] <= parsed_bytes or
+                                    now - self._echoes[0][1] > self.max_wait):
+                key_time, output_time, mark = self._echoes.popleft()
+                if mark <= parsed_bytes:
+                    self.samples.append(((output_time - key_time) * 1000, (now - output_time) * 1000))
+
+    def summary(self):
+        """p50/p95/p99 in ms for total, network and render latency"""
+        samples = list(self.samples)
+        parts = {"total": [network + render for network, render in samples],
+                 "network": [network for network, _ in samples],
+                 "render": [render for _, render in samples]}
+        return {name: {"p50": percentile(values, 0.5), "p95": percentile(values, 0.95),
+                       "p99": percentile(values, 0.99)}
+                for name, values in parts.items()}
+
+    def histogram(self):
+        """Sample counts per bucket of BUCKETS_MS (plus one open-ended bucket), per part"""
+        counts = {name: [0] * (len(BUCKETS_MS) + 1) for name in ("total", "network", "render")}
+        for network, render in list(self.samples):
+            for name, value in (("total", network + render), ("network", network), ("render", render)):
+                counts[name][next((i for i, bound in enumerate(BUCKETS_MS) if value <= bound),
+                                  len(BUCKETS_MS))] += 1
+        return counts
+
+    def to_dict(self):
+        return {"samples": len(self.samples),
+                "percentiles_ms": self.summary(),
+                "histogram": {"bucket_upper_ms": list(BUCKETS_MS) + [None], **self.histogram()},
+                "raw_ms": [{"network": round(network, 3), "render": round(render, 3)}
+                           for network, render in list(self.samples)]}
+
+    def export_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def report(self):
+        """Plain-text summary and histogram for the latency dialog"""
+        summary = self.summary()
+        lines = [f"Keystroke to echo, last {len(self.samples)} keys", ""]
+        lines.append(f"{'':9s}{'p50':>9s}{'p95':>9s}{'p99':>9s}")
+        for name in ("total", "network", "render"):
+            values = [summary[name][p] for p in ("p50", "p95", "p99")]
+            lines.append(f"{name:9s}" + "".join(f"{value:8.1f}ms" if value is not None else f"{'-':>9s}"
+                                               for value in values))
+        lines += ["", "network: key sent until output arrived (link, remote host, reader)",
+                  "render:  output arrived until a frame showed it (parse, frame wait, draw)", ""]
+        counts = self.histogram()["total"]
+        peak = max(counts) or 1
+        bounds = [f"<= {bound} ms" for bound in BUCKETS_MS] + [f"> {BUCKETS_MS[-1]} ms"]
+        for label, count in zip(bounds, counts):
+            lines.append(f"{label:>11s} {count:5d} {'#' * (count * 40 // peak)}")
+        return "\n".join(lines)
+
+
+class LatencyDialog(QDialog):
+    """Shows a tab's latency histogram, with Export to JSON"""
+
+    def __init__(self, tracker, parent=None):
+        super().__init__(parent)
+        self.tracker = tracker
+        self.setWindowTitle("Keystroke Latency")
+        self.resize(520, 420)
+
+        layout = QVBoxLayout(self)
+        self.report_view = QPlainTextEdit()
+        self.report_view.setReadOnly(True)
+        self.report_view.setFont(QFont("Consolas", 10))
+        self.report_view.setPlainText(tracker.report())
+        layout.addWidget(self.report_view)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        export_button = buttons.addButton("Export JSON...", QDialogButtonBox.ButtonRole.ActionRole)
+        export_button.clicked.connect(self.export)
+        refresh_button = buttons.addButton("Refresh", QDialogButtonBox.ButtonRole.ActionRole)
+        refresh_button.clicked.connect(lambda: self.report_view.setPlainText(self.tracker.report()))
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Latency", "latency.json", "JSON (*.json)")
+        if path:
+            try:
+                self.tracker.export_json(path)
+            except OSError as e:
+                print(f"Could not export latency: {e}")
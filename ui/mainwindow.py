@@ -1,12 +1,16 @@
-from PyQt6.QtWidgets import QMainWindow, QSplitter, QTabWidget, QWidget, QVBoxLayout, QMessageBox, QFileDialog, QInputDialog, QLineEdit, QToolBar
+from PyQt6.QtWidgets import QMainWindow, QSplitter, QTabWidget, QWidget, QVBoxLayout, QMessageBox, QFileDialog, QInputDialog, QLineEdit, QToolBar, QMenu
 from PyQt6.QtGui import QAction
 from PyQt6.QtCore import Qt, pyqtSignal
 from .sidebar import Sidebar
 from .session_manager import SessionManager
 from .terminal import Terminal
+from .grid_terminal import GridTerminal
 from .settings_dialog import SettingsDialog
 from .settings_manager import SettingsManager
+from .connection_executor import ConnectionExecutor, ConnectionProgress
+from .connection_log import ConnectionLogDialog
 from ssh.backend import SSHSession
+from ssh.transport_pool import hop_key, jump_hops, jump_pool, transport_key, transport_pool
 import threading
 
 class MainWindow(QMainWindow):
@@ -24,6 +28,11 @@ class MainWindow(QMainWindow):
         self.settings_manager = SettingsManager()
         self.settings_manager.add_callback(self.on_settings_changed)
         
+        # Sessions connect on a bounded pool of worker threads
+        self.connector = ConnectionExecutor()
+        self.batch_sessions = set()  # Opened in bulk: failures show in the progress dialog
+        self.apply_connection_settings(self.settings_manager.get_all())
+        
         # Menu Bar
         self.create_menu_bar()
         
@@ -44,12 +53,16 @@ class MainWindow(QMainWindow):
         self.sidebar = Sidebar()
         self.sidebar.new_session_clicked.connect(self.open_session_manager)
         self.sidebar.session_double_clicked.connect(self.start_ssh_session)
+        self.sidebar.sessions_open_requested.connect(self.open_sessions)
         self.splitter.addWidget(self.sidebar)
         
         # Tab Widget (Terminal Area)
         self.tabs = QTabWidget()
         self.tabs.setTabsClosable(True)
         self.tabs.tabCloseRequested.connect(self.close_tab)
+        self.tabs.currentChanged.connect(self.update_tab_rendering)
+        self.tabs.tabBar().setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.tabs.tabBar().customContextMenuRequested.connect(self.show_tab_context_menu)
         self.splitter.addWidget(self.tabs)
         
         # Set initial sizes (Sidebar 20%, Tabs 80%)
@@ -63,6 +76,8 @@ class MainWindow(QMainWindow):
         self.session_failed.connect(self.show_error_message)
         self.mfa_requested.connect(self.handle_mfa_request)
         self.password_requested.connect(self.handle_password_request)
+        self.connector.connected.connect(self._on_session_connected)
+        self.connector.failed.connect(self._on_connect_failed)
 
     def add_local_terminal_tab(self):
         """Add a local terminal tab (PowerShell on Windows)"""
@@ -74,9 +89,9 @@ class MainWindow(QMainWindow):
         local_session = LocalSession("powershell.exe")
         if local_session.connect():
             print("DEBUG: Local session connected successfully")
-            settings = self.settings_manager.get_all()
-            terminal = Terminal(local_session, settings)
+            terminal = self.create_terminal(local_session)
             self.tabs.addTab(terminal, QIcon(resource_path("resources", "terminal.png")), "Local Terminal")
+            self.update_tab_rendering()
             terminal.setFocus()
             
             # Connect session_closed signal to auto-close tab
@@ -111,15 +126,38 @@ class MainWindow(QMainWindow):
             self.start_ssh_session(data)
 
     def start_ssh_session(self, data):
+        session = self.create_ssh_session(data)
+        if session:
+            self.connector.submit(session, data['host'])
+
+    def open_sessions(self, sessions_data):
+        """Connect several saved sessions in parallel, showing each one's progress"""
+        progress = ConnectionProgress(self.connector, self)
+        progress.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        for data in sessions_data:
+            session = self.create_ssh_session(data)
+            if session is None:
+                continue  # Password prompt cancelled
+            progress.add(session, data.get('name') or data['host'])
+            self.batch_sessions.add(session)
+            self.connector.submit(session, data['host'])
+        progress.show()
+
+    def create_ssh_session(self, data):
+        """SSHSession for saved session data, asking for missing passwords; None if cancelled"""
         host = data['host']
         port = data['port']
         username = data['username']
         password = data.get('password')
+        share_transport = self.settings_manager.get("connection", "share_connections") is not False
+        # A tab to the same user@host is already authenticated: the new tab is just another channel
+        shared = share_transport and transport_pool.has(
+            transport_key(host, port, username, data.get('proxy_jump')))
         
-        if not password:
+        if not password and not shared:
             password, ok = QInputDialog.getText(self, "SSH Password", f"Enter password for {username}@{host}:", echo=QLineEdit.EchoMode.Password)
             if not ok:
-                return
+                return None
             
             # Save the password
             print(f"DEBUG: Saving password for {username}@{host}")
@@ -135,8 +173,9 @@ class MainWindow(QMainWindow):
         proxy_settings = data.get('proxy', {})
         proxy_jump_settings = data.setdefault('proxy_jump', {'enabled': False})
         
-        # Check for Jump Host password
-        if proxy_jump_settings and proxy_jump_settings.get("enabled"):
+        # Check for Jump Host password (not needed while a login to the bastion is pooled)
+        if (proxy_jump_settings and proxy_jump_settings.get("enabled") and not shared and
+                not (share_transport and jump_pool.has(hop_key(jump_hops(proxy_jump_settings, username)[0])))):
             jump_user = proxy_jump_settings.get("username")
             jump_host = proxy_jump_settings.get("host")
             jump_pass = proxy_jump_settings.get("password")
@@ -144,7 +183,7 @@ class MainWindow(QMainWindow):
             if not jump_pass:
                 jump_pass, ok = QInputDialog.getText(self, "Jump Host Password", f"Enter password for jump host {jump_user}@{jump_host}:", echo=QLineEdit.EchoMode.Password)
                 if not ok:
-                    return # User cancelled
+                    return None # User cancelled
                 proxy_jump_settings['password'] = jump_pass
                 # We don't necessarily need to save it to store unless we want persistence
                 # self.sidebar.update_jump_password(data, jump_pass) # TODO: add this if needed
@@ -158,18 +197,22 @@ class MainWindow(QMainWindow):
             proxy_settings=proxy_settings,
             proxy_jump_settings=proxy_jump_settings,
             auth_callback=self.get_mfa_response,
-            password_callback=self.get_password_response
+            password_callback=self.get_password_response,
+            charset=data.get('charset', 'utf-8'),
+            share_transport=share_transport,
+            exchange_lock=self.connector.exchange_lock
         )
-        
-        # Connect in a separate thread
-        threading.Thread(target=self._connect_thread, args=(session, host), daemon=True).start()
+        return session
 
     def get_password_response(self, prompt):
         """Thread-safe callback to get a new password from user"""
         event_container = {"response": None, "event": threading.Event()}
-        self.password_requested.emit(prompt, event_container)
-        if not event_container["event"].wait(timeout=120):
-            return None
+        with self.connector.prompt_lock:  # One prompt at a time when sessions connect in parallel
+            if self.connector.closed:
+                return None  # Window closed
+            self.password_requested.emit(prompt, event_container)
+            if not self.connector.wait_for_answer(event_container["event"], timeout=120):
+                return None
         return event_container["response"]
 
     def handle_password_request(self, prompt, event_container):
@@ -186,19 +229,23 @@ class MainWindow(QMainWindow):
         Thread-safe callback for paramiko auth_interactive.
         """
         print(f"DEBUG: get_mfa_response called - Title: {title}, Instructions: {instructions}, Prompts: {len(prompt_list)}")
-        responses = []
-        for prompt, echo in prompt_list:
-             # We need to ask the user on the main thread
-             event_container = {"response": None, "event": threading.Event()}
-             print(f"DEBUG: Emitting mfa_requested for prompt: {prompt}")
-             self.mfa_requested.emit(title, instructions, prompt, echo, event_container)
-             # Wait for UI thread to process
-             if not event_container["event"].wait(timeout=120): # 2 minute timeout
-                 print("DEBUG: MFA timeout reached")
-                 responses.append("")
-                 continue
-             print(f"DEBUG: Received MFA response: {'***' if not echo else event_container['response']}")
-             responses.append(event_container["response"] or "")
+        with self.connector.prompt_lock:  # One call's prompts at a time, not stacked dialogs
+            responses = []
+            for prompt, echo in prompt_list:
+                 if self.connector.closed:
+                     responses.append("")  # Window closed
+                     continue
+                 # We need to ask the user on the main thread
+                 event_container = {"response": None, "event": threading.Event()}
+                 print(f"DEBUG: Emitting mfa_requested for prompt: {prompt}")
+                 self.mfa_requested.emit(title, instructions, prompt, echo, event_container)
+                 # Wait for UI thread to process (or the window to close)
+                 if not self.connector.wait_for_answer(event_container["event"], timeout=120): # 2 minute timeout
+                     print("DEBUG: MFA timeout reached")
+                     responses.append("")
+                     continue
+                 print(f"DEBUG: Received MFA response: {'***' if not echo else event_container['response']}")
+                 responses.append(event_container["response"] or "")
         return responses
 
     def handle_mfa_request(self, title, instructions, prompt, echo, event_container):
@@ -226,11 +273,22 @@ class MainWindow(QMainWindow):
             event_container["response"] = ""
         event_container["event"].set()
 
-    def _connect_thread(self, session, host):
-        if session.connect():
-            self.session_connected.emit(session, host)
-        else:
-            self.session_failed.emit(f"Failed to connect to {host}")
+    def _on_session_connected(self, session, host):
+        print(f"DEBUG: Connected to {host} in {session.connect_seconds * 1000:.0f}ms"
+              f"{' (shared transport)' if session.reused_transport else ''}")
+        self.batch_sessions.discard(session)
+        self.session_connected.emit(session, host)
+
+    def _on_connect_failed(self, session, host):
+        if session in self.batch_sessions:
+            self.batch_sessions.discard(session)  # Shown in the progress dialog
+            return
+        self.session_failed.emit(f"Failed to connect to {host}")
+
+    def closeEvent(self, event):
+        # Queued connects are dropped and workers waiting on a prompt return at once
+        self.connector.shutdown(cancel_futures=True)
+        super().closeEvent(event)
 
     def show_error_message(self, message):
         QMessageBox.critical(self, "Connection Error", message)
@@ -238,21 +296,61 @@ class MainWindow(QMainWindow):
     def add_terminal_tab(self, session, host):
         from PyQt6.QtGui import QIcon
         from utils import resource_path
-        settings = self.settings_manager.get_all()
-        terminal = Terminal(session, settings)
-        self.tabs.addTab(terminal, QIcon(resource_path("resources", "terminal.png")), host)
+        terminal = self.create_terminal(session)
+        index = self.tabs.addTab(terminal, QIcon(resource_path("resources", "terminal.png")), host)
+        if getattr(session, "timings", None) is not None:
+            self.tabs.setTabToolTip(index, session.timings.tooltip())  # Where the connect time went
         self.tabs.setCurrentWidget(terminal)
+        # Not left to currentChanged: a tab added without becoming current must start suspended
+        self.update_tab_rendering()
         terminal.setFocus()
         
         # Connect session_closed signal to auto-close tab
         terminal.session_closed.connect(lambda: self.close_tab_by_widget(terminal))
 
+    def create_terminal(self, session):
+        """Terminal view for session, using the renderer chosen in settings"""
+        settings = self.settings_manager.get_all()
+        if settings.get("terminal", {}).get("renderer", "text") == "grid":
+            return GridTerminal(session, settings)
+        return Terminal(session, settings)
+
+    def show_tab_context_menu(self, position):
+        index = self.tabs.tabBar().tabAt(position)
+        widget = self.tabs.widget(index)
+        if not isinstance(widget, (Terminal, GridTerminal)) or not isinstance(widget.session, SSHSession):
+            return
+        menu = QMenu(self)
+        duplicate_action = menu.addAction("Duplicate Session")
+        if menu.exec(self.tabs.tabBar().mapToGlobal(position)) == duplicate_action:
+            self.duplicate_session(index)
+
+    def duplicate_session(self, index):
+        """Open another tab to the same host; with connection sharing it is a new channel, not a new login"""
+        widget = self.tabs.widget(index)
+        if not isinstance(widget, (Terminal, GridTerminal)) or not isinstance(widget.session, SSHSession):
+            return
+        session = widget.session.duplicate()
+        self.connector.submit(session, self.tabs.tabText(index))
+
     def close_tab(self, index):
         widget = self.tabs.widget(index)
-        if isinstance(widget, Terminal):
+        if isinstance(widget, (Terminal, GridTerminal)):
             widget.session.close()
+            widget.close()  # Stops the terminal's reader and screen worker threads
         self.tabs.removeTab(index)
 
+    def update_tab_rendering(self, current_index=None):
+        """Only the current tab renders; background tabs just keep their screen state"""
+        current = self.tabs.currentWidget()
+        for i in range(self.tabs.count()):
+            widget = self.tabs.widget(i)
+            if isinstance(widget, (Terminal, GridTerminal)):
+                if widget is current:
+                    widget.resume_rendering()  # One frame catches up on hidden output
+                else:
+                    widget.suspend_rendering()
+
     def close_tab_by_widget(self, widget):
         # Find and close tab by widget reference
         for i in range(self.tabs.count()):
@@ -319,11 +417,21 @@ class MainWindow(QMainWindow):
         
         file_menu.addSeparator()
         
+        # Connection Log Action
+        connection_log_action = QAction("Connection Log...", self)
+        connection_log_action.triggered.connect(self.open_connection_log)
+        file_menu.addAction(connection_log_action)
+        
+        file_menu.addSeparator()
+        
         # Exit Action
         exit_action = QAction("Exit", self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
 
+    def open_connection_log(self):
+        ConnectionLogDialog(parent=self).exec()
+
     def import_sessions(self):
         filename, _ = QFileDialog.getOpenFileName(self, "Import Sessions", "", "XML Files (*.xml);;All Files (*)")
         if filename:
@@ -352,6 +460,13 @@ class MainWindow(QMainWindow):
         """Handle settings changes - apply theme"""
         theme = settings.get("appearance", {}).get("theme", "dark")
         self.apply_theme(theme)
+        self.apply_connection_settings(settings)
+    
+    def apply_connection_settings(self, settings):
+        """Parallel connection limit, and how long a bastion login is kept once no tab uses it"""
+        connection = settings.get("connection", {})
+        self.connector.set_max_workers(connection.get("max_parallel_connections", 32))
+        jump_pool.idle_timeout = connection.get("jump_idle_minutes", 5) * 60
     
     def apply_theme(self, theme):
         """Apply the selected theme to the application"""
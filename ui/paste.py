@@ -0,0 +1,96 @@
+import time
+from PyQt6.QtWidgets import QFrame, QHBoxLayout, QLabel, QToolButton
+from PyQt6.QtCore import pyqtSignal, QThread, Qt
+
+PASTE_START = '\x1b[200~'
+PASTE_END = '\x1b[201~'
+
+
+def prepare_paste(text, bracketed):
+    """The text to send for a paste; bracketed pastes are wrapped in ESC[200~ ... ESC[201~.
+
+    An end marker inside the text is removed so pasted data cannot end the
+    paste early and have the rest run as typed input.
+    """
+    if not bracketed:
+        return text
+    return PASTE_START + text.replace(PASTE_END, '') + PASTE_END
+
+
+class PasteWriter(QThread):
+    """Writes a large paste to the session in bounded chunks off the GUI thread.
+
+    session.send_command blocks while the SSH window or the tty input queue is
+    full, which paces the writes to what the remote side consumes. Cancelling
+    stops between chunks; a bracketed paste still gets its end marker.
+    """
+    progress = pyqtSignal(int, int)  # Characters sent, total
+
+    def __init__(self, session, text, bracketed=False, chunk_chars=4096):
+        super().__init__()
+        self.session = session
+        self.text = text
+        self.bracketed = bracketed
+        self.chunk_chars = chunk_chars
+        self.cancelled = False
+
+        self.sent = 0
+        self.elapsed = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        start = time.perf_counter()
+        text = self.text.replace(PASTE_END, '') if self.bracketed else self.text
+        reported = 0
+        try:
+            if self.bracketed:
+                self.session.send_command(PASTE_START)
+            while self.sent < len(text) and not self.cancelled:
+                chunk = text[self.sent:self.sent + self.chunk_chars]
+                self.session.send_command(chunk)
+                self.sent += len(chunk)
+                if self.sent - reported >= 64 * 1024 or self.sent == len(text):
+                    reported = self.sent
+                    self.progress.emit(self.sent, len(text))
+            if self.bracketed:
+                self.session.send_command(PASTE_END)
+        except Exception as e:
+            print(f"Error pasting: {e}")
+        self.elapsed = time.perf_counter() - start
+
+
+class PasteProgress(QFrame):
+    """Progress of a background paste, shown over the bottom-right corner, with Cancel"""
+    cancel_requested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setObjectName("pasteProgress")
+        self.setStyleSheet("#pasteProgress { background-color: #2D2D30; border: 1px solid #555555; }"
+                           "QLabel, QToolButton { color: #CCCCCC; background: transparent; }")
+        self.setCursor(Qt.CursorShape.ArrowCursor)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(6, 2, 4, 2)
+        self.status_label = QLabel("")
+        self.status_label.setMinimumWidth(160)
+        layout.addWidget(self.status_label)
+        self.notice_label = QLabel("")
+        self.notice_label.hide()
+        layout.addWidget(self.notice_label)
+        cancel_button = QToolButton()
+        cancel_button.setText("Cancel")
+        cancel_button.clicked.connect(self.cancel_requested.emit)
+        layout.addWidget(cancel_button)
+
+    def set_progress(self, sent, total):
+        self.status_label.setText(f"Pasting {sent / 1e6:.1f}M of {total / 1e6:.1f}M characters "
+                                  f"({sent * 100 // max(1, total)}%)")
+
+    def set_notice(self, text):
+        """Show a note next to the progress, or hide it for empty text"""
+        self.notice_label.setText(text)
+        self.notice_label.setVisible(bool(text))
+        self.adjustSize()
@@ -0,0 +1,452 @@
+from PyQt6.QtCore import pyqtSignal, QThread
+import codecs
+import collections
+import threading
+import time
+import pyte
+from wcwidth import wcwidth
+from .scrollback import ScrollbackLine, ScrollbackStore
+from .search_index import SearchIndex
+
+# pyte keeps private (DEC) modes shifted left by 5 in Screen.mode
+BRACKETED_PASTE_MODE = 2004 << 5
+
+
+def render_line(line, columns):
+    """Render a pyte line (sparse dict of Chars) as a string exactly `columns` wide"""
+    if isinstance(line, str):
+        # Some code paths store plain strings in history
+        return line[:columns].ljust(columns)
+    if isinstance(line, ScrollbackLine):
+        return line.render(columns)[0]
+    # Missing cells come back as the default (space) char; the stub cell after a
+    # wide character has empty data, so the join lines up with screen columns
+    return ''.join([line[x].data for x in range(columns)])
+
+
+# Attributes of a blank cell: Char fields after `data` (fg, bg, bold, italics,
+# underscore, strikethrough, reverse, blink)
+DEFAULT_ATTRS = tuple(pyte.screens.Char(" ")[1:])
+
+
+def render_runs(line, columns):
+    """Render a pyte line as (text, runs).
+
+    runs is None when every cell has default attributes (most lines). Otherwise it
+    is a tuple of (length, attrs) spans covering text, where length counts
+    characters of text and attrs is None for default attributes.
+    """
+    if isinstance(line, str):
+        return line[:columns].ljust(columns), None
+    if isinstance(line, ScrollbackLine):
+        return line.render(columns)
+    chars = [line[x] for x in range(columns)]
+    text = ''.join([char.data for char in chars])
+
+    runs = []
+    current = DEFAULT_ATTRS
+    length = 0
+    for char in chars:
+        attrs = char[1:]
+        if attrs != current:
+            if length:
+                runs.append((length, None if current == DEFAULT_ATTRS else current))
+            current = attrs
+            length = 0
+        length += len(char.data)
+    if not runs and current == DEFAULT_ATTRS:
+        return text, None
+    if length:
+        runs.append((length, None if current == DEFAULT_ATTRS else current))
+    return text, tuple(runs)
+
+
+def column_index(text, column):
+    """Index into a rendered line of the character at screen `column`.
+
+    Wide characters take two columns but one character (there is no stub in
+    the text), and combining characters belong to the cell before them.
+    """
+    if text.isascii():
+        return min(column, len(text))
+    used = 0
+    for index, char in enumerate(text):
+        width = wcwidth(char)
+        if width == 0 and index:
+            continue
+        if used >= column:
+            return index
+        used += width if width > 0 else 1
+    return len(text)
+
+
+class TerminalScreen(pyte.HistoryScreen):
+    def __init__(self, columns, lines, history=100, ratio=0.5, hot_history=None):
+        # Set before super().__init__, which calls reset() -> _reset_history()
+        self.history_added = 0       # Lines ever pushed into history.top (monotonic)
+        self.history_generation = 0  # Bumped whenever history is wiped
+        super().__init__(columns, lines, history, ratio)
+        # Scrollback is kept as packed text + attribute runs, not pyte Line dicts;
+        # beyond hot_history lines it spills to disk. Lines entering history are
+        # also added to the search index.
+        self.search_index = SearchIndex()
+        self.history = self.history._replace(
+            top=ScrollbackStore(history, columns, render_runs, hot_lines=hot_history,
+                                index=self.search_index))
+        self.cleared_callback = None
+
+    def resize(self, lines=None, columns=None):
+        super().resize(lines, columns)
+        self.history.top.columns = self.columns
+
+    def _reset_history(self):
+        super()._reset_history()
+        self.history_generation += 1
+
+    def index(self):
+        # Mirror pyte's condition for pushing the top line into history
+        bottom = self.margins.bottom if self.margins else self.lines - 1
+        if self.cursor.y == bottom:
+            self.history_added += 1
+        super().index()
+
+    def select_graphic_rendition(self, *attrs, private=False):
+        # CSI ? Pp m is xterm's key modifier query (vim sends ESC[?4m), not
+        # SGR; pyte passes private=True, which Screen's handler doesn't accept
+        if private:
+            return
+        super().select_graphic_rendition(*attrs)
+
+    def erase_in_display(self, how=0, private=False):
+        # how=2 is "clear entire screen"
+        # how=0 is "clear from cursor to end of screen".
+        # If cursor is at the top (x=0, y=0), how=0 effectively clears the whole screen.
+        # SSH sessions often use ESC[H (Home) + ESC[J (Clear Down) instead of ESC[2J (Clear All).
+
+        soft_clear = (how == 2) or (how == 0 and self.cursor.y == 0)
+
+        if soft_clear:
+            # Implement "Soft Clear": Push current screen lines to history
+            # This preserves the content in the scrollback so the user can scroll up.
+
+            for i in range(self.lines):
+                # The scrollback store packs the line on append, so the erase
+                # below can modify it in place without a copy
+                self.history.top.append(self.buffer[i])
+            self.history_added += self.lines
+
+            if self.cleared_callback:
+                self.cleared_callback()
+
+        super().erase_in_display(how, private)
+
+
+class ScreenSnapshot:
+    """Immutable description of what changed on the screen since the previous snapshot.
+
+    If `full` is set, `history` holds every history line and `lines` every screen
+    row, and the view must rebuild from scratch. Otherwise `history` holds only
+    the lines that scrolled into history and `lines` only the rows that changed.
+    `history_runs` and `line_runs` line up with them and hold each line's
+    attribute runs (see render_runs). `bracketed_paste` is whether the
+    application has turned on bracketed paste (mode 2004).
+
+    Views mirror only the newest `history_len` (the in-memory window) of the
+    `history_total` lines of scrollback; older ones can be read from the
+    ScrollbackStore by sequence number, starting at `history_first`.
+    """
+    __slots__ = ('full', 'history', 'history_runs', 'history_len', 'history_total', 'history_first',
+                 'lines', 'line_runs', 'cursor', 'columns', 'rows', 'scroll_to_top', 'bracketed_paste')
+
+    def __init__(self, full, history, history_runs, history_len, history_total, history_first,
+                 lines, line_runs, cursor, columns, rows, scroll_to_top, bracketed_paste):
+        object.__setattr__(self, 'full', full)
+        object.__setattr__(self, 'history', history)          # tuple of str
+        object.__setattr__(self, 'history_runs', history_runs)  # tuple of runs or None
+        object.__setattr__(self, 'history_len', history_len)  # History lines after applying
+        object.__setattr__(self, 'history_total', history_total)  # Including spilled lines
+        object.__setattr__(self, 'history_first', history_first)  # Sequence number of line 0
+        object.__setattr__(self, 'lines', lines)              # tuple of (row, str)
+        object.__setattr__(self, 'line_runs', line_runs)      # tuple of runs or None
+        object.__setattr__(self, 'cursor', cursor)            # (x, y, hidden)
+        object.__setattr__(self, 'columns', columns)
+        object.__setattr__(self, 'rows', rows)
+        object.__setattr__(self, 'scroll_to_top', scroll_to_top)
+        object.__setattr__(self, 'bracketed_paste', bracketed_paste)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ScreenSnapshot is immutable")
+
+
+class ScreenWorker(QThread):
+    """Owns a terminal's pyte screen/stream and parses output off the GUI thread.
+
+    Bytes arrive through feed() (from the reader thread), are decoded and fed to
+    pyte here, and the result is published as a ScreenSnapshot. Snapshots that the
+    GUI has not taken yet are merged, so the GUI only ever applies one per frame.
+    """
+    snapshot_ready = pyqtSignal()
+
+    def __init__(self, columns, lines, history=10000, charset="utf-8", on_consumed=None,
+                 hot_history=None):
+        super().__init__()
+        self.screen = TerminalScreen(columns, lines, history=history, hot_history=hot_history)
+        self.screen.cleared_callback = self._on_screen_cleared
+        self.stream = pyte.Stream(self.screen)
+        self.charset = charset
+        self.decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+        self.on_consumed = on_consumed  # Called with the byte count of each parsed batch
+        self.max_feed_bytes = 65536  # Parse at most this much before publishing a snapshot
+        self.last_feed_bytes = 0     # Size of the batch behind the latest snapshot
+        # Byte counters for matching output to the frame that shows it
+        self.fed_bytes = 0     # Queued by feed()
+        self.parsed_bytes = 0  # Parsed by the worker (worker thread)
+        self.taken_bytes = 0   # Parsed before the snapshot the GUI last took
+        self.running = True
+
+        self._cond = threading.Condition()
+        self._input = collections.deque()  # Raw byte chunks waiting to be parsed
+        self._input_bytes = 0
+        self._pending_resize = None
+        self._refresh_requested = False
+        self._busy = False
+
+        # While the view is hidden the screen is still fed, but no snapshots are
+        # built; resume() publishes one full snapshot to catch up
+        self.suspended = False
+        self.skipped_frames = 0  # Frame slots that passed with output while suspended
+        self._skip_interval = 1 / 60
+        self._last_skipped = 0.0
+
+        # What the GUI has been told so far (worker thread only)
+        self._cleared = False
+        self._published_added = 0
+        self._published_generation = self.screen.history_generation
+        self._published_lines = []  # (text, runs) per screen row
+        self._published_cursor = None
+        self._published_bracketed = False
+
+        # Merged snapshot parts waiting for the GUI (guarded by _cond)
+        self._pending = False
+        self._pending_full = False
+        self._pending_history = []  # (text, runs) per line
+        self._pending_lines = {}    # row -> (text, runs)
+        self._pending_scroll_to_top = False
+        self._pending_state = None  # (history_len, history_total, history_first, cursor, columns, rows, bracketed)
+        self._pending_parsed = 0
+        self._signalled = False
+
+        # Initial full snapshot so the view can render before any output arrives
+        self._publish(force_full=True)
+
+    def feed(self, data):
+        """Queue raw session output for parsing (any thread)"""
+        if not data:
+            return
+        with self._cond:
+            self._input.append(data)
+            self._input_bytes += len(data)
+            self.fed_bytes += len(data)
+            self._cond.notify_all()
+
+    def resize(self, lines, columns):
+        """Request a screen resize; applied on the worker thread before the next parse"""
+        with self._cond:
+            self._pending_resize = (lines, columns)
+            self._cond.notify_all()
+
+    def suspend(self, frame_interval):
+        """Stop publishing snapshots (the view is hidden); output is still parsed"""
+        with self._cond:
+            self.suspended = True
+            self._skip_interval = frame_interval
+
+    def resume(self):
+        """Publish a full snapshot with everything that happened while suspended"""
+        with self._cond:
+            self.suspended = False
+            self._refresh_requested = True
+            self._signalled = False  # Signal even if an older snapshot was never taken
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout=None):
+        """Block until all queued input has been parsed and published"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: (not self._input and self._pending_resize is None and
+                         not self._refresh_requested and not self._busy),
+                timeout)
+
+    def _take_input(self):
+        """Pop up to max_feed_bytes of queued input (caller holds _cond)"""
+        taken = []
+        size = 0
+        while self._input and size < self.max_feed_bytes:
+            chunk = self._input[0]
+            room = self.max_feed_bytes - size
+            if len(chunk) > room:
+                taken.append(chunk[:room])
+                self._input[0] = chunk[room:]
+                size += room
+            else:
+                taken.append(self._input.popleft())
+                size += len(chunk)
+        self._input_bytes -= size
+        return b''.join(taken)
+
+    def run(self):
+        while True:
+            with self._cond:
+                while (self.running and not self._input and self._pending_resize is None and
+                       not self._refresh_requested):
+                    self._cond.wait()
+                if not self.running:
+                    break
+                resize, self._pending_resize = self._pending_resize, None
+                refresh, self._refresh_requested = self._refresh_requested, False
+                data = self._take_input()
+                self._busy = True
+
+            try:
+                if resize:
+                    self.screen.resize(lines=resize[0], columns=resize[1])
+                if data:
+                    text = self.decoder.decode(data)
+                    if text:
+                        self.stream.feed(text)
+                self.last_feed_bytes = len(data)
+                self.parsed_bytes += len(data)
+                self._publish(force_full=bool(resize) or refresh)
+            except Exception as e:
+                print(f"Error parsing terminal output: {e}")
+            finally:
+                if data and self.on_consumed:
+                    self.on_consumed(len(data))
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+        # Stopped (tab closed): delete the scrollback spill file
+        self.screen.history.top.close()
+
+    def history_lines(self, first, stop, columns):
+        """(text, runs) for history lines by sequence number, including spilled ones (any thread)"""
+        return self.screen.history.top.render_seq(first, stop, columns)
+
+    def _on_screen_cleared(self):
+        self._cleared = True
+
+    def _publish(self, force_full=False):
+        """Diff the screen against what was last published and merge it into the pending snapshot"""
+        screen = self.screen
+        if self.suspended:
+            # Nobody is looking: skip the diff; resume() publishes in full
+            screen.dirty.clear()
+            now = time.monotonic()
+            if now - self._last_skipped >= self._skip_interval:
+                self.skipped_frames += 1
+                self._last_skipped = now
+            return
+        columns, rows = screen.columns, screen.lines
+        history = screen.history.top
+        history_total = len(history)
+        history_len = min(history_total, history.hot_lines)  # The part views mirror
+        added = screen.history_added - self._published_added
+
+        full = (force_full or
+                screen.history_generation != self._published_generation or
+                added > history_len or
+                len(self._published_lines) != rows)
+
+        if full:
+            lines = [render_runs(screen.buffer[y], columns) for y in range(rows)]
+            new_history = history.render_range(history_total - history_len, history_total, columns)
+            changed = list(enumerate(lines))
+        else:
+            new_history = history.render_range(history_total - added, history_total, columns)
+            # Only re-render the rows pyte marked dirty, and only publish
+            # the ones whose text or attributes actually changed
+            lines = self._published_lines
+            changed = []
+            for y in sorted(screen.dirty):
+                if y < rows:
+                    rendered = render_runs(screen.buffer[y], columns)
+                    if rendered != lines[y]:
+                        lines[y] = rendered
+                        changed.append((y, rendered))
+        screen.dirty.clear()
+
+        cursor = (min(screen.cursor.x, columns - 1), screen.cursor.y, screen.cursor.hidden)
+        bracketed = BRACKETED_PASTE_MODE in screen.mode
+        scroll_to_top, self._cleared = self._cleared, False
+
+        self._published_added = screen.history_added
+        self._published_generation = screen.history_generation
+        self._published_lines = lines
+
+        if not (full or new_history or changed or scroll_to_top or cursor != self._published_cursor or
+                bracketed != self._published_bracketed):
+            return  # Nothing the view shows or needs changed
+        self._published_cursor = cursor
+        self._published_bracketed = bracketed
+
+        with self._cond:
+            if full:
+                self._pending_full = True
+                self._pending_history = new_history
+                self._pending_lines = dict(changed)
+            else:
+                self._pending_history.extend(new_history)
+                self._pending_lines.update(changed)
+                if len(self._pending_history) > history.hot_lines:
+                    # The GUI fell a whole scrollback behind: the newest lines are
+                    # exactly the current history, so turn this into a full rebuild
+                    self._pending_full = True
+                    self._pending_history = self._pending_history[-history.hot_lines:]
+                    self._pending_lines = dict(enumerate(lines))
+            self._pending_scroll_to_top = self._pending_scroll_to_top or scroll_to_top
+            self._pending_state = (history_len, history_total, history.dropped, cursor, columns, rows, bracketed)
+            self._pending_parsed = self.parsed_bytes
+            self._pending = True
+            notify = not self._signalled
+            self._signalled = True
+
+        if notify:
+            self.snapshot_ready.emit()
+
+    def take_snapshot(self):
+        """Take the merged snapshot published since the last call (GUI thread), or None"""
+        with self._cond:
+            if not self._pending:
+                self._signalled = False
+                return None
+            history_len, history_total, history_first, cursor, columns, rows, bracketed = self._pending_state
+            lines = sorted(self._pending_lines.items())
+            snapshot = ScreenSnapshot(
+                self._pending_full,
+                tuple([text for text, _ in self._pending_history]),
+                tuple([runs for _, runs in self._pending_history]),
+                history_len,
+                history_total,
+                history_first,
+                tuple([(row, text) for row, (text, _) in lines]),
+                tuple([runs for _, (_, runs) in lines]),
+                cursor,
+                columns,
+                rows,
+                self._pending_scroll_to_top,
+                bracketed,
+            )
+            self._pending = False
+            self._pending_full = False
+            self._pending_history = []
+            self._pending_lines = {}
+            self._pending_scroll_to_top = False
+            self._signalled = False
+            self.taken_bytes = self._pending_parsed
+            return snapshot
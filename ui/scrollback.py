@@ -0,0 +1,381 @@
+from array import array
+import atexit
+import collections
+import itertools
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import weakref
+from pyte.screens import Char, StaticDefaultDict
+from wcwidth import wcwidth
+
+# Attribute tuples are interned once per process and referenced by id from
+# every tab's scrollback; id 0 is "default attributes"
+_ATTRS = [None]
+_ATTR_IDS = {None: 0}
+_attrs_lock = threading.Lock()
+
+_BLANK = Char(" ")
+
+# Spilled line record: text bytes, width, columns, run count; then the text
+# (utf-8) and the packed runs
+_RECORD = struct.Struct('<IHHI')
+
+# Stores with spill files, so files are removed even if a tab is never closed
+_spilling_stores = weakref.WeakSet()
+
+
+def attrs_id(attrs):
+    attr_id = _ATTR_IDS.get(attrs)
+    if attr_id is None:
+        with _attrs_lock:
+            attr_id = _ATTR_IDS.get(attrs)
+            if attr_id is None:
+                attr_id = len(_ATTRS)
+                _ATTRS.append(attrs)
+                _ATTR_IDS[attrs] = attr_id
+    return attr_id
+
+
+def _clip_runs(runs, length):
+    """Truncate or extend (with default attributes) runs to cover exactly length characters"""
+    clipped = []
+    total = 0
+    for run_length, attrs in runs:
+        if total + run_length >= length:
+            clipped.append((length - total, attrs))
+            total = length
+            break
+        clipped.append((run_length, attrs))
+        total += run_length
+    if total < length:
+        if clipped and clipped[-1][1] is None:
+            clipped[-1] = (clipped[-1][0] + length - total, None)
+        else:
+            clipped.append((length - total, None))
+    return tuple(run for run in clipped if run[0])
+
+
+class ScrollbackLine:
+    """One history line: text without trailing blanks plus packed attribute runs"""
+    __slots__ = ('text', 'width', 'columns', 'runs')
+
+    def __init__(self, text, width, columns, runs):
+        self.text = text        # Rendered text, trailing spaces stripped
+        self.width = width      # Length of the rendered text before stripping
+        self.columns = columns  # Screen width the line was rendered at
+        self.runs = runs        # array('I') of (length, attrs id) pairs, or None
+
+    @classmethod
+    def from_rendered(cls, text, runs, columns):
+        """Pack render_runs() output"""
+        packed = None
+        if runs is not None:
+            packed = array('I')
+            for length, attrs in runs:
+                packed.append(length)
+                packed.append(attrs_id(attrs))
+        return cls(text.rstrip(' '), len(text), columns, packed)
+
+    def to_bytes(self):
+        text = self.text.encode('utf-8')
+        runs = self.runs.tobytes() if self.runs is not None else b''
+        return _RECORD.pack(len(text), self.width, self.columns,
+                            len(self.runs) if self.runs is not None else 0xFFFFFFFF) + text + runs
+
+    @classmethod
+    def from_buffer(cls, buffer, offset):
+        text_size, width, columns, run_count = _RECORD.unpack_from(buffer, offset)
+        offset += _RECORD.size
+        text = bytes(buffer[offset:offset + text_size]).decode('utf-8')
+        runs = None
+        if run_count != 0xFFFFFFFF:
+            offset += text_size
+            runs = array('I')
+            runs.frombytes(buffer[offset:offset + run_count * runs.itemsize])
+        return cls(text, width, columns, runs)
+
+    def render(self, columns):
+        """(text, runs) as render_runs() would give for this line at `columns`"""
+        text = self.text
+        width = self.width + columns - self.columns
+        if columns < self.columns:
+            if text.isascii():
+                text = text[:columns]
+            else:
+                # Keep the characters that fit in `columns` cells
+                kept = []
+                used = 0
+                for char in text:
+                    char_width = wcwidth(char)
+                    char_width = 1 if char_width < 0 else char_width
+                    if used + char_width > columns:
+                        break
+                    kept.append(char)
+                    used += char_width
+                text = ''.join(kept)
+                width = len(text) + columns - used
+        text = text.ljust(width)
+
+        runs = None
+        if self.runs is not None:
+            packed = self.runs
+            runs = tuple([(packed[i], _ATTRS[packed[i + 1]]) for i in range(0, len(packed), 2)])
+            if columns != self.columns:
+                runs = _clip_runs(runs, len(text))
+        return text, runs
+
+    def to_line(self, columns, default=_BLANK):
+        """Rebuild a pyte line (for HistoryScreen paging back into the buffer)"""
+        text, runs = self.render(columns)
+        line = StaticDefaultDict(default)
+        attrs_iter = itertools.chain.from_iterable(
+            itertools.repeat(attrs, length) for length, attrs in (runs or ((len(text), None),)))
+        x = 0
+        for char, attrs in zip(text, attrs_iter):
+            fields = attrs or tuple(_BLANK[1:])
+            width = wcwidth(char)
+            if width == 0 and x:
+                # Combining character: part of the previous cell
+                line[x - 1] = line[x - 1]._replace(data=line[x - 1].data + char)
+                continue
+            line[x] = Char(char, *fields)
+            if width == 2:
+                line[x + 1] = Char("", *fields)
+            x += width if width > 0 else 1
+        return line
+
+
+class ScrollbackStore:
+    """Drop-in replacement for HistoryScreen's history.top deque.
+
+    pyte appends its Line dicts; they are packed into ScrollbackLine records on
+    the way in, so scrollback costs a short string per line instead of a dict of
+    Char namedtuples per cell.
+
+    The newest `hot_lines` lines stay in memory. When `maxlen` is larger, older
+    lines spill in batches to an append-only temporary file with an offset index
+    and are read back through mmap. Once the lines dropped past `maxlen` take up
+    more of the file than the retained ones (and at least `compact_bytes`), the
+    retained lines are copied to a fresh file, so the file stays within about
+    twice the size of `maxlen` lines. close() deletes the file. The worker
+    thread appends while the GUI reads, so access is serialized by a lock.
+
+    If `index` is given (a SearchIndex), every appended line's text is added to
+    it as well.
+    """
+
+    def __init__(self, maxlen, columns, render, hot_lines=None, spill_batch=1024, index=None):
+        self.maxlen = maxlen
+        self.hot_lines = min(hot_lines or maxlen, maxlen)
+        self.columns = columns  # Kept in sync with the screen width by TerminalScreen
+        self.spill_batch = spill_batch
+        self.compact_bytes = 1 << 20  # Dropped bytes below this are not worth a rewrite
+        self.dropped = 0        # Lines discarded from the front (sequence number of line 0)
+        self._render = render   # render_runs(line, columns) -> (text, runs)
+        self.index = index
+        self._hot = collections.deque()
+        self._lock = threading.RLock()
+
+        # Spilled lines: file offsets, oldest first; entries before _cold_start were dropped
+        self.path = None
+        self._file = None
+        self._file_size = 0
+        self._map = None
+        self._offsets = array('Q')
+        self._cold_start = 0
+
+    def __len__(self):
+        return len(self._offsets) - self._cold_start + len(self._hot)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    @property
+    def spilled(self):
+        """Lines currently held in the spill file"""
+        return len(self._offsets) - self._cold_start
+
+    def __getitem__(self, index):
+        with self._lock:
+            count = len(self)
+            if index < 0:
+                index += count
+            if not 0 <= index < count:
+                raise IndexError("scrollback index out of range")
+            spilled = self.spilled
+            if index < spilled:
+                return self._read_cold(index)
+            return self._hot[index - spilled]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, line):
+        if not isinstance(line, ScrollbackLine):
+            text, runs = self._render(line, self.columns)
+            line = ScrollbackLine.from_rendered(text, runs, self.columns)
+        if self.index is not None:
+            self.index.add(line.text)
+        with self._lock:
+            self._hot.append(line)
+            if len(self._hot) > self.hot_lines:
+                if self.maxlen > self.hot_lines:
+                    if len(self._hot) >= self.hot_lines + self.spill_batch:
+                        self._spill(len(self._hot) - self.hot_lines)
+                else:
+                    self._hot.popleft()
+                    self.dropped += 1
+                    if self.index is not None:
+                        self.index.drop_before(self.dropped)
+            if len(self) > self.maxlen:
+                self._drop_spilled(len(self) - self.maxlen)
+
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+
+    def pop(self):
+        with self._lock:
+            if not self._hot and self.spilled:
+                self._hot.append(self._read_cold(self.spilled - 1))
+                del self._offsets[-1]
+            return self._hot.pop().to_line(self.columns)
+
+    def clear(self):
+        with self._lock:
+            self.dropped += len(self)
+            if self.index is not None:
+                self.index.drop_before(self.dropped)
+            self._hot.clear()
+            self._offsets = array('Q')
+            self._cold_start = 0
+            if self._file is not None:
+                self._close_map()
+                self._file.truncate(0)
+                self._file.seek(0)
+                self._file_size = 0
+
+    def render_range(self, start, stop, columns):
+        """(text, runs) for lines start..stop-1"""
+        with self._lock:
+            count = len(self)
+            start, stop = max(0, start), min(stop, count)
+            if stop <= start:
+                return []
+            spilled = self.spilled
+            lines = [self._read_cold(index) for index in range(start, min(stop, spilled))]
+            hot_start, hot_stop = max(0, start - spilled), stop - spilled
+            if hot_stop > hot_start:
+                # Walk the deque from its nearer end
+                hot = self._hot
+                if hot_start >= len(hot) - hot_stop:
+                    tail = list(itertools.islice(reversed(hot), len(hot) - hot_stop, len(hot) - hot_start))
+                    tail.reverse()
+                else:
+                    tail = list(itertools.islice(hot, hot_start, hot_stop))
+                lines.extend(tail)
+        return [line.render(columns) for line in lines]
+
+    def render_seq(self, first, stop, columns):
+        """render_range() by sequence number (line index + lines dropped so far).
+
+        Lines that have been dropped since the caller saw them come back blank.
+        """
+        with self._lock:
+            start = first - self.dropped
+            rendered = self.render_range(start, stop - self.dropped, columns)
+        missing = min(max(0, -start), stop - first)
+        return [(' ' * columns, None)] * missing + rendered
+
+    def close(self):
+        """Release the spill file (the store stays usable, in memory only)"""
+        if self.index is not None:
+            self.index.close()
+        with self._lock:
+            if self._file is None:
+                return
+            self._close_map()
+            self._file.close()
+            self._file = None
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                print(f"Could not remove scrollback file {self.path}: {e}")
+            self._offsets = array('Q')
+            self._cold_start = 0
+            self.maxlen = self.hot_lines
+            _spilling_stores.discard(self)
+
+    def _spill(self, count):
+        """Move the oldest `count` hot lines to the spill file (caller holds the lock)"""
+        if self._file is None:
+            fd, self.path = tempfile.mkstemp(prefix="myxterm-scrollback-", suffix=".dat")
+            self._file = os.fdopen(fd, 'w+b')
+            _spilling_stores.add(self)
+        records = []
+        offset = self._file_size
+        for _ in range(count):
+            record = self._hot.popleft().to_bytes()
+            self._offsets.append(offset)
+            offset += len(record)
+            records.append(record)
+        self._file.seek(self._file_size)
+        self._file.write(b''.join(records))
+        self._file_size = offset
+
+    def _drop_spilled(self, count):
+        """Forget the oldest `count` lines (caller holds the lock)"""
+        from_cold = min(count, self.spilled)
+        self._cold_start += from_cold
+        for _ in range(count - from_cold):
+            self._hot.popleft()
+        self.dropped += count
+        if self.index is not None:
+            self.index.drop_before(self.dropped)
+        if self._cold_start and self._file is not None:
+            dead = self._offsets[self._cold_start] if self.spilled else self._file_size
+            if dead > max(self.compact_bytes, self._file_size - dead):
+                self._compact(dead)
+
+    def _compact(self, start):
+        """Copy the spilled lines from file offset `start` on to a fresh file (caller holds the lock)"""
+        fd, path = tempfile.mkstemp(prefix="myxterm-scrollback-", suffix=".dat")
+        new_file = os.fdopen(fd, 'w+b')
+        self._close_map()
+        self._file.flush()
+        self._file.seek(start)
+        shutil.copyfileobj(self._file, new_file, 1 << 20)
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            print(f"Could not remove scrollback file {self.path}: {e}")
+        self._file, self.path = new_file, path
+        self._file_size -= start
+        self._offsets = array('Q', [offset - start for offset in self._offsets[self._cold_start:]])
+        self._cold_start = 0
+
+    def _read_cold(self, index):
+        """Read spilled line `index` (0 = oldest retained) through mmap (caller holds the lock)"""
+        offset = self._offsets[self._cold_start + index]
+        if self._map is None or offset >= len(self._map):
+            self._close_map()
+            self._file.flush()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return ScrollbackLine.from_buffer(self._map, offset)
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+@atexit.register
+def _remove_spill_files():
+    for store in list(_spilling_stores):
+        store.close()
@@ -0,0 +1,93 @@
+from PyQt6.QtWidgets import QCheckBox, QFrame, QHBoxLayout, QLabel, QLineEdit, QToolButton
+from PyQt6.QtCore import pyqtSignal, Qt, QTimer
+
+
+class SearchBar(QFrame):
+    """Find bar shown over the top-right corner of a terminal (Ctrl+Shift+F).
+
+    Typing restarts the search after a short pause; Enter moves to the next
+    (older) match, Shift+Enter to the previous one, Escape closes the bar.
+    """
+    search_requested = pyqtSignal(str, bool)  # Query text, regex mode
+    next_requested = pyqtSignal()
+    previous_requested = pyqtSignal()
+    closed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setObjectName("searchBar")
+        self.setStyleSheet("#searchBar { background-color: #2D2D30; border: 1px solid #555555; }"
+                           "QLineEdit { background-color: #1E1E1E; color: #FFFFFF; }"
+                           "QLabel, QCheckBox, QToolButton { color: #CCCCCC; background: transparent; }")
+        self.setCursor(Qt.CursorShape.ArrowCursor)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(4, 2, 4, 2)
+
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("Find in scrollback")
+        self.query_edit.setMinimumWidth(200)
+        self.query_edit.textChanged.connect(self._schedule_search)
+        self.query_edit.installEventFilter(self)
+        layout.addWidget(self.query_edit)
+
+        self.regex_check = QCheckBox("Regex")
+        self.regex_check.toggled.connect(self._schedule_search)
+        layout.addWidget(self.regex_check)
+
+        self.status_label = QLabel("")
+        self.status_label.setMinimumWidth(90)
+        layout.addWidget(self.status_label)
+
+        for text, tooltip, signal in (("↑", "Next match, older (Enter)", self.next_requested),
+                                      ("↓", "Previous match, newer (Shift+Enter)", self.previous_requested),
+                                      ("✕", "Close (Esc)", None)):
+            button = QToolButton()
+            button.setText(text)
+            button.setToolTip(tooltip)
+            button.clicked.connect(signal.emit if signal is not None else self.close_bar)
+            layout.addWidget(button)
+
+        # Search as you type, once typing pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self._emit_search)
+
+    def open(self):
+        self.show()
+        self.raise_()
+        self.query_edit.setFocus()
+        self.query_edit.selectAll()
+
+    def close_bar(self):
+        self.search_timer.stop()
+        self.hide()
+        self.closed.emit()
+
+    def set_status(self, text):
+        self.status_label.setText(text)
+
+    def _schedule_search(self):
+        self.search_timer.start()
+
+    def _emit_search(self):
+        self.search_requested.emit(self.query_edit.text(), self.regex_check.isChecked())
+
+    def eventFilter(self, obj, event):
+        if obj is self.query_edit and event.type() == event.Type.KeyPress:
+            key = event.key()
+            if key in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+                if self.search_timer.isActive():
+                    # Enter before the pause: search now instead of moving on
+                    self.search_timer.stop()
+                    self._emit_search()
+                elif event.modifiers() & Qt.KeyboardModifier.ShiftModifier:
+                    self.previous_requested.emit()
+                else:
+                    self.next_requested.emit()
+                return True
+            if key == Qt.Key.Key_Escape:
+                self.close_bar()
+                return True
+        return super().eventFilter(obj, event)
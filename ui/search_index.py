@@ -0,0 +1,306 @@
+from array import array
+import atexit
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from PyQt6.QtCore import pyqtSignal, QThread
+
+# Indexes with a file on disk, so files are removed even if a tab is never closed
+_open_indexes = weakref.WeakSet()
+
+
+def compile_query(text, regex=False):
+    """Compile a search query; raises re.error for an invalid regex.
+
+    Smart case: the search ignores case unless the query has capitals.
+    Regex escapes such as \\D or \\S don't count as capitals.
+    """
+    flags = re.MULTILINE
+    letters = re.sub(r'\\.', '', text) if regex else text
+    if letters == letters.lower():
+        flags |= re.IGNORECASE
+    return re.compile(text if regex else re.escape(text), flags)
+
+
+def line_matches(pattern, text):
+    """(start, end) character spans of pattern in one line, skipping empty matches"""
+    return [match.span() for match in pattern.finditer(text) if match.end() > match.start()]
+
+
+def trigrams(text):
+    """Distinct runs of three characters in text, case folded, as tuples"""
+    text = text.casefold()
+    return set(zip(text, text[1:], text[2:]))
+
+
+def summarize(text):
+    """Bloom filter of text's trigrams: one hashed bit each, at least 8 bits per trigram"""
+    grams = trigrams(text)
+    size = 64
+    while size < len(grams):
+        size *= 2
+    bits = bytearray(size)
+    mask = size * 8 - 1
+    for gram in grams:
+        h = hash(gram) & mask
+        bits[h >> 3] |= 1 << (h & 7)
+    return bytes(bits)
+
+
+def may_contain(summary, grams):
+    """False if the text summarized cannot contain a string with these trigrams"""
+    mask = len(summary) * 8 - 1
+    for gram in grams:
+        h = hash(gram) & mask
+        if not summary[h >> 3] & (1 << (h & 7)):
+            return False
+    return True
+
+
+class SearchIndex:
+    """Plain-text copy of a tab's scrollback for searching.
+
+    Every line that enters history is added in order, so line N of the index
+    is scrollback sequence number N. Lines are buffered and written in chunks
+    of `chunk_lines` to an append-only temporary file, '\\n'-terminated, so a
+    search scans whole chunks through mmap with one regex call each instead of
+    decoding scrollback records line by line. Each written chunk also gets a
+    small trigram summary (see summarize()), so a literal query skips the
+    chunks that cannot contain it without reading them. The worker thread
+    adds lines while search threads read, so access is serialized by a lock.
+
+    drop_before() forgets chunks that have fallen off the scrollback; like the
+    scrollback spill file, the file is rewritten once they take up more of it
+    than the chunks still kept.
+    """
+
+    def __init__(self, chunk_lines=4096):
+        self.chunk_lines = chunk_lines
+        self.path = None
+        self._file = None
+        self._size = 0
+        self._chunks = array('Q')  # File offset of each written chunk still kept
+        self._summaries = []       # Trigram summary of each chunk in _chunks
+        self._first_chunk = 0      # Number of the chunk at _chunks[0]; earlier ones were dropped
+        self.compact_bytes = 1 << 20  # Dropped bytes below this are not worth a rewrite
+        self._buffer = []          # Lines not written yet
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return (self._first_chunk + len(self._chunks)) * self.chunk_lines + len(self._buffer)
+
+    def add(self, text):
+        with self._lock:
+            self._buffer.append(text)
+            if len(self._buffer) >= self.chunk_lines:
+                self._write_chunk()
+
+    def drop_before(self, sequence):
+        """Forget the written chunks that end before line `sequence`"""
+        drop = min(sequence // self.chunk_lines - self._first_chunk, len(self._chunks))
+        if drop <= 0:
+            return
+        with self._lock:
+            drop = min(sequence // self.chunk_lines - self._first_chunk, len(self._chunks))
+            if drop <= 0:
+                return
+            del self._chunks[:drop]
+            del self._summaries[:drop]
+            self._first_chunk += drop
+            dead = self._chunks[0] if self._chunks else self._size
+            if dead > max(self.compact_bytes, self._size - dead):
+                self._compact(dead)
+
+    def chunks(self, first, stop, literal=None):
+        """(sequence number, line count, text) chunks covering lines first..stop-1, newest first.
+
+        A chunk may start before `first` or run past `stop`; callers skip those
+        lines. If `literal` is given, text is None for the written chunks whose
+        summary shows they cannot contain it. Safe to call from any thread
+        while lines are being added.
+        """
+        grams = trigrams(literal) if literal else None
+        with self._lock:
+            buffer = list(self._buffer)
+            first_chunk = self._first_chunk
+            buffer_first = (first_chunk + len(self._chunks)) * self.chunk_lines
+            offsets = self._chunks[:]
+            summaries = self._summaries[:]
+            size = self._size
+            f = None
+            if offsets:
+                self._file.flush()
+                f = open(self.path, 'rb')  # Opened under the lock: a rewrite may replace the file
+
+        if buffer and buffer_first < stop:
+            yield buffer_first, len(buffer), '\n'.join(buffer) + '\n'
+        if f is None:
+            return
+        with f, mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as data:
+            last = min(len(offsets), (stop - 1) // self.chunk_lines + 1 - first_chunk)
+            for i in range(last - 1, max(0, first // self.chunk_lines - first_chunk) - 1, -1):
+                if grams and not may_contain(summaries[i], grams):
+                    yield (first_chunk + i) * self.chunk_lines, self.chunk_lines, None
+                    continue
+                end = offsets[i + 1] if i + 1 < len(offsets) else size
+                yield ((first_chunk + i) * self.chunk_lines, self.chunk_lines,
+                       data[offsets[i]:end].decode('utf-8', 'replace'))
+
+    def close(self):
+        """Delete the index file"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                print(f"Could not remove search index file {self.path}: {e}")
+            _open_indexes.discard(self)
+
+    def _compact(self, start):
+        """Copy the file from offset `start` on to a fresh file (caller holds the lock)"""
+        fd, path = tempfile.mkstemp(prefix="myxterm-search-", suffix=".txt")
+        new_file = os.fdopen(fd, 'wb')
+        self._file.close()
+        with open(self.path, 'rb') as old:
+            old.seek(start)
+            shutil.copyfileobj(old, new_file, 1 << 20)
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            print(f"Could not remove search index file {self.path}: {e}")
+        self._file, self.path = new_file, path
+        self._size -= start
+        self._chunks = array('Q', [offset - start for offset in self._chunks])
+
+    def _write_chunk(self):
+        """Append the buffered lines to the file as one chunk (caller holds the lock)"""
+        if self._file is None:
+            fd, self.path = tempfile.mkstemp(prefix="myxterm-search-", suffix=".txt")
+            self._file = os.fdopen(fd, 'wb')
+            _open_indexes.add(self)
+        text = '\n'.join(self._buffer) + '\n'
+        data = text.encode('utf-8', 'replace')
+        self._chunks.append(self._size)
+        self._summaries.append(summarize(text))
+        self._file.write(data)
+        self._size += len(data)
+        self._buffer = []
+
+
+class SearchThread(QThread):
+    """Runs one query over a tab's screen rows and scrollback, newest lines first.
+
+    Matches are streamed back in batches as (sequence number, start, end) with
+    character offsets into the line, so the first hits show up while older
+    history is still being scanned. For a plain-text query, `literal` is the
+    query text; chunks that cannot contain it are skipped unread.
+    """
+    matches_found = pyqtSignal(list)
+
+    def __init__(self, index, pattern, screen_lines, history_first, screen_start,
+                 batch_size=256, max_matches=100000, literal=None):
+        super().__init__()
+        self.index = index
+        self.pattern = pattern
+        self.literal = literal
+        # re.IGNORECASE is several times slower than matching lowercased text
+        # with a case-sensitive pattern, so case-insensitive queries do that
+        self.folded_pattern = None
+        if pattern.flags & re.IGNORECASE:
+            self.folded_pattern = re.compile(pattern.pattern, pattern.flags & ~re.IGNORECASE)
+        self.screen_lines = [line.rstrip(' ') for line in screen_lines]  # Top to bottom
+        self.history_first = history_first      # Oldest scrollback line still kept
+        self.screen_start = screen_start        # Sequence number of screen row 0
+        self.batch_size = batch_size
+        self.max_matches = max_matches
+        self.cancelled = False
+
+        self.match_count = 0
+        self.lines_searched = 0
+        self.chunks_skipped = 0
+        self.first_hit_ms = None
+        self.elapsed_ms = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        self._start = time.perf_counter()
+        self._batch = []
+        try:
+            for row in range(len(self.screen_lines) - 1, -1, -1):
+                spans = line_matches(self.pattern, self.screen_lines[row])
+                self._add(self.screen_start + row, reversed(spans))
+            self.lines_searched += len(self.screen_lines)
+
+            for first, count, text in self.index.chunks(self.history_first, self.screen_start, self.literal):
+                if self.cancelled or self.match_count >= self.max_matches:
+                    break
+                if text is None:
+                    self.chunks_skipped += 1
+                else:
+                    self._search_chunk(first, text)
+                self.lines_searched += count
+        except Exception as e:
+            print(f"Error searching scrollback: {e}")
+        if self._batch and not self.cancelled:
+            self.matches_found.emit(self._batch)
+        self.elapsed_ms = (time.perf_counter() - self._start) * 1000
+
+    def _search_chunk(self, first, text):
+        """Find matches in one '\\n'-joined chunk whose first line is sequence number `first`"""
+        pattern = self.pattern
+        if self.folded_pattern is not None:
+            folded = text.lower()
+            if len(folded) == len(text):  # Offsets still line up
+                pattern, text = self.folded_pattern, folded
+        found = []
+        seq = first
+        position = 0
+        line_start = 0
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            if end == start:
+                continue
+            # Advance to the match's line; a match spanning lines is cut at the first line's end
+            newlines = text.count('\n', position, start)
+            if newlines:
+                seq += newlines
+                line_start = text.rfind('\n', 0, start) + 1
+            position = start
+            if seq < self.history_first or seq >= self.screen_start:
+                continue
+            line_end = text.find('\n', start)
+            found.append((seq, start - line_start, min(end, line_end) - line_start))
+        found.reverse()
+        self._add_found(found)
+
+    def _add(self, seq, spans):
+        self._add_found([(seq, start, end) for start, end in spans])
+
+    def _add_found(self, found):
+        if not found or self.cancelled:
+            return
+        found = found[:self.max_matches - self.match_count]
+        if self.first_hit_ms is None:
+            self.first_hit_ms = (time.perf_counter() - self._start) * 1000
+        self.match_count += len(found)
+        self._batch.extend(found)
+        if len(self._batch) >= self.batch_size or self.match_count == len(found):
+            # The first hits go out straight away; after that, in batches
+            self.matches_found.emit(self._batch)
+            self._batch = []
+
+
+@atexit.register
+def _remove_index_files():
+    for index in list(_open_indexes):
+        index.close()
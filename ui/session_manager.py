@@ -1,6 +1,32 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QLineEdit, 
                              QDialogButtonBox, QSpinBox, QTabWidget, QWidget,
-                             QCheckBox, QGroupBox, QLabel)
+                             QCheckBox, QGroupBox, QLabel, QComboBox)
+
+# Character sets offered for decoding remote output (label, Python codec name)
+CHARSETS = [
+    ("UTF-8", "utf-8"),
+    ("Latin-1 (ISO-8859-1)", "latin-1"),
+    ("Windows-1252", "cp1252"),
+    ("GBK", "gbk"),
+]
+
+
+def parse_jump_hops(text):
+    """Further bastions from OpenSSH -J syntax: "user@host:port, user@host2" """
+    hops = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        username, _, address = part.rpartition("@")
+        host, _, port = address.partition(":")
+        hops.append({"host": host, "port": int(port) if port.isdigit() else 22, "username": username or None})
+    return hops
+
+
+def format_jump_hops(hops):
+    return ", ".join(f"{hop['username'] + '@' if hop.get('username') else ''}{hop['host']}"
+                     f"{':' + str(hop['port']) if hop.get('port', 22) != 22 else ''}" for hop in hops)
 
 class SessionManager(QDialog):
     def __init__(self, parent=None, session_data=None):
@@ -47,12 +73,16 @@ class SessionManager(QDialog):
         self.username_input = QLineEdit()
         self.password_input = QLineEdit()
         self.password_input.setEchoMode(QLineEdit.EchoMode.Password)
+        self.charset_combo = QComboBox()
+        for label, codec in CHARSETS:
+            self.charset_combo.addItem(label, codec)
         
         form_layout.addRow("Session Name:", self.name_input)
         form_layout.addRow("Remote Host:", self.host_input)
         form_layout.addRow("Port:", self.port_input)
         form_layout.addRow("Username:", self.username_input)
         form_layout.addRow("Password:", self.password_input)
+        form_layout.addRow("Character Set:", self.charset_combo)
         
         layout.addLayout(form_layout)
         layout.addStretch()
@@ -97,12 +127,17 @@ class SessionManager(QDialog):
         self.jump_username_input = QLineEdit()
         self.jump_password_input = QLineEdit()
         self.jump_password_input.setEchoMode(QLineEdit.EchoMode.Password)
+        self.jump_hops_input = QLineEdit()
+        self.jump_hops_input.setPlaceholderText("user@host2:22, user@host3")
+        self.jump_hops_input.setToolTip("More bastions reached through the jump host, in order (like ssh -J); "
+                                        "their passwords are asked for when connecting")
         
         jump_layout.addRow("Use Proxy Jump:", self.use_jump_checkbox)
         jump_layout.addRow("Jump Host:", self.jump_host_input)
         jump_layout.addRow("Jump Port:", self.jump_port_input)
         jump_layout.addRow("Jump Username:", self.jump_username_input)
         jump_layout.addRow("Jump Password:", self.jump_password_input)
+        jump_layout.addRow("Further Hops:", self.jump_hops_input)
         
         # Info label
         info_label = QLabel("Proxy Jump connects through a bastion/jump host to reach the target server.")
@@ -132,6 +167,7 @@ class SessionManager(QDialog):
         self.jump_port_input.setEnabled(enabled)
         self.jump_username_input.setEnabled(enabled)
         self.jump_password_input.setEnabled(enabled)
+        self.jump_hops_input.setEnabled(enabled)
     
     def load_session_data(self, session_data):
         """Load session data into form fields"""
@@ -141,6 +177,9 @@ class SessionManager(QDialog):
         self.port_input.setValue(session_data.get("port", 22))
         self.username_input.setText(session_data.get("username", ""))
         self.password_input.setText(session_data.get("password", ""))
+        index = self.charset_combo.findData(session_data.get("charset", "utf-8"))
+        if index >= 0:
+            self.charset_combo.setCurrentIndex(index)
         
         # Network settings - Proxy
         proxy_settings = session_data.get("proxy", {})
@@ -159,6 +198,7 @@ class SessionManager(QDialog):
             self.jump_port_input.setValue(jump_settings.get("port", 22))
             self.jump_username_input.setText(jump_settings.get("username", ""))
             self.jump_password_input.setText(jump_settings.get("password", ""))
+            self.jump_hops_input.setText(format_jump_hops(jump_settings.get("hops", [])))
 
     def get_session_data(self):
         """Get session data from form fields"""
@@ -167,7 +207,8 @@ class SessionManager(QDialog):
             "host": self.host_input.text(),
             "port": self.port_input.value(),
             "username": self.username_input.text(),
-            "password": self.password_input.text()
+            "password": self.password_input.text(),
+            "charset": self.charset_combo.currentData()
         }
         
         # Add proxy settings if enabled
@@ -187,7 +228,8 @@ class SessionManager(QDialog):
                 "host": self.jump_host_input.text(),
                 "port": self.jump_port_input.value(),
                 "username": self.jump_username_input.text(),
-                "password": self.jump_password_input.text()
+                "password": self.jump_password_input.text(),
+                "hops": parse_jump_hops(self.jump_hops_input.text())
             }
         else:
             data["proxy_jump"] = {"enabled": False}
@@ -1,7 +1,7 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTabWidget, 
                              QWidget, QLabel, QComboBox, QSpinBox, QPushButton,
                              QColorDialog, QGroupBox, QRadioButton, QButtonGroup,
-                             QPlainTextEdit, QFormLayout)
+                             QPlainTextEdit, QFormLayout, QCheckBox)
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QColor, QFont
 from .settings_manager import SettingsManager
@@ -38,6 +38,10 @@ class SettingsDialog(QDialog):
         self.appearance_tab = self.create_appearance_tab()
         self.tabs.addTab(self.appearance_tab, "Appearance")
         
+        # Connection Tab
+        self.connection_tab = self.create_connection_tab()
+        self.tabs.addTab(self.connection_tab, "Connection")
+        
         # Buttons
         button_layout = QHBoxLayout()
         button_layout.addStretch()
@@ -124,6 +128,50 @@ class SettingsDialog(QDialog):
         color_group.setLayout(color_layout)
         layout.addWidget(color_group)
         
+        # Performance Settings Group
+        perf_group = QGroupBox("Performance")
+        perf_layout = QFormLayout()
+        
+        # Output high-water mark: unprocessed output allowed before readers pause
+        self.output_buffer_spin = QSpinBox()
+        self.output_buffer_spin.setRange(256, 65536)
+        self.output_buffer_spin.setSingleStep(256)
+        self.output_buffer_spin.setSuffix(" KB")
+        self.output_buffer_spin.setToolTip("Pause reading from a session once this much output is waiting to be displayed")
+        perf_layout.addRow("Output Buffer:", self.output_buffer_spin)
+        
+        # Terminal view implementation, so the two can be compared
+        self.renderer_combo = QComboBox()
+        self.renderer_combo.addItem("Text widget", "text")
+        self.renderer_combo.addItem("Painted grid", "grid")
+        self.renderer_combo.setToolTip("How terminal output is drawn; applies to new tabs")
+        perf_layout.addRow("Renderer:", self.renderer_combo)
+        
+        # Scrollback: total lines per tab, and how many of them stay in memory
+        self.scrollback_spin = QSpinBox()
+        self.scrollback_spin.setRange(1000, 100000000)
+        self.scrollback_spin.setSingleStep(100000)
+        self.scrollback_spin.setSuffix(" lines")
+        self.scrollback_spin.setToolTip("History kept per tab; lines beyond the in-memory window are stored in a temporary file")
+        perf_layout.addRow("Scrollback:", self.scrollback_spin)
+        
+        self.scrollback_hot_spin = QSpinBox()
+        self.scrollback_hot_spin.setRange(1000, 1000000)
+        self.scrollback_hot_spin.setSingleStep(1000)
+        self.scrollback_hot_spin.setSuffix(" lines")
+        self.scrollback_hot_spin.setToolTip("Most recent history lines kept in memory per tab")
+        perf_layout.addRow("In-memory Scrollback:", self.scrollback_hot_spin)
+        
+        self.max_fps_spin = QSpinBox()
+        self.max_fps_spin.setRange(10, 240)
+        self.max_fps_spin.setSingleStep(10)
+        self.max_fps_spin.setSuffix(" FPS")
+        self.max_fps_spin.setToolTip("Most frames per second drawn while output is streaming; echoed keystrokes are drawn at once")
+        perf_layout.addRow("Frame Rate Cap:", self.max_fps_spin)
+        
+        perf_group.setLayout(perf_layout)
+        layout.addWidget(perf_group)
+        
         # Preview Group
         preview_group = QGroupBox("Preview")
         preview_layout = QVBoxLayout()
@@ -172,6 +220,40 @@ class SettingsDialog(QDialog):
         
         return widget
     
+    def create_connection_tab(self):
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        
+        # SSH Settings Group
+        ssh_group = QGroupBox("SSH")
+        ssh_layout = QFormLayout()
+        
+        # Like OpenSSH ControlMaster: one login per user@host, one channel per tab
+        self.share_connections_check = QCheckBox("Share connections between tabs")
+        self.share_connections_check.setToolTip("Open new tabs to an already connected user@host as extra channels on the "
+                                                "existing connection, without logging in again")
+        ssh_layout.addRow(self.share_connections_check)
+        
+        # Bastion logins are pooled; an idle one is kept so the next tab behind it needs no MFA
+        self.jump_idle_spin = QSpinBox()
+        self.jump_idle_spin.setRange(0, 1440)
+        self.jump_idle_spin.setSuffix(" min")
+        self.jump_idle_spin.setSpecialValueText("Close with last tab")
+        self.jump_idle_spin.setToolTip("How long a jump host connection stays open after the last tab using it closes")
+        ssh_layout.addRow("Keep Idle Jump Hosts:", self.jump_idle_spin)
+        
+        self.max_connections_spin = QSpinBox()
+        self.max_connections_spin.setRange(1, 64)
+        self.max_connections_spin.setToolTip("Sessions that connect at the same time when several are opened at once")
+        ssh_layout.addRow("Parallel Connections:", self.max_connections_spin)
+        
+        ssh_group.setLayout(ssh_layout)
+        layout.addWidget(ssh_group)
+        
+        layout.addStretch()
+        
+        return widget
+    
     def load_current_settings(self):
         """Load current settings into UI controls"""
         # Terminal settings
@@ -181,6 +263,12 @@ class SettingsDialog(QDialog):
             self.font_family_combo.setCurrentIndex(index)
         
         self.font_size_spin.setValue(self.current_settings["terminal"]["font_size"])
+        self.output_buffer_spin.setValue(self.current_settings["terminal"].get("output_buffer_kb", 4096))
+        renderer_index = self.renderer_combo.findData(self.current_settings["terminal"].get("renderer", "text"))
+        self.renderer_combo.setCurrentIndex(max(0, renderer_index))
+        self.scrollback_spin.setValue(self.current_settings["terminal"].get("scrollback_lines", 1000000))
+        self.scrollback_hot_spin.setValue(self.current_settings["terminal"].get("scrollback_hot_lines", 10000))
+        self.max_fps_spin.setValue(self.current_settings["terminal"].get("max_fps", 60))
         
         self.fg_color = QColor(self.current_settings["terminal"]["foreground_color"])
         self.bg_color = QColor(self.current_settings["terminal"]["background_color"])
@@ -193,6 +281,12 @@ class SettingsDialog(QDialog):
         else:
             self.light_theme_radio.setChecked(True)
         
+        # Connection settings
+        connection = self.current_settings.get("connection", {})
+        self.share_connections_check.setChecked(connection.get("share_connections", True))
+        self.jump_idle_spin.setValue(connection.get("jump_idle_minutes", 5))
+        self.max_connections_spin.setValue(connection.get("max_parallel_connections", 32))
+        
         self.update_preview()
     
     def choose_fg_color(self):
@@ -245,10 +339,20 @@ class SettingsDialog(QDialog):
                 "font_family": self.font_family_combo.currentText(),
                 "font_size": self.font_size_spin.value(),
                 "foreground_color": self.fg_color.name(),
-                "background_color": self.bg_color.name()
+                "background_color": self.bg_color.name(),
+                "output_buffer_kb": self.output_buffer_spin.value(),
+                "renderer": self.renderer_combo.currentData(),
+                "scrollback_lines": self.scrollback_spin.value(),
+                "scrollback_hot_lines": self.scrollback_hot_spin.value(),
+                "max_fps": self.max_fps_spin.value()
             },
             "appearance": {
                 "theme": "dark" if self.dark_theme_radio.isChecked() else "light"
+            },
+            "connection": {
+                "share_connections": self.share_connections_check.isChecked(),
+                "jump_idle_minutes": self.jump_idle_spin.value(),
+                "max_parallel_connections": self.max_connections_spin.value()
             }
         }
         
@@ -1,7 +1,6 @@
 import json
 import os
-import sys
-from utils import resource_path
+from utils import app_dir, resource_path
 
 class SettingsManager:
     """Singleton class to manage application settings"""
@@ -20,14 +19,7 @@ class SettingsManager:
         self._initialized = True
         
         # Use a path that works for both dev and frozen environments
-        if getattr(sys, 'frozen', False):
-            # In frozen app, settings should be in the same folder as the .exe
-            base_dir = os.path.dirname(sys.executable)
-        else:
-            # In dev, use current working directory or script directory
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            
-        self.settings_file = os.path.join(base_dir, "settings.json")
+        self.settings_file = os.path.join(app_dir(), "settings.json")
         self.settings = self.load_settings()
         self._callbacks = []  # List of callbacks to call when settings change
     
@@ -38,10 +30,20 @@ class SettingsManager:
                 "font_family": "Consolas",
                 "font_size": 10,
                 "foreground_color": "#FFFFFF",
-                "background_color": "#000000"
+                "background_color": "#000000",
+                "output_buffer_kb": 4096,  # Unprocessed output allowed before readers pause
+                "renderer": "text",  # "text" (QPlainTextEdit) or "grid" (painted character grid)
+                "scrollback_lines": 1000000,  # Total history per tab; older lines spill to disk
+                "scrollback_hot_lines": 10000,  # History kept in memory per tab
+                "max_fps": 60  # Frame rate cap while output is streaming
             },
             "appearance": {
                 "theme": "dark"  # "dark" or "light"
+            },
+            "connection": {
+                "share_connections": True,  # New tabs to an open user@host reuse its SSH transport
+                "jump_idle_minutes": 5,  # Bastion logins kept this long after their last tab (0: close with it)
+                "max_parallel_connections": 32  # Sessions connecting at once; the rest wait their turn
             }
         }
     
@@ -1,4 +1,4 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTreeWidget, QTreeWidgetItem, QPushButton, QLabel, QMenu, QMessageBox, QInputDialog
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTreeWidget, QTreeWidgetItem, QPushButton, QLabel, QMenu, QMessageBox, QInputDialog, QAbstractItemView
 from PyQt6.QtGui import QIcon
 from PyQt6.QtCore import Qt, pyqtSignal
 from utils import resource_path
@@ -9,6 +9,7 @@ from .session_store import SessionStore
 class Sidebar(QWidget):
     new_session_clicked = pyqtSignal()
     session_double_clicked = pyqtSignal(dict)
+    sessions_open_requested = pyqtSignal(list)  # Several sessions to connect in parallel
 
     def __init__(self):
         super().__init__()
@@ -23,6 +24,7 @@ class Sidebar(QWidget):
         # Session Tree
         self.tree = QTreeWidget()
         self.tree.setHeaderHidden(True)
+        self.tree.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.tree.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.show_context_menu)
         self.tree.itemDoubleClicked.connect(self.on_item_double_clicked)
@@ -73,9 +75,29 @@ class Sidebar(QWidget):
     def export_sessions(self, filename):
         return self.session_store.export_to_xml(filename)
 
+    def folder_sessions(self, folder):
+        """Saved session data under a folder item"""
+        return [folder.child(i).data(0, Qt.ItemDataRole.UserRole) for i in range(folder.childCount())
+                if folder.child(i).data(0, Qt.ItemDataRole.UserRole)]
+
+    def selected_sessions(self):
+        return [item.data(0, Qt.ItemDataRole.UserRole) for item in self.tree.selectedItems()
+                if item.parent() and item.data(0, Qt.ItemDataRole.UserRole)]
+
     def show_context_menu(self, position):
         item = self.tree.itemAt(position)
-        if not item or not item.parent(): # Ignore top-level items or empty space
+        if not item:
+            return
+        
+        if not item.parent():
+            # Folder: open everything in it at once
+            sessions = self.folder_sessions(item)
+            if not sessions:
+                return
+            menu = QMenu()
+            open_all_action = menu.addAction(f"Open All in Folder ({len(sessions)})")
+            if menu.exec(self.tree.viewport().mapToGlobal(position)) == open_all_action:
+                self.sessions_open_requested.emit(sessions)
             return
         
         data = item.data(0, Qt.ItemDataRole.UserRole)
@@ -83,13 +105,20 @@ class Sidebar(QWidget):
             return
 
         menu = QMenu()
+        selected = self.selected_sessions() if item.isSelected() else []
+        open_selected_action = None
+        if len(selected) > 1:
+            open_selected_action = menu.addAction(f"Open Selected ({len(selected)})")
+            menu.addSeparator()
         edit_action = menu.addAction("Edit Session")
         rename_action = menu.addAction("Rename")
         delete_action = menu.addAction("Delete")
         
         action = menu.exec(self.tree.viewport().mapToGlobal(position))
         
-        if action == edit_action:
+        if action is not None and action == open_selected_action:
+            self.sessions_open_requested.emit(selected)
+        elif action == edit_action:
             self.edit_session(data)
         elif action == rename_action:
             self.rename_session(data)
@@ -1,105 +1,155 @@
-from PyQt6.QtWidgets import QPlainTextEdit, QTextEdit
+from PyQt6.QtWidgets import QApplication, QPlainTextEdit, QScrollBar, QTextEdit
 from PyQt6.QtCore import pyqtSignal, QThread, Qt, QTimer
+import codecs
+import collections
+import re
 import sys
-import pyte
+import threading
+import time
 from PyQt6.QtGui import QFont, QTextCursor, QColor
+from .screen_worker import ScreenWorker, TerminalScreen, column_index
+from .char_formats import CharFormatCache
+from .latency import LatencyDialog, LatencyTracker
+from .paste import PasteProgress, PasteWriter, prepare_paste
+from .search_bar import SearchBar
+from .search_index import SearchThread, compile_query, line_matches
 
 class SSHReaderThread(QThread):
-    """Optimized SSH reader thread with signal batching and reduced latency"""
-    data_received = pyqtSignal(str)
+    """Event-driven reader thread: sleeps until the session has output, then drains it"""
+    data_received = pyqtSignal(bytes)
     session_closed = pyqtSignal()
 
-    def __init__(self, session):
+    def __init__(self, session, high_water_bytes=4 * 1024 * 1024):
         super().__init__()
         self.session = session
         self.running = True
-        # Performance: Batch small reads together
-        self.batch_buffer = []
-        self.batch_threshold = 5  # Batch up to 5 small reads
+        # How long a wait may block before re-checking running/is_active (seconds)
+        self.idle_timeout = 0.25
+        # Poll interval for sessions that cannot block on their output (ms)
+        self.poll_interval = 5
+        
+        # Backpressure: bytes emitted but not yet processed by the GUI thread.
+        # Once this reaches high_water_bytes the reader stops reading, so the
+        # SSH channel window (or the PTY) throttles the producer instead of
+        # Qt's queued-signal queue growing without bound.
+        self.high_water_bytes = high_water_bytes
+        self.pending_bytes = 0
+        self.peak_pending_bytes = 0
+        self.throttle_count = 0  # Times the reader paused at the high-water mark
+        self._pending_cond = threading.Condition()
+
+    def _wait_for_room(self):
+        """Block while the GUI thread is behind by high_water_bytes or more"""
+        with self._pending_cond:
+            if self.pending_bytes < self.high_water_bytes:
+                return True
+            self.throttle_count += 1
+            while self.running and self.pending_bytes >= self.high_water_bytes:
+                self._pending_cond.wait(self.idle_timeout)
+            return self.running
+
+    def consumed(self, nbytes):
+        """Called from the GUI thread once an emitted chunk has been processed"""
+        with self._pending_cond:
+            self.pending_bytes = max(0, self.pending_bytes - nbytes)
+            self._pending_cond.notify_all()
+
+    def _wait_for_output(self):
+        """Block until the session reports output (or EOF); fall back to polling"""
+        wait_for_output = getattr(self.session, 'wait_for_output', None)
+        if wait_for_output is None:
+            self.msleep(self.poll_interval)
+            return True
+        return wait_for_output(self.idle_timeout)
 
     def run(self):
-        """Main thread loop - optimized for low latency"""
+        """Main thread loop - wakes only when data or EOF arrives"""
         # Set higher thread priority for better responsiveness
         self.setPriority(QThread.Priority.HighPriority)
         
         while self.running and self.session.running:
-            data = self.session.read_output()
+            if not self._wait_for_room():
+                break
+            ready = self._wait_for_output()
+            if not self.running:
+                break
+            
+            # read_output() drains everything that is buffered in one go,
+            # so a single signal carries the whole burst
+            data = self.session.read_output() if ready else None
             if data:
-                # Emit data immediately for large chunks, batch for small ones
-                if len(data) > 1024 or not self.batch_buffer:
-                    # Emit any pending batched data first
-                    if self.batch_buffer:
-                        self.data_received.emit(''.join(self.batch_buffer))
-                        self.batch_buffer = []
-                    # Emit current data
-                    self.data_received.emit(data)
-                else:
-                    # Batch small chunks to reduce signal overhead
-                    self.batch_buffer.append(data)
-                    if len(self.batch_buffer) >= self.batch_threshold:
-                        self.data_received.emit(''.join(self.batch_buffer))
-                        self.batch_buffer = []
-            else:
-                # Emit any pending batched data before checking session
-                if self.batch_buffer:
-                    self.data_received.emit(''.join(self.batch_buffer))
-                    self.batch_buffer = []
-                
-                # Check if session is still active
-                if not self.session.is_active():
-                    self.session_closed.emit()
-                    break
-                # Reduced sleep from 10ms to 5ms for better responsiveness
-                self.msleep(5)
+                with self._pending_cond:
+                    self.pending_bytes += len(data)
+                    self.peak_pending_bytes = max(self.peak_pending_bytes, self.pending_bytes)
+                self.data_received.emit(data)
+                continue
+            
+            # Nothing to read: either the wait timed out or the session hit EOF
+            if not self.session.is_active():
+                self.session_closed.emit()
+                break
+            if ready:
+                # Woken without data (e.g. EOF not yet turned into a close); don't spin
+                self.msleep(self.poll_interval)
 
     def stop(self):
         self.running = False
+        with self._pending_cond:
+            self._pending_cond.notify_all()
 
 
-class TerminalScreen(pyte.HistoryScreen):
-    def __init__(self, columns, lines, history=100, ratio=0.5):
-        super().__init__(columns, lines, history, ratio)
-        self.cleared_callback = None
+class CopyThread(QThread):
+    """Builds the clipboard text of a long selection off the GUI thread.
 
-    def erase_in_display(self, how=0, private=False):
-        # how=2 is "clear entire screen"
-        # how=0 is "clear from cursor to end of screen".
-        # If cursor is at the top (x=0, y=0), how=0 effectively clears the whole screen.
-        # SSH sessions often use ESC[H (Home) + ESC[J (Clear Down) instead of ESC[2J (Clear All).
-        
-        soft_clear = (how == 2) or (how == 0 and self.cursor.y == 0)
-
-        if soft_clear:
-            # Implement "Soft Clear": Push current screen lines to history
-            # This preserves the content in the scrollback so the user can scroll up.
-            
-            for i in range(self.lines):
-                line = self.display[i]
-                # pyte history stores the line object.
-                # In some cases (like empty lines optimization), line might be a string (or immutable).
-                if isinstance(line, str):
-                   self.history.top.append(line)
-                else:
-                   self.history.top.append(line.copy())
-            
-            if self.cleared_callback:
-                self.cleared_callback()
-        
-        super().erase_in_display(how, private)
+    Scrollback lines first..stop-1 (sequence numbers) are read back through
+    the screen worker a page at a time, from the spill file if need be, and
+    followed by `rows`, the selected screen rows. trim(n, text) gives the
+    copied part of the nth line.
+    """
+    text_ready = pyqtSignal(str)
 
-class Terminal(QPlainTextEdit):
-    session_closed = pyqtSignal()
-    
-    def __init__(self, session, settings=None):
+    def __init__(self, worker, first, stop, columns, rows, trim, page_lines=65536):
         super().__init__()
-        self.session = session
-        self.setReadOnly(False) # Allow scrolling and selection
-        self.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse | Qt.TextInteractionFlag.TextSelectableByKeyboard)
-        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
-        self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap) # Disable wrapping for correct cursor positioning
-        self.setUndoRedoEnabled(False) # Disable undo/redo to prevent issues
-        
-        # Apply settings or use defaults
+        self.worker = worker
+        self.first = first
+        self.stop = stop
+        self.columns = columns
+        self.rows = list(rows)
+        self.trim = trim
+        self.page_lines = page_lines
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        lines = []
+        try:
+            for start in range(self.first, self.stop, self.page_lines):
+                if self.cancelled:
+                    return
+                page = self.worker.history_lines(start, min(self.stop, start + self.page_lines), self.columns)
+                lines.extend(self.trim(len(lines), text) for text, _ in page)
+            lines.extend(self.trim(len(lines), text) for text in self.rows)
+        except Exception as e:
+            print(f"Error copying scrollback: {e}")
+            return
+        if not self.cancelled:
+            self.text_ready.emit('\n'.join(lines))
+
+
+class TerminalSessionMixin:
+    """Session plumbing shared by the terminal views (text widget and painted grid).
+
+    Owns the reader thread, the screen worker and the frame timer, and turns key
+    presses into bytes for the session. Views implement refresh_display(),
+    copy(), selectAll() and has_selection(), and for search _scroll_to_line()
+    and _search_changed().
+    """
+
+    @staticmethod
+    def terminal_settings(settings):
+        """The "terminal" settings section, with defaults for a missing settings dict"""
         if settings is None:
             settings = {
                 "terminal": {
@@ -109,294 +159,218 @@ class Terminal(QPlainTextEdit):
                     "background_color": "#000000"
                 }
             }
-        
-        terminal_settings = settings.get("terminal", {})
-        font_family = terminal_settings.get("font_family", "Consolas")
-        font_size = terminal_settings.get("font_size", 10)
-        fg_color = terminal_settings.get("foreground_color", "#FFFFFF")
-        bg_color = terminal_settings.get("background_color", "#000000")
-        
-        # Apply styling with settings
-        self.setStyleSheet(f"background-color: {bg_color}; color: {fg_color}; font-family: {font_family}, monospace; font-size: {font_size}pt;")
-        
-        # Ensure cursor color is correct via Palette
-        from PyQt6.QtGui import QPalette, QColor
-        palette = self.palette()
-        palette.setColor(QPalette.ColorRole.Base, QColor(bg_color))
-        palette.setColor(QPalette.ColorRole.Text, QColor(fg_color))
-        self.setPalette(palette)
+        return settings.get("terminal", {})
+
+    def _init_session(self, session, terminal_settings):
+        """Start the reader and screen worker threads for session"""
+        self.session = session
+        output_buffer_kb = terminal_settings.get("output_buffer_kb", 4096)
         
         # Terminal Emulator with scrollback
         self.cols = 80
         self.rows = 24
-        self.scrollback_lines = 10000  # Number of lines to keep in history
+        # Scrollback beyond the in-memory window spills to a per-tab temp file
+        self.scrollback_lines = max(1, terminal_settings.get("scrollback_lines", 1000000))
+        self.scrollback_hot_lines = min(self.scrollback_lines,
+                                        max(1, terminal_settings.get("scrollback_hot_lines", 10000)))
         
-        # Performance: Cache font metrics to avoid repeated calculations
-        self._cached_char_width = None
-        self._cached_char_height = None
-        
-        # Performance: Track last rendered state for incremental updates
-        self._last_history_len = 0
-        self._last_display_hash = None
+        # Sessions deliver raw bytes; the worker decodes them incrementally in the
+        # session's charset so multibyte characters split across reads are reassembled
+        self.charset = getattr(session, 'charset', None) or "utf-8"
+        try:
+            codecs.lookup(self.charset)
+        except LookupError:
+            print(f"Unknown charset '{self.charset}', falling back to utf-8")
+            self.charset = "utf-8"
         
-        # Use our custom screen to detect clears
-        self.screen = TerminalScreen(self.cols, self.rows, history=self.scrollback_lines)
-        self.screen.cleared_callback = self.on_screen_cleared
-        self.stream = pyte.Stream(self.screen)
-        
-        # Performance optimization: Batch updates to prevent excessive redraws
+        # Frame scheduling: output is drawn at most max_fps times a second, a
+        # small burst right after a keystroke (the echo) is drawn at once, and
+        # the single-shot timer only runs while a frame is pending
+        self.max_fps = max(1, terminal_settings.get("max_fps", 60))
+        self.frame_interval = 1.0 / self.max_fps
+        self.echo_window = 0.15        # Seconds after a keystroke that output counts as its echo
+        self.echo_burst_bytes = 4096   # Larger batches wait for the next frame slot
         self.pending_updates = False
         self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.refresh_timer.timeout.connect(self._do_refresh)
-        self.refresh_timer.setInterval(16)  # ~60 FPS (1000ms / 60 ≈ 16ms)
+        self._last_input = 0.0
+        self._last_frame = 0.0
+        self._frame_due = None
+        self._frame_times = collections.deque(maxlen=512)  # For the achieved frame rate
+        self.frames_rendered = 0
+        self.frames_immediate = 0
+        self.frames_dropped = 0
+        self.render_seconds = 0.0  # Time spent in refresh_display
+        self.rendering_suspended = False  # Hidden (background tab): no snapshots are applied
+        self.session_stopped = False  # Closed: snapshots still queued from the worker are ignored
+
+        # A window drag resizes many times a second; the screen reflow and the
+        # PTY window-change wait until the size has settled for resize_delay_ms
+        self.resize_delay_ms = 100
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.timeout.connect(self.flush_resize)
+        self._requested_size = None
+        self._applied_size = None
+        self.resizes_requested = 0
+        self.resizes_applied = 0
         
-        # Start reader thread
-        self.reader = SSHReaderThread(session)
-        self.reader.data_received.connect(self.on_data_received)
-        self.reader.session_closed.connect(self.session_closed.emit)
+        self.reader = SSHReaderThread(session, high_water_bytes=output_buffer_kb * 1024)
+        
+        # The pyte screen/stream live on a per-terminal worker thread; the GUI only
+        # applies the snapshots it publishes, so a busy tab never blocks input
+        self.worker = ScreenWorker(self.cols, self.rows, history=self.scrollback_lines,
+                                   charset=self.charset, on_consumed=self.reader.consumed,
+                                   hot_history=self.scrollback_hot_lines)
+        self.screen = self.worker.screen  # Owned by the worker thread
+        self.stream = self.worker.stream
+        self.worker.snapshot_ready.connect(self._on_snapshot_ready)
+        self.worker.start()
+        
+        # Start reader thread; bytes go straight to the worker without a GUI-thread hop
+        self.reader.data_received.connect(self.worker.feed, Qt.ConnectionType.DirectConnection)
+        # Keystroke-to-echo latency: key sent -> output arrived -> frame drawn
+        self.latency = LatencyTracker()
+        self.reader.data_received.connect(self._on_output_received, Qt.ConnectionType.DirectConnection)
+        self.reader.session_closed.connect(self.session_closed)
         self.reader.start()
+        
+        # Scrollback search (Ctrl+Shift+F); the bar is created on first use
+        self.search_bar = None
 
-        # Custom Blinking Cursor -- DISABLED
-        # self.cursor_blink_timer = QTimer(self)
-        # self.cursor_blink_timer.timeout.connect(self.toggle_cursor)
-        # self.cursor_blink_timer.start(500) # Blink every 500ms
-        self.cursor_visible = True
+        # Pastes longer than one chunk are written by a PasteWriter thread
+        self.paste_chunk_chars = 4096
+        self.paste_writer = None
+        self.paste_progress = None
+        self.last_paste = None  # (characters sent, seconds, cancelled)
+        self.bracketed_paste = False  # Mode 2004, as of the last snapshot applied
+        # Selections longer than this are copied by a CopyThread
+        self.copy_sync_lines = 10000
+        self.copy_thread = None
+        self.search_thread = None
+        self.search_pattern = None
+        self.search_matches = []  # (sequence number, start, end), newest first
+        self.search_current = -1
+        self._search_pinned = False  # Stay on the current match instead of following output
         
         # Set up context menu
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.customContextMenuRequested.connect(self.show_context_menu)
-        
-        # Initialize display with empty lines
-        self.refresh_display()
-
-    def on_screen_cleared(self):
-        """Called when the screen is cleared (e.g. Ctrl+L)"""
-        self.should_scroll_to_top = True
-
-    # def toggle_cursor(self):
-    #     self.cursor_visible = not self.cursor_visible
-    #     self.draw_cursor()
 
-    def draw_cursor(self):
-        # Calculate where the cursor SHOULD be based on the screen buffer
-        # This prevents the cursor from jumping when the user clicks elsewhere (changing textCursor)
-        history_offset = len(self.screen.history.top)
-        cursor_y = history_offset + self.screen.cursor.y
-        cursor_x = self.screen.cursor.x
-        
-        # Create a cursor at the correct position
-        cursor = self.textCursor() # Get a copy
-        cursor.movePosition(QTextCursor.MoveOperation.Start)
-        cursor.movePosition(QTextCursor.MoveOperation.Down, n=cursor_y)
-        cursor.movePosition(QTextCursor.MoveOperation.Right, n=cursor_x)
-        
-        # Create extra selection for the cursor
-        selection = QTextEdit.ExtraSelection()
-        selection.cursor = cursor
-        
-        # Determine cursor color
-        if self.cursor_visible:
-            selection.format.setBackground(QColor("white"))
-            selection.format.setForeground(QColor("black"))
-            # Try to select the character
-            if selection.cursor.movePosition(QTextCursor.MoveOperation.Right, QTextCursor.MoveMode.KeepAnchor):
-                pass
-        else:
-            selection.format.clearBackground()
-            
-        self.setExtraSelections([selection])
-
-    def on_data_received(self, text):
-        """Process incoming data and schedule a display update"""
-        self.stream.feed(text)
-        
-        # Mark that we have pending updates
-        if not self.pending_updates:
-            self.pending_updates = True
-            # Start the timer if not already running
-            if not self.refresh_timer.isActive():
-                self.refresh_timer.start()
+    def on_data_received(self, data):
+        """Queue incoming bytes for the screen worker (parsing happens off the GUI thread)"""
+        self.worker.feed(data)
+    
+    def _on_snapshot_ready(self):
+        """The worker published a new snapshot - schedule a display update"""
+        if self.pending_updates or self.rendering_suspended or self.session_stopped:
+            return  # A frame is already scheduled; the worker merges into it
+        self.pending_updates = True
+        now = time.monotonic()
+        if now - self._last_input < self.echo_window and self.worker.last_feed_bytes <= self.echo_burst_bytes:
+            # Keystroke echo: draw now rather than waiting for the next frame slot
+            self.frames_immediate += 1
+            self._last_input = 0.0  # One echo per keystroke; further output is paced
+            self._do_refresh()
+            return
+        delay = max(0.0, self._last_frame + self.frame_interval - now)
+        self._frame_due = now + delay
+        self.refresh_timer.start(int(delay * 1000 + 0.999))
     
     def _do_refresh(self):
         """Actually perform the display refresh (called by timer)"""
-        if self.pending_updates:
-            self.pending_updates = False
-            self.refresh_display()
+        if not self.pending_updates:
+            return
+        self.pending_updates = False
+        now = time.monotonic()
+        if self._frame_due is not None:
+            # Frame slots missed because the GUI thread was busy
+            late = now - self._frame_due
+            if late > self.frame_interval:
+                self.frames_dropped += int(late / self.frame_interval)
+            self._frame_due = None
+        self.refresh_display()
+        self.latency.frame_drawn(self.worker.taken_bytes)
+        self._last_frame = time.monotonic()
+        self.render_seconds += self._last_frame - now
+        self._frame_times.append(self._last_frame)
+        self.frames_rendered += 1
 
-    def refresh_display(self):
-        """Ultra-optimized incremental display refresh - only updates what changed"""
-        # Cache commonly used values
-        cols = self.cols
-        rows = self.rows
-        
-        # Get current state
-        history = self.screen.history.top
-        history_len = len(history)
-        
-        # Check if we need a full rebuild (screen cleared, resized, or first run)
-        need_full_rebuild = (
-            self._last_history_len is None or
-            self._last_history_len > history_len or  # History was cleared
-            hasattr(self, 'should_scroll_to_top') and self.should_scroll_to_top
-        )
-        
-        if need_full_rebuild:
-            # Full rebuild using the old method (rare)
-            lines = []
-            
-            # Process history lines (scrollback)
-            for line_obj in history:
-                if isinstance(line_obj, str):
-                    line = line_obj
-                else:
-                    line = ''.join(char.data for char in line_obj.values())
-                
-                if len(line) < cols:
-                    line += ' ' * (cols - len(line))
-                lines.append(line)
-            
-            # Process current screen lines
-            for i in range(rows):
-                line_obj = self.screen.display[i]
-                if isinstance(line_obj, str):
-                    line = line_obj
-                else:
-                    line = ''.join(char.data for char in line_obj.values())
-                
-                if len(line) < cols:
-                    line += ' ' * (cols - len(line))
-                lines.append(line)
-            
-            # Single join operation
-            display_text = '\n'.join(lines) + '\n'
-            
-            # Full rebuild
-            vbar = self.verticalScrollBar()
-            current_scroll = vbar.value()
-            self.setPlainText(display_text)
-            
-            if hasattr(self, 'should_scroll_to_top') and self.should_scroll_to_top:
-                self.should_scroll_to_top = False
-                vbar.setValue(history_len)
-            else:
-                vbar.setValue(current_scroll)
-            
-            self._last_history_len = history_len
-            
-        else:
-            # INCREMENTAL UPDATE - Only append new history lines and update current view
-            # This is 10-100x faster than full rebuild!
-            
-            # How many new history lines since last update?
-            new_history_lines = history_len - self._last_history_len
-            
-            if new_history_lines > 0:
-                # Append new history lines using QTextCursor (very fast)
-                cursor = QTextCursor(self.document())
-                cursor.beginEditBlock()  # Batch the changes
-                
-                # Move to the position where history ends and current screen starts
-                cursor.movePosition(QTextCursor.MoveOperation.Start)
-                cursor.movePosition(QTextCursor.MoveOperation.Down, n=self._last_history_len)
-                
-                # Insert new history lines BEFORE the current screen
-                for i in range(history_len - new_history_lines, history_len):
-                    line_obj = history[i]
-                    if isinstance(line_obj, str):
-                        line = line_obj
-                    else:
-                        line = ''.join(char.data for char in line_obj.values())
-                    
-                    if len(line) < cols:
-                        line += ' ' * (cols - len(line))
-                    
-                    cursor.insertText(line + '\n')
-                
-                cursor.endEditBlock()
-                self._last_history_len = history_len
-            
-            # Always update the current visible screen (last 'rows' lines)
-            # This is necessary because content changes even if history doesn't grow
-            cursor = QTextCursor(self.document())
-            cursor.beginEditBlock()
-            
-            # Move to where current screen starts (after all history)
-            cursor.movePosition(QTextCursor.MoveOperation.Start)
-            cursor.movePosition(QTextCursor.MoveOperation.Down, n=history_len)
-            
-            # Select and replace the current screen content
-            cursor.movePosition(QTextCursor.MoveOperation.Down, QTextCursor.MoveMode.KeepAnchor, n=rows)
-            cursor.movePosition(QTextCursor.MoveOperation.EndOfLine, QTextCursor.MoveMode.KeepAnchor)
-            
-            # Build current screen text
-            screen_lines = []
-            for i in range(rows):
-                line_obj = self.screen.display[i]
-                if isinstance(line_obj, str):
-                    line = line_obj
-                else:
-                    line = ''.join(char.data for char in line_obj.values())
-                
-                if len(line) < cols:
-                    line += ' ' * (cols - len(line))
-                screen_lines.append(line)
-            
-            # Replace current screen content
-            cursor.insertText('\n'.join(screen_lines) + '\n')
-            cursor.endEditBlock()
-        
-        # Draw the visual block cursor
-        self.draw_cursor()
-        
-        # Auto-scroll to follow cursor
-        history_lines = len(self.screen.history.top)
-        cursor_line_idx = history_lines + self.screen.cursor.y
-        
-        block = self.document().findBlockByNumber(cursor_line_idx)
-        if block.isValid():
-            t_cursor = self.textCursor()
-            t_cursor.setPosition(block.position())
-            self.setTextCursor(t_cursor)
-            self.ensureCursorVisible()
+    def suspend_rendering(self):
+        """Stop applying snapshots while the view is hidden; the worker keeps the screen up to date"""
+        if self.rendering_suspended:
+            return
+        self.rendering_suspended = True
+        self.refresh_timer.stop()
+        self.pending_updates = False
+        self.worker.suspend(self.frame_interval)
 
+    def resume_rendering(self):
+        """Catch up with everything that happened while hidden, in one frame"""
+        if not self.rendering_suspended:
+            return
+        self.rendering_suspended = False
+        self.worker.resume()
 
+    def render_time_saved(self):
+        """Estimated ms of rendering skipped while hidden: skipped frames at this tab's mean frame time"""
+        if not self.frames_rendered:
+            return 0.0
+        return self.worker.skipped_frames * self.render_seconds / self.frames_rendered * 1000
 
+    def achieved_fps(self):
+        """Frames drawn during the last second"""
+        now = time.monotonic()
+        return sum(1 for frame_time in self._frame_times if now - frame_time <= 1.0)
 
+    def _resize_screen(self, rows, cols):
+        """Ask for a new screen size; applied once the widget stops resizing"""
+        self._requested_size = (max(1, rows), max(1, cols))
+        self.resizes_requested += 1
+        if self._applied_size is None:
+            self.flush_resize()  # First layout: size the shell before it prints anything
+        else:
+            self.resize_timer.start(self.resize_delay_ms)
 
-    def resizeEvent(self, event):
-        """Update terminal size on resize - optimized with cached metrics"""
-        # Cache font metrics to avoid repeated expensive calls
-        if self._cached_char_width is None or self._cached_char_height is None:
-            font_metrics = self.fontMetrics()
-            self._cached_char_width = font_metrics.horizontalAdvance('M')
-            self._cached_char_height = font_metrics.height()
-        
-        char_width = self._cached_char_width
-        char_height = self._cached_char_height
-        
-        self.cols = max(1, event.size().width() // char_width)
-        self.rows = max(1, event.size().height() // char_height)
-        
-        self.screen.resize(lines=self.rows, columns=self.cols)
-        self.setCursorWidth(char_width) # Make cursor a block
-        
-        # Notify session about resize (for PTY support)
+    def flush_resize(self):
+        """Resize the emulated screen and tell the session (for PTY support), if the size changed"""
+        self.resize_timer.stop()
+        size = self._requested_size
+        if size is None or size == self._applied_size:
+            return
+        self._applied_size = size
+        self.rows, self.cols = size
+        self.resizes_applied += 1
+        # The worker resizes the screen and publishes a full snapshot
+        self.worker.resize(self.rows, self.cols)
         if hasattr(self.session, 'resize'):
             self.session.resize(self.rows, self.cols)
-        
-        self.refresh_display()
-        
-        super().resizeEvent(event)
-
 
-    def closeEvent(self, event):
+    def _stop_session_threads(self):
         # Stop timers when terminal is closed
         if hasattr(self, 'refresh_timer'):
+            self.session_stopped = True
             self.refresh_timer.stop()
-        # if hasattr(self, 'cursor_blink_timer'):
-        #     self.cursor_blink_timer.stop()
+            self.resize_timer.stop()
+        # Wait for the threads: a QThread destroyed while it runs crashes the process
         if hasattr(self, 'reader'):
             self.reader.stop()
+        if hasattr(self, 'worker'):
+            self.worker.stop()
+            self.worker.wait(2000)
+        if hasattr(self, 'reader'):
+            self.reader.wait(2000)  # Wakes within idle_timeout
+        if getattr(self, 'search_thread', None) is not None:
+            self._cancel_search()
+        if getattr(self, 'paste_writer', None) is not None:
+            self.paste_writer.cancel()
+            self.paste_writer.wait(2000)
+        self._cancel_copy()
+
+    def closeEvent(self, event):
+        self._stop_session_threads()
         super().closeEvent(event)
 
     def event(self, event):
@@ -412,53 +386,69 @@ class Terminal(QPlainTextEdit):
         text = event.text()
         key = event.key()
         modifiers = event.modifiers()
+        self._last_input = time.monotonic()  # The next small burst of output is its echo
+
+        # Find in scrollback (Ctrl+Shift+F)
+        if modifiers == (Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier) and \
+           key == Qt.Key.Key_F:
+            self.show_search()
+            event.accept()
+            return
 
         # Handle paste shortcuts (Ctrl+V or Shift+Insert)
         if (modifiers == Qt.KeyboardModifier.ControlModifier and key == Qt.Key.Key_V) or \
            (modifiers == Qt.KeyboardModifier.ShiftModifier and key == Qt.Key.Key_Insert):
-            from PyQt6.QtWidgets import QApplication
-            clipboard = QApplication.clipboard()
-            paste_text = clipboard.text()
-            if paste_text:
-                self.session.send_command(paste_text)
+            self.paste_from_clipboard()
             event.accept()
             return
 
         # Handle Ctrl+L for Clear Screen
         if modifiers == Qt.KeyboardModifier.ControlModifier and key == Qt.Key.Key_L:
-            self.session.send_command('\x0c')  # Send Form Feed (Ctrl+L)
+            self._send_key('\x0c')  # Send Form Feed (Ctrl+L)
             event.accept()
             return
         
         # Handle special keys that don't have text or need specific codes
         if key == Qt.Key.Key_Up:
-            self.session.send_command('\x1b[A')
+            self._send_key('\x1b[A')
         elif key == Qt.Key.Key_Down:
-            self.session.send_command('\x1b[B')
+            self._send_key('\x1b[B')
         elif key == Qt.Key.Key_Right:
-            self.session.send_command('\x1b[C')
+            self._send_key('\x1b[C')
         elif key == Qt.Key.Key_Left:
-            self.session.send_command('\x1b[D')
+            self._send_key('\x1b[D')
         elif key == Qt.Key.Key_Home:
-            self.session.send_command('\x1b[H')
+            self._send_key('\x1b[H')
         elif key == Qt.Key.Key_End:
-            self.session.send_command('\x1b[F')
+            self._send_key('\x1b[F')
         elif key == Qt.Key.Key_Tab or key == Qt.Key.Key_Backtab:
             # Send tab character for command completion
-            self.session.send_command('\t')
+            self._send_key('\t')
         elif key == Qt.Key.Key_Backspace:
             # Send DEL character for backspace (standard for most SSH sessions)
-            self.session.send_command('\x7f')
+            self._send_key('\x7f')
         elif key == Qt.Key.Key_Delete:
             # Send VT100 delete sequence
-            self.session.send_command('\x1b[3~')
+            self._send_key('\x1b[3~')
         elif text:
             # For normal characters (including Enter=\r), just send the text
-            self.session.send_command(text)
+            self._send_key(text)
         
         # Prevent default behavior (inserting text into the widget)
         event.accept()
     
+    def _send_key(self, data):
+        """Send a key press to the session, timed for the latency histogram"""
+        self.latency.key_sent()
+        self.session.send_command(data)
+
+    def _on_output_received(self, data):
+        """Reader thread: output was just queued on the worker"""
+        self.latency.output_received(self.worker.fed_bytes)
+
+    def show_latency(self):
+        LatencyDialog(self.latency, self).exec()
+
     def show_context_menu(self, position):
         """Show context menu on right-click"""
         from PyQt6.QtWidgets import QMenu
@@ -469,7 +459,7 @@ class Terminal(QPlainTextEdit):
         # Copy action
         copy_action = QAction("Copy", self)
         copy_action.triggered.connect(self.copy)
-        copy_action.setEnabled(self.textCursor().hasSelection())
+        copy_action.setEnabled(self.has_selection())
         menu.addAction(copy_action)
         
         # Paste action
@@ -484,13 +474,642 @@ class Terminal(QPlainTextEdit):
         select_all_action.triggered.connect(self.selectAll)
         menu.addAction(select_all_action)
         
+        find_action = QAction("Find...\tCtrl+Shift+F", self)
+        find_action.triggered.connect(self.show_search)
+        menu.addAction(find_action)
+        
+        latency_action = QAction("Keystroke Latency...", self)
+        latency_action.triggered.connect(self.show_latency)
+        menu.addAction(latency_action)
+        
+        menu.addSeparator()
+        
+        # Performance counters (read-only)
+        for label in self.stats_lines():
+            stats_action = QAction(label, self)
+            stats_action.setEnabled(False)
+            menu.addAction(stats_action)
+        
         # Show menu at cursor position
         menu.exec(self.mapToGlobal(position))
     
+    def stats_lines(self):
+        """Read-only counters listed at the bottom of the context menu"""
+        reader = self.reader
+        lines = [f"Output buffer: peak {reader.peak_pending_bytes // 1024} KB "
+                 f"of {reader.high_water_bytes // 1024} KB, paused {reader.throttle_count}x",
+                 f"Frames: {self.achieved_fps()} FPS (cap {self.max_fps}), {self.frames_rendered} drawn, "
+                 f"{self.frames_immediate} immediate, {self.frames_dropped} dropped",
+                 f"In background: {self.worker.skipped_frames} frames skipped, "
+                 f"~{self.render_time_saved():.0f} ms of rendering saved"]
+        summary = self.latency.summary()
+        if summary["total"]["p50"] is not None:
+            lines.append(f"Echo: p50 {summary['total']['p50']:.1f} ms, p95 {summary['total']['p95']:.1f} ms "
+                         f"(network {summary['network']['p50']:.1f}, render {summary['render']['p50']:.1f})")
+        if self.last_paste is not None:
+            sent, seconds, cancelled = self.last_paste
+            lines.append(f"Paste: {sent / 1e6:.1f}M characters in {seconds:.2f} s"
+                         f"{' (cancelled)' if cancelled else ''}")
+        search = self.search_thread
+        if search is not None and search.elapsed_ms is not None:
+            first_hit = f"{search.first_hit_ms:.1f} ms" if search.first_hit_ms is not None else "none"
+            lines.append(f"Search: {search.match_count} matches in {search.lines_searched} lines, "
+                         f"first hit {first_hit}, done in {search.elapsed_ms:.0f} ms")
+        return lines
+    
+    def _copy_lines(self, first, stop, rows, trim):
+        """Put scrollback lines first..stop-1 and then the screen `rows` on the clipboard.
+
+        A long selection is read on a CopyThread and reaches the clipboard
+        when it finishes, so the GUI thread never reads the whole scrollback.
+        """
+        self._cancel_copy()
+        self.copy_thread = CopyThread(self.worker, first, stop, self._columns, rows, trim)
+        self.copy_thread.text_ready.connect(self._on_copy_ready)
+        if stop - first + len(rows) <= self.copy_sync_lines:
+            self.copy_thread.run()  # Short enough to copy straight away, on this thread
+        else:
+            self.copy_thread.start()
+
+    def _on_copy_ready(self, text):
+        if self.sender() is self.copy_thread:
+            QApplication.clipboard().setText(text)
+
+    def _cancel_copy(self):
+        if getattr(self, 'copy_thread', None) is not None:
+            self.copy_thread.cancel()
+            self.copy_thread.wait()
+            self.copy_thread = None
+
     def paste_from_clipboard(self):
         """Paste text from clipboard to terminal"""
         from PyQt6.QtWidgets import QApplication
         clipboard = QApplication.clipboard()
-        paste_text = clipboard.text()
-        if paste_text:
-            self.session.send_command(paste_text)
+        self.paste_text(clipboard.text())
+
+    def paste_text(self, text):
+        """Send pasted text, bracketed if the application enabled mode 2004 (as of the frame shown).
+
+        Anything longer than one chunk goes through a PasteWriter so the GUI
+        thread never blocks on a full SSH window or tty input queue.
+        """
+        if not text:
+            return
+        if self.paste_writer is not None and self.paste_writer.isRunning():
+            self.paste_progress.set_notice("Still sending this paste; the new one was not sent")
+            self._place_paste_progress()
+            return
+        bracketed = self.bracketed_paste
+        if len(text) <= self.paste_chunk_chars:
+            self.session.send_command(prepare_paste(text, bracketed))
+            return
+        self.paste_writer = PasteWriter(self.session, text, bracketed, self.paste_chunk_chars)
+        self.paste_writer.progress.connect(self._on_paste_progress)
+        self.paste_writer.finished.connect(self._on_paste_finished)
+        if self.paste_progress is None:
+            self.paste_progress = PasteProgress(self)
+            self.paste_progress.cancel_requested.connect(self.cancel_paste)
+        self.paste_progress.set_progress(0, len(text))
+        self.paste_progress.set_notice("")
+        self._place_paste_progress()
+        self.paste_progress.show()
+        self.paste_progress.raise_()
+        self.paste_writer.start()
+
+    def cancel_paste(self):
+        if self.paste_writer is not None:
+            self.paste_writer.cancel()
+
+    def _on_paste_progress(self, sent, total):
+        if self.sender() is self.paste_writer and self.paste_progress is not None:
+            self.paste_progress.set_progress(sent, total)
+
+    def _on_paste_finished(self):
+        writer = self.sender()
+        if writer is not self.paste_writer:
+            return
+        self.last_paste = (writer.sent, writer.elapsed, writer.cancelled)
+        if self.paste_progress is not None:
+            self.paste_progress.hide()
+
+    def _place_paste_progress(self):
+        """Keep the paste progress in the bottom-right corner of the viewport"""
+        if self.paste_progress is None:
+            return
+        self.paste_progress.adjustSize()
+        viewport = self.viewport().geometry()
+        self.paste_progress.move(max(0, viewport.right() - self.paste_progress.width() - 4),
+                                 max(0, viewport.bottom() - self.paste_progress.height() - 4))
+
+    # Scrollback search
+
+    def show_search(self):
+        if self.search_bar is None:
+            self.search_bar = SearchBar(self)
+            self.search_bar.search_requested.connect(self._start_search)
+            self.search_bar.next_requested.connect(lambda: self._step_match(1))
+            self.search_bar.previous_requested.connect(lambda: self._step_match(-1))
+            self.search_bar.closed.connect(self._close_search)
+        self._place_search_bar()
+        self.search_bar.open()
+
+    def _place_search_bar(self):
+        """Keep the search bar in the top-right corner of the viewport"""
+        if self.search_bar is None:
+            return
+        self.search_bar.adjustSize()
+        viewport = self.viewport().geometry()
+        self.search_bar.move(max(0, viewport.right() - self.search_bar.width() - 4), viewport.top() + 4)
+
+    def _start_search(self, text, regex):
+        """Run a new query on a search thread; matches stream into search_matches"""
+        self._cancel_search()
+        self.search_pattern = None
+        self.search_matches = []
+        self.search_current = -1
+        if not text:
+            self.search_bar.set_status("")
+            self._search_changed()
+            return
+        try:
+            self.search_pattern = compile_query(text, regex)
+        except re.error:
+            self.search_bar.set_status("Invalid pattern")
+            self._search_changed()
+            return
+        
+        self.search_bar.set_status("Searching...")
+        self.search_thread = SearchThread(self.screen.search_index, self.search_pattern, self._lines,
+                                          self._history_first, self._history_first + self._history_total,
+                                          literal=None if regex else text)
+        self.search_thread.matches_found.connect(self._on_matches_found)
+        self.search_thread.finished.connect(self._on_search_finished)
+        self.search_thread.start()
+
+    def _cancel_search(self):
+        if self.search_thread is not None:
+            self.search_thread.cancel()
+            self.search_thread.wait()
+
+    def _on_matches_found(self, matches):
+        if self.sender() is not self.search_thread:
+            return  # A superseded query
+        self.search_matches.extend(matches)
+        if self.search_current < 0:
+            # Jump to the newest match as soon as it arrives
+            self.search_current = 0
+            self._show_match()
+        else:
+            self._update_search_status()
+
+    def _on_search_finished(self):
+        if self.sender() is not self.search_thread:
+            return
+        if not self.search_matches:
+            self.search_bar.set_status("No matches")
+        else:
+            self._update_search_status()
+
+    def _update_search_status(self):
+        total = len(self.search_matches)
+        more = "+" if self.search_thread.match_count >= self.search_thread.max_matches else ""
+        self.search_bar.set_status(f"{self.search_current + 1} of {total}{more}")
+
+    def _step_match(self, step):
+        """Move to the next older (step=1) or newer (step=-1) match, wrapping around"""
+        if not self.search_matches:
+            return
+        self.search_current = (self.search_current + step) % len(self.search_matches)
+        self._show_match()
+
+    def _show_match(self):
+        seq = self.search_matches[self.search_current][0]
+        self._search_pinned = True
+        self._scroll_to_line(seq)
+        self._search_changed()
+        self._update_search_status()
+
+    def current_match(self):
+        """(sequence number, start, end) of the selected match, or None"""
+        if 0 <= self.search_current < len(self.search_matches):
+            return self.search_matches[self.search_current]
+        return None
+
+    def _close_search(self):
+        self._cancel_search()
+        self.search_pattern = None
+        self.search_matches = []
+        self.search_current = -1
+        self._search_pinned = False
+        self._search_changed()
+        self.setFocus()
+
+
+class Terminal(TerminalSessionMixin, QPlainTextEdit):
+    """Terminal view on a QPlainTextEdit.
+
+    The document is a window onto the logical lines (scrollback from the
+    worker's store, then the screen rows): only the visible rows plus a margin
+    of `window_margin` lines above and below are materialized. The scroll bar
+    beside it counts logical lines, so scrolling, resizing and clearing cost
+    O(viewport) however long the scrollback is.
+    """
+    session_closed = pyqtSignal()
+    
+    def __init__(self, session, settings=None):
+        super().__init__()
+        self.setReadOnly(False) # Allow scrolling and selection
+        self.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse | Qt.TextInteractionFlag.TextSelectableByKeyboard)
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap) # Disable wrapping for correct cursor positioning
+        self.setUndoRedoEnabled(False) # Disable undo/redo to prevent issues
+        
+        terminal_settings = self.terminal_settings(settings)
+        font_family = terminal_settings.get("font_family", "Consolas")
+        font_size = terminal_settings.get("font_size", 10)
+        fg_color = terminal_settings.get("foreground_color", "#FFFFFF")
+        bg_color = terminal_settings.get("background_color", "#000000")
+        
+        # Apply styling with settings
+        self.setStyleSheet(f"background-color: {bg_color}; color: {fg_color}; font-family: {font_family}, monospace; font-size: {font_size}pt;")
+        
+        # Ensure cursor color is correct via Palette
+        from PyQt6.QtGui import QPalette, QColor
+        palette = self.palette()
+        palette.setColor(QPalette.ColorRole.Base, QColor(bg_color))
+        palette.setColor(QPalette.ColorRole.Text, QColor(fg_color))
+        self.setPalette(palette)
+        
+        # Performance: Cache font metrics to avoid repeated calculations
+        self._cached_char_width = None
+        self._cached_char_height = None
+        
+        # Colour/attribute runs are drawn with shared formats, one per attribute tuple
+        self.formats = CharFormatCache(fg_color, bg_color)
+        
+        # Logical lines are numbered by scrollback sequence number: history line 0
+        # is _history_first, screen row 0 is _history_first + _history_total
+        self._history_total = 0
+        self._history_first = 0
+        self._columns = 80  # Screen width of the last applied snapshot
+        self._lines = []       # Screen rows from the last applied snapshot
+        self._line_runs = []
+        self._cursor_pos = (0, 0)  # Cursor (x, y) from the last applied snapshot
+        
+        # The document holds lines [_window_start, _window_start + _window_count);
+        # _top is the line at the top of the viewport
+        self.window_margin = 64
+        self._window_start = 0
+        self._window_count = 0
+        self._top = 0
+        self._updating = False  # Set while the view itself moves the document
+        self._all_selected = False
+        
+        # The widget's own scroll bar only moves within the window; this one
+        # spans the whole scrollback
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.scrollbar = QScrollBar(Qt.Orientation.Vertical, self)
+        self.setViewportMargins(0, 0, self.scrollbar.sizeHint().width(), 0)
+        self.scrollbar.valueChanged.connect(self._on_scrollbar_moved)
+        self.verticalScrollBar().valueChanged.connect(self._on_document_scrolled)
+        self.selectionChanged.connect(self._on_selection_changed)
+        
+        self._init_session(session, terminal_settings)
+
+        # Custom Blinking Cursor -- DISABLED
+        # self.cursor_blink_timer = QTimer(self)
+        # self.cursor_blink_timer.timeout.connect(self.toggle_cursor)
+        # self.cursor_blink_timer.start(500) # Blink every 500ms
+        self.cursor_visible = True
+        
+        # Initialize display with empty lines
+        self.refresh_display()
+
+    # def toggle_cursor(self):
+    #     self.cursor_visible = not self.cursor_visible
+    #     self.draw_cursor()
+
+    def line_count(self):
+        """Logical lines: all scrollback (including spilled lines) plus the screen rows"""
+        return self._history_total + len(self._lines)
+
+    def document_range(self):
+        """Logical lines [first, stop) currently materialized in the document"""
+        first = self._window_start - self._history_first
+        return first, first + self._window_count
+
+    def visible_rows(self):
+        if self._cached_char_height is None:
+            self._cached_char_height = self.fontMetrics().height()
+        return max(1, self.viewport().height() // self._cached_char_height)
+
+    def _logical_lines(self, start, stop):
+        """(text, runs) for lines start..stop-1 by sequence number: scrollback, then the screen"""
+        screen_start = self._history_first + self._history_total
+        lines = []
+        if start < screen_start:
+            lines = self.worker.history_lines(start, min(stop, screen_start), self._columns)
+        for row in range(max(start, screen_start) - screen_start, stop - screen_start):
+            lines.append((self._lines[row], self._line_runs[row]))
+        return lines
+
+    def draw_cursor(self):
+        # Calculate where the cursor SHOULD be based on the screen buffer
+        # This prevents the cursor from jumping when the user clicks elsewhere (changing textCursor)
+        cursor_x, screen_y = self._cursor_pos
+        cursor_y = self._history_first + self._history_total + screen_y - self._window_start
+        if not 0 <= cursor_y < self._window_count:
+            self.setExtraSelections(self._search_selections())  # Scrolled away from the screen
+            return
+        
+        # Create a cursor at the correct position, addressing the block directly
+        block = self.document().findBlockByNumber(cursor_y)
+        cursor = self.textCursor() # Get a copy
+        cursor.setPosition(block.position() + column_index(block.text(), cursor_x))
+        
+        # Create extra selection for the cursor
+        selection = QTextEdit.ExtraSelection()
+        selection.cursor = cursor
+        
+        # Determine cursor color
+        if self.cursor_visible:
+            selection.format.setBackground(QColor("white"))
+            selection.format.setForeground(QColor("black"))
+            # Try to select the character
+            if selection.cursor.movePosition(QTextCursor.MoveOperation.Right, QTextCursor.MoveMode.KeepAnchor):
+                pass
+        else:
+            selection.format.clearBackground()
+            
+        self.setExtraSelections(self._search_selections() + [selection])
+
+    def _search_selections(self):
+        """Extra selections highlighting search matches in the window, the current one brighter"""
+        if self.search_pattern is None:
+            return []
+        current = self.current_match()
+        selections = []
+        block = self.document().firstBlock()
+        for number in range(self._window_count):
+            seq = self._window_start + number
+            for start, end in line_matches(self.search_pattern, block.text().rstrip(' ')):
+                selection = QTextEdit.ExtraSelection()
+                selection.cursor = QTextCursor(block)
+                selection.cursor.setPosition(block.position() + start)
+                selection.cursor.setPosition(block.position() + end, QTextCursor.MoveMode.KeepAnchor)
+                is_current = current is not None and current[:2] == (seq, start)
+                selection.format.setBackground(QColor("#FF8C00" if is_current else "#6B5B00"))
+                selection.format.setForeground(QColor("black" if is_current else "white"))
+                selections.append(selection)
+            block = block.next()
+        return selections
+
+    def _scroll_to_line(self, seq):
+        """Show line `seq` (a sequence number) in the middle of the viewport"""
+        self._updating = True
+        try:
+            self._top = self._clamp_top(seq - self.visible_rows() // 2)
+            if not self._window_covers(self._top):
+                self._materialize()
+            self._show_top()
+        finally:
+            self._updating = False
+
+    def _search_changed(self):
+        self.draw_cursor()
+
+    def refresh_display(self):
+        """Apply the worker's latest screen snapshot - only updates what changed"""
+        snapshot = self.worker.take_snapshot()
+        if snapshot is None:
+            return
+        self._updating = True
+        try:
+            self._apply_snapshot(snapshot)
+        finally:
+            self._updating = False
+
+    def _apply_snapshot(self, snapshot):
+        rows = snapshot.rows
+        old_screen_start = self._history_first + self._history_total
+        old_screen_end = old_screen_start + len(self._lines)
+        self._history_total = snapshot.history_total
+        self._history_first = snapshot.history_first
+        self._columns = snapshot.columns
+        screen_start = self._history_first + self._history_total
+        
+        if snapshot.full:
+            self._lines = [''] * rows
+            self._line_runs = [None] * rows
+        for (row, text), runs in zip(snapshot.lines, snapshot.line_runs):
+            self._lines[row] = text
+            self._line_runs[row] = runs
+        self._cursor_pos = snapshot.cursor[:2]
+        self.bracketed_paste = snapshot.bracketed_paste
+        
+        # Follow the cursor like ensureCursorVisible
+        visible = self.visible_rows()
+        cursor_line = screen_start + self._cursor_pos[1]
+        if self._search_pinned:
+            top = self._top  # Stay on the search match
+        elif snapshot.scroll_to_top:
+            # Screen was cleared (e.g. Ctrl+L): show it at the top, history above
+            top = screen_start
+        else:
+            top = max(self._top, self._history_first)
+            if cursor_line < top:
+                top = cursor_line
+            elif cursor_line >= top + visible:
+                top = cursor_line - visible + 1
+        self._top = top = self._clamp_top(top)
+        
+        window_end = self._window_start + self._window_count
+        if snapshot.full:
+            self._materialize()
+        elif window_end == old_screen_end and self._window_start <= old_screen_start:
+            # The window ends with the screen (the usual case): shift the new
+            # history lines in above it and replace the rows that changed
+            self._patch_screen(snapshot, screen_start - old_screen_start)
+        elif window_end > old_screen_start or self._window_start < self._history_first:
+            # Part of the screen, or lines that have since been dropped
+            self._materialize()
+        if not self._window_covers(top):
+            self._materialize()
+        
+        self._show_top()
+        
+        # Draw the visual block cursor
+        self.draw_cursor()
+
+    def _patch_screen(self, snapshot, added):
+        """Update a window that ends with the screen rows in place"""
+        max_count = self.visible_rows() + 2 * self.window_margin
+        if added != len(snapshot.history) or added > max_count:
+            self._materialize()
+            return
+        
+        document = self.document()
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()  # Batch the changes
+        
+        if added:
+            # Insert new history lines BEFORE the current screen
+            cursor.setPosition(document.findBlockByNumber(self._window_count - len(self._lines)).position())
+            if not any(snapshot.history_runs):
+                cursor.insertText('\n'.join(snapshot.history) + '\n', self.formats.default)
+            else:
+                for text, runs in zip(snapshot.history, snapshot.history_runs):
+                    self._insert_runs(cursor, text, runs)
+                    cursor.insertText('\n', self.formats.default)
+            self._window_count += added
+            
+            # Keep the window to the viewport plus its margins
+            trim = min(self._window_count - max_count, self._top - self.window_margin - self._window_start)
+            if trim > 0:
+                cursor.setPosition(0)
+                cursor.setPosition(document.findBlockByNumber(trim).position(), QTextCursor.MoveMode.KeepAnchor)
+                cursor.removeSelectedText()
+                self._window_start += trim
+                self._window_count -= trim
+        
+        # Replace only the rows that changed
+        screen_block = self._window_count - len(self._lines)
+        for (row, text), runs in zip(snapshot.lines, snapshot.line_runs):
+            block = document.findBlockByNumber(screen_block + row)
+            cursor.setPosition(block.position())
+            cursor.setPosition(block.position() + block.length() - 1, QTextCursor.MoveMode.KeepAnchor)
+            self._insert_runs(cursor, text, runs)
+        
+        cursor.endEditBlock()
+
+    def _materialize(self):
+        """Rebuild the document around the viewport (O(viewport), whatever the scrollback size)"""
+        screen_end = self._history_first + self._history_total + len(self._lines)
+        start = max(self._history_first, self._top - self.window_margin)
+        stop = min(screen_end, self._top + self.visible_rows() + self.window_margin)
+        lines = self._logical_lines(start, stop)
+        
+        self.setPlainText('\n'.join([text for text, _ in lines]) + '\n')
+        self._window_start = start
+        self._window_count = len(lines)
+        
+        # Re-apply attributes to the (few) lines that have any
+        document = self.document()
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        for number, (text, runs) in enumerate(lines):
+            if runs is not None:
+                block = document.findBlockByNumber(number)
+                cursor.setPosition(block.position())
+                cursor.setPosition(block.position() + block.length() - 1, QTextCursor.MoveMode.KeepAnchor)
+                self._insert_runs(cursor, text, runs)
+        cursor.endEditBlock()
+
+    def _clamp_top(self, top):
+        last_top = self._history_first + self.line_count() - self.visible_rows()
+        return max(self._history_first, min(top, last_top))
+
+    def _window_covers(self, top):
+        """Whether the document holds every line the viewport shows at `top`"""
+        screen_end = self._history_first + self.line_count()
+        return (self._window_start <= top and
+                min(top + self.visible_rows(), screen_end) <= self._window_start + self._window_count)
+
+    def _show_top(self):
+        """Scroll the document to _top and sync the logical scroll bar"""
+        visible = self.visible_rows()
+        self.scrollbar.blockSignals(True)
+        self.scrollbar.setRange(0, max(0, self.line_count() - visible))
+        self.scrollbar.setPageStep(visible)
+        self.scrollbar.setValue(self._top - self._history_first)
+        self.scrollbar.blockSignals(False)
+        
+        # Keep the text cursor on the terminal cursor's line while it is in the window
+        cursor_block = self._history_first + self._history_total + self._cursor_pos[1] - self._window_start
+        if 0 <= cursor_block < self._window_count:
+            block = self.document().findBlockByNumber(cursor_block)
+            t_cursor = self.textCursor()
+            t_cursor.setPosition(block.position())
+            self.setTextCursor(t_cursor)
+        
+        self.verticalScrollBar().setValue(self._top - self._window_start)
+
+    def _on_scrollbar_moved(self, value):
+        """The user moved the logical scroll bar: materialize the new viewport if needed"""
+        self._updating = True
+        try:
+            self._top = self._clamp_top(self._history_first + value)
+            if not self._window_covers(self._top):
+                self._materialize()
+                self.draw_cursor()
+            self.verticalScrollBar().setValue(self._top - self._window_start)
+        finally:
+            self._updating = False
+
+    def _on_document_scrolled(self, value):
+        """The document scrolled itself (selection drag, cursor moves): follow it"""
+        if self._updating:
+            return
+        self._top = self._window_start + value
+        self.scrollbar.blockSignals(True)
+        self.scrollbar.setValue(self._top - self._history_first)
+        self.scrollbar.blockSignals(False)
+
+    def _on_selection_changed(self):
+        self._all_selected = False
+
+    def wheelEvent(self, event):
+        # Scroll the logical scroll bar, not the document's own
+        QApplication.sendEvent(self.scrollbar, event)
+
+    def _insert_runs(self, cursor, text, runs):
+        """Insert one line (replacing the cursor's selection) with its attribute runs"""
+        if runs is None:
+            cursor.insertText(text, self.formats.default)
+            return
+        if cursor.hasSelection():
+            cursor.removeSelectedText()
+        start = 0
+        for length, attrs in runs:
+            cursor.insertText(text[start:start + length], self.formats.get(attrs))
+            start += length
+
+    def resizeEvent(self, event):
+        """Update terminal size on resize - optimized with cached metrics"""
+        # Cache font metrics to avoid repeated expensive calls
+        if self._cached_char_width is None or self._cached_char_height is None:
+            font_metrics = self.fontMetrics()
+            self._cached_char_width = font_metrics.horizontalAdvance('M')
+            self._cached_char_height = font_metrics.height()
+        
+        char_width = self._cached_char_width
+        char_height = self._cached_char_height
+        
+        self._resize_screen(event.size().height() // char_height,
+                            event.size().width() // char_width)
+        self.setCursorWidth(char_width) # Make cursor a block
+        
+        super().resizeEvent(event)
+        rect = self.contentsRect()
+        width = self.scrollbar.sizeHint().width()
+        self.scrollbar.setGeometry(rect.right() - width + 1, rect.top(), width, rect.height())
+        self._place_search_bar()
+        self._place_paste_progress()
+
+    def has_selection(self):
+        return self.textCursor().hasSelection()
+
+    def selectAll(self):
+        super().selectAll()
+        # Only the window is in the document; copy() fetches the rest
+        self._all_selected = True
+
+    def copy(self):
+        if self._all_selected and self.has_selection():
+            self._copy_lines(self._history_first, self._history_first + self._history_total, self._lines,
+                             lambda n, text: text.rstrip())
+            return
+        super().copy()
+
+    def stats_lines(self):
+        return super().stats_lines() + [f"Document: {self._window_count} of {self.line_count()} lines"]
@@ -10,3 +10,12 @@ def resource_path(*relative_path):
         base_path = os.path.abspath(".")
 
     return os.path.normpath(os.path.join(base_path, *relative_path))
+
+
+def app_dir():
+    """Folder the app keeps its data files in, wherever it was launched from"""
+    if getattr(sys, 'frozen', False):
+        # In frozen app, next to the .exe
+        return os.path.dirname(sys.executable)
+    # In dev, the project folder
+    return os.path.dirname(os.path.abspath(__file__))